@@ -32,6 +32,7 @@ class RealTimeFallDetection:
         self.detection_active = False
         self.frame_queue = []
         self.max_queue_size = 5
+        self.seq = 0
         
     def initialize_camera(self):
         """Initialize camera with multiple fallback attempts"""
@@ -172,21 +173,26 @@ class RealTimeFallDetection:
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         return frame
     
-    def send_frame_to_server(self, frame):
+    def send_frame_to_server(self, frame, capture_ts=None):
         """Send frame to server for processing"""
         try:
             # Encode frame to JPEG
             _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
             frame_bytes = buffer.tobytes()
             
-            # Send to server
+            # Send to server with the capture time, so velocity is not skewed by network delay
+            self.seq += 1
             files = {'file': ('frame.jpg', frame_bytes, 'image/jpeg')}
-            data = {'user_id': self.user_id}
+            params = {
+                'user_id': self.user_id,
+                'capture_ts': capture_ts if capture_ts is not None else time.time(),
+                'seq': self.seq
+            }
             
             response = requests.post(
                 f"{self.server_url}/api/v1/detect-fall",
                 files=files,
-                data=data,
+                params=params,
                 timeout=5
             )
             
@@ -306,11 +312,12 @@ class RealTimeFallDetection:
             while True:
                 # Capture frame
                 frame = self.capture_frame()
+                capture_ts = time.time()
                 
                 if frame is not None:
                     # Process frame if detection is active
                     if self.detection_active:
-                        result = self.send_frame_to_server(frame)
+                        result = self.send_frame_to_server(frame, capture_ts)
                         frame = self.add_overlay_to_frame(frame, result)
                         self.handle_fall_detection(result)
                     
@@ -346,7 +353,7 @@ class RealTimeFallDetection:
                     else:
                         # No display available, just process
                         if self.detection_active:
-                            result = self.send_frame_to_server(frame)
+                            result = self.send_frame_to_server(frame, capture_ts)
                             self.handle_fall_detection(result)
                             
                 # Small delay to prevent CPU overload
@@ -13,17 +13,289 @@ import logging
 import argparse
 import os
 import socket
+import queue
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+try:
+    from websockets.sync.client import connect as websocket_connect
+except ImportError:  # websockets < 11 has no sync client
+    websocket_connect = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Wire formats of the ML service websocket (see app/services/frame_ingest.py
+# and app/services/result_codec.py there). This client ships on its own, so
+# they are copied here; the magic carries the format version, and
+# decode_result refuses any version it does not know.
+FRAME_MAGIC = b'FDF1'
+FRAME_HEADER = struct.Struct('<4sId')
+RESULT_MAGIC = b'FDR2'
+RESULT_HEADER = struct.Struct('<4sBBfffdII')
+FLAG_FALL_DETECTED = 0x01
+
+class ProtocolError(Exception):
+    """The ML service speaks a websocket protocol version this client does not"""
+
+def decode_result(data):
+    """Unpack a binary result record from the ML service"""
+    magic = bytes(data[:4])
+    if magic != RESULT_MAGIC:
+        if magic[:3] == RESULT_MAGIC[:3]:
+            raise ProtocolError(
+                f"Server sends result format {magic.decode(errors='replace')}, this client understands "
+                f"{RESULT_MAGIC.decode()} only: update run-camera-headless.py"
+            )
+        raise ProtocolError(f"Unexpected result record from server (starts with {magic!r})")
+    if len(data) < RESULT_HEADER.size:
+        raise ProtocolError(f"Truncated result record from server ({len(data)} bytes)")
+    
+    _, flags, _, confidence, angle, velocity, timestamp, seq, _ = RESULT_HEADER.unpack_from(data)
+    return {
+        'fall_detected': bool(flags & FLAG_FALL_DETECTED),
+        'confidence': confidence,
+        'angle': angle,
+        'velocity': velocity,
+        'timestamp': timestamp,
+        'seq': seq
+    }
+
+class HttpTransport:
+    """Sends frames to the REST endpoint over a keep-alive connection pool"""
+    
+    name = 'http'
+    
+    def __init__(self, server_url, user_id, pool_size=4, timeout=15):
+        self.server_url = server_url
+        self.user_id = user_id
+        self.timeout = timeout
+        
+        # Reuse connections instead of a TCP handshake per frame
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def send(self, frame_bytes, capture_ts, seq):
+        files = {'file': ('frame.jpg', frame_bytes, 'image/jpeg')}
+        params = {'user_id': self.user_id, 'capture_ts': capture_ts, 'seq': seq}
+        
+        response = self.session.post(
+            f"{self.server_url}/api/v1/detect-fall",
+            files=files,
+            params=params,
+            timeout=self.timeout
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        
+        logger.error(f"Server error: {response.status_code} - {response.text}")
+        return None
+    
+    def close(self):
+        self.session.close()
+
+class WebSocketTransport:
+    """
+    Streams frames over the /ws/fall-detection websocket with the binary
+    protocol: no per-frame handshake, headers or multipart encoding.
+    Several frames can be in flight; a receiver thread matches each result
+    to its frame by seq.
+    """
+    
+    name = 'websocket'
+    
+    def __init__(self, server_url, user_id, timeout=15):
+        ws_url = server_url.replace("http://", "ws://").replace("https://", "wss://")
+        self.url = f"{ws_url}/ws/fall-detection/{user_id}?protocol=binary"
+        self.timeout = timeout
+        self.websocket = None
+        # Only connecting and sending are serialised; results arrive on the receiver thread
+        self.send_lock = threading.Lock()
+        # Frames sent but not yet answered, seq -> [answered event, result or error, connection]
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+    
+    def connect(self):
+        if websocket_connect is None:
+            raise RuntimeError("websockets >= 11 is required for the websocket transport")
+        self.websocket = websocket_connect(self.url, open_timeout=self.timeout, max_size=None)
+        threading.Thread(
+            target=self._receive_loop, args=(self.websocket,), name='ws-receiver', daemon=True
+        ).start()
+    
+    def send(self, frame_bytes, capture_ts, seq):
+        waiter = [threading.Event(), None, None]
+        with self.pending_lock:
+            self.pending[seq] = waiter
+        
+        try:
+            with self.send_lock:
+                try:
+                    # Connect on first use and reconnect after a failure
+                    if self.websocket is None:
+                        self.connect()
+                    waiter[2] = self.websocket
+                    self.websocket.send(FRAME_HEADER.pack(FRAME_MAGIC, seq, capture_ts) + frame_bytes)
+                except Exception:
+                    self._disconnect()
+                    raise
+            
+            if not waiter[0].wait(self.timeout):
+                raise TimeoutError(f"No result for frame {seq} within {self.timeout}s")
+        finally:
+            with self.pending_lock:
+                self.pending.pop(seq, None)
+        
+        if isinstance(waiter[1], Exception):
+            raise waiter[1]
+        return waiter[1]
+    
+    def _receive_loop(self, websocket):
+        """Resolve pending frames from the results of one connection until it closes"""
+        try:
+            for data in websocket:
+                result = decode_result(data)
+                result_seq = result['seq']
+                # The server echoes the seq of every frame header it understood
+                if result_seq == 0 and 0 not in self.pending:
+                    raise ProtocolError(
+                        f"Server did not read the {FRAME_MAGIC.decode()} frame header: update run-camera-headless.py"
+                    )
+                
+                # The server skips stale frames, so an answer settles every older seq too
+                with self.pending_lock:
+                    for seq, waiter in self.pending.items():
+                        if waiter[2] is websocket and seq <= result_seq and not waiter[0].is_set():
+                            waiter[1] = result if seq == result_seq else None
+                            waiter[0].set()
+            error = ConnectionError("Websocket closed by server")
+        except Exception as e:
+            error = e
+        
+        with self.send_lock:
+            if self.websocket is websocket:
+                self._disconnect()
+        self._fail_pending(websocket, error)
+    
+    def _fail_pending(self, websocket, error):
+        """Fail the frames still waiting for an answer on a closed connection"""
+        with self.pending_lock:
+            for waiter in self.pending.values():
+                if waiter[2] is websocket and not waiter[0].is_set():
+                    waiter[1] = error
+                    waiter[0].set()
+    
+    def close(self):
+        with self.send_lock:
+            self._disconnect()
+    
+    def _disconnect(self):
+        if self.websocket is not None:
+            try:
+                self.websocket.close()
+            except Exception:
+                pass
+            self.websocket = None
+
+class FallbackTransport:
+    """
+    Prefers the primary transport and falls back to the secondary one while
+    it is down, retrying the primary with exponential backoff
+    """
+    
+    def __init__(self, primary, fallback, retry_interval=2.0, max_retry_interval=30.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        
+        self.lock = threading.Lock()
+        self.primary_up = True
+        self.next_retry = 0.0
+        self.current_interval = retry_interval
+    
+    @property
+    def name(self):
+        return self.primary.name if self.primary_up else self.fallback.name
+    
+    def send(self, frame_bytes, capture_ts, seq):
+        with self.lock:
+            use_primary = self.primary_up or time.time() >= self.next_retry
+        
+        if use_primary:
+            try:
+                result = self.primary.send(frame_bytes, capture_ts, seq)
+                self._primary_ok()
+                return result
+            except Exception as e:
+                self._primary_failed(e)
+        
+        return self.fallback.send(frame_bytes, capture_ts, seq)
+    
+    def _primary_ok(self):
+        with self.lock:
+            if not self.primary_up:
+                logger.info(f"✅ {self.primary.name} transport reconnected")
+            self.primary_up = True
+            self.current_interval = self.retry_interval
+    
+    def _primary_failed(self, error):
+        with self.lock:
+            if self.primary_up:
+                logger.warning(f"⚠️ {self.primary.name} transport failed ({error}), falling back to {self.fallback.name}")
+            self.primary_up = False
+            self.next_retry = time.time() + self.current_interval
+            self.current_interval = min(self.current_interval * 2, self.max_retry_interval)
+    
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+def create_transport(kind, server_url, user_id, pool_size=4):
+    """Build the frame transport: 'http', 'websocket' or 'auto' (websocket, falling back to HTTP)"""
+    if kind == 'http':
+        return HttpTransport(server_url, user_id, pool_size)
+    if kind == 'websocket':
+        return WebSocketTransport(server_url, user_id)
+    return FallbackTransport(WebSocketTransport(server_url, user_id), HttpTransport(server_url, user_id, pool_size))
+
+class StageTimer:
+    """Accumulates per-stage timings between periodic reports"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.counts = {}
+    
+    def add(self, stage, seconds):
+        with self.lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+    
+    def report(self):
+        """Average milliseconds per stage since the last report, then reset"""
+        with self.lock:
+            averages = {
+                stage: self.totals[stage] / self.counts[stage] * 1000
+                for stage in self.totals
+            }
+            self.totals.clear()
+            self.counts.clear()
+        return " | ".join(f"{stage}: {ms:.1f} ms" for stage, ms in averages.items())
+
 class HeadlessFallDetection:
-    def __init__(self, server_url="http://localhost:3000", user_id="default"):
+    def __init__(self, server_url="http://localhost:3000", user_id="default", transport="auto", pool_size=4):
         # Use Docker service name instead of localhost
         self.server_url = server_url  # Changed from localhost to service name
         self.user_id = user_id
+        self.transport = create_transport(transport, server_url, user_id, pool_size)
         
         # Use headless OpenCV
         os.environ['QT_QPA_PLATFORM'] = 'offscreen'
@@ -34,6 +306,9 @@ class HeadlessFallDetection:
         self.frame_count = 0
         self.fall_count = 0
         self.last_detection_time = 0
+        self.seq = 0
+        self.result_lock = threading.Lock()
+        self.last_result_seq = 0
         
         # Test server connection first
         self.test_server_connection()
@@ -185,31 +460,29 @@ class HeadlessFallDetection:
         # Ultimate fallback
         return np.zeros((480, 640, 3), dtype=np.uint8)
     
-    def process_frame(self, frame):
+    def encode_frame(self, frame):
+        """Encode frame to JPEG bytes"""
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        return buffer.tobytes()
+    
+    def process_frame(self, frame, capture_ts=None):
         """Process frame and send to server with better error handling"""
         try:
-            # Encode frame
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-            frame_bytes = buffer.tobytes()
-            
-            # Send to server
-            files = {'file': ('frame.jpg', frame_bytes, 'image/jpeg')}
-            data = {'user_id': self.user_id}
-            
-            # Use longer timeout for Docker/network latency
-            response = requests.post(
-                f"{self.server_url}/api/v1/detect-fall",
-                files=files,
-                data=data,
-                timeout=15  # Increased timeout for Docker
+            frame_bytes = self.encode_frame(frame)
+        except Exception as e:
+            logger.error(f"❌ Error encoding frame: {e}")
+            return None
+        
+        self.seq += 1
+        return self.send_frame(frame_bytes, capture_ts, self.seq)
+    
+    def send_frame(self, frame_bytes, capture_ts, seq):
+        """Send an encoded frame to the server and return the detection result"""
+        try:
+            # Send to server with the capture time, so velocity is not skewed by network delay
+            return self.transport.send(
+                frame_bytes, capture_ts if capture_ts is not None else time.time(), seq
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result
-            else:
-                logger.error(f"Server error: {response.status_code} - {response.text}")
-                return None
                 
         except requests.exceptions.ConnectionError as e:
             logger.error(f"❌ Connection refused to {self.server_url}: {e}")
@@ -268,6 +541,142 @@ class HeadlessFallDetection:
         except Exception as e:
             logger.error(f"❌ Error sending notification: {e}")
     
+    def run_pipelined(self, window=4, fps=30):
+        """
+        Run capture, JPEG encoding and sending as separate pipeline stages:
+        a capture thread, an encoder thread and up to `window` requests in
+        flight, so throughput is set by the slowest stage instead of the
+        sum of all of them
+        """
+        logger.info("🚀 Starting pipelined headless fall detection...")
+        logger.info(f"💡 Connecting to server: {self.server_url} (window: {window}, target FPS: {fps})")
+        
+        stop = threading.Event()
+        timer = StageTimer()
+        # Capture keeps only the newest frames; encoded frames wait for a send slot
+        captured = queue.Queue(maxsize=2)
+        encoded = queue.Queue(maxsize=window)
+        in_flight = threading.BoundedSemaphore(window)
+        sender = ThreadPoolExecutor(max_workers=window, thread_name_prefix='sender')
+        # Counted by the capture thread and this one
+        counters = {'captured': 0, 'dropped': 0, 'sent': 0}
+        counters_lock = threading.Lock()
+        
+        def capture_loop():
+            interval = 1.0 / fps if fps > 0 else 0
+            while not stop.is_set():
+                started = time.time()
+                frame = self.capture_frame()
+                capture_ts = time.time()
+                timer.add('capture', capture_ts - started)
+                
+                if frame is not None:
+                    with counters_lock:
+                        counters['captured'] += 1
+                    # Drop the oldest frame rather than fall behind the camera
+                    if captured.full():
+                        try:
+                            captured.get_nowait()
+                            with counters_lock:
+                                counters['dropped'] += 1
+                        except queue.Empty:
+                            pass
+                    captured.put((frame, capture_ts))
+                
+                remaining = interval - (time.time() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
+        
+        def encode_loop():
+            while not stop.is_set():
+                try:
+                    frame, capture_ts = captured.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                
+                started = time.time()
+                try:
+                    frame_bytes = self.encode_frame(frame)
+                except Exception as e:
+                    logger.error(f"❌ Error encoding frame: {e}")
+                    continue
+                timer.add('encode', time.time() - started)
+                
+                self.seq += 1
+                encoded.put((frame_bytes, capture_ts, self.seq))
+        
+        def send(frame_bytes, capture_ts, seq):
+            started = time.time()
+            try:
+                result = self.send_frame(frame_bytes, capture_ts, seq)
+                finished = time.time()
+                timer.add('send', finished - started)
+                timer.add('end_to_end', finished - capture_ts)
+                self.handle_pipelined_result(result, seq)
+            finally:
+                in_flight.release()
+        
+        threads = [
+            threading.Thread(target=capture_loop, name='capture', daemon=True),
+            threading.Thread(target=encode_loop, name='encoder', daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        last_log_time = time.time()
+        
+        try:
+            while True:
+                try:
+                    item = encoded.get(timeout=0.5)
+                except queue.Empty:
+                    item = None
+                
+                if item is not None:
+                    # Wait for a free slot in the in-flight window
+                    started = time.time()
+                    in_flight.acquire()
+                    timer.add('window_wait', time.time() - started)
+                    sender.submit(send, *item)
+                    with counters_lock:
+                        counters['sent'] += 1
+                
+                # Log status periodically
+                current_time = time.time()
+                if current_time - last_log_time >= 5:  # Every 5 seconds
+                    elapsed = current_time - last_log_time
+                    with counters_lock:
+                        counts = dict(counters)
+                        counters.update(captured=0, dropped=0, sent=0)
+                    logger.info(
+                        f"📊 FPS: {counts['sent'] / elapsed:.1f} | Captured: {counts['captured']} | "
+                        f"Dropped: {counts['dropped']} | Falls: {self.fall_count} | "
+                        f"Transport: {self.transport.name}"
+                    )
+                    logger.info(f"⏱️ {timer.report()}")
+                    last_log_time = current_time
+                    
+        except KeyboardInterrupt:
+            logger.info("🛑 Headless detection stopped by user")
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=2)
+            sender.shutdown(wait=True)
+            if self.cap:
+                self.cap.release()
+            self.transport.close()
+            
+            logger.info(f"📊 Total falls detected: {self.fall_count}")
+    
+    def handle_pipelined_result(self, result, seq):
+        """Handle a result from the sender pool, ignoring any older than one already handled"""
+        with self.result_lock:
+            if result is None or seq < self.last_result_seq:
+                return
+            self.last_result_seq = seq
+            self.handle_detection_result(result)
+    
     def run(self):
         """Main run loop for headless operation"""
         logger.info("🚀 Starting headless fall detection...")
@@ -284,12 +693,13 @@ class HeadlessFallDetection:
             while True:
                 # Capture frame
                 frame = self.capture_frame()
+                capture_ts = time.time()
                 
                 if frame is not None:
                     frame_count += 1
                     
                     # Process frame
-                    result = self.process_frame(frame)
+                    result = self.process_frame(frame, capture_ts)
                     
                     # Handle detection
                     self.handle_detection_result(result)
@@ -298,7 +708,10 @@ class HeadlessFallDetection:
                     current_time = time.time()
                     if current_time - last_log_time >= 5:  # Every 5 seconds
                         fps = frame_count / (current_time - last_log_time)
-                        logger.info(f"📊 FPS: {fps:.1f} | Frames: {frame_count} | Falls: {self.fall_count}")
+                        logger.info(
+                            f"📊 FPS: {fps:.1f} | Frames: {frame_count} | Falls: {self.fall_count} | "
+                            f"Transport: {self.transport.name}"
+                        )
                         frame_count = 0
                         last_log_time = current_time
                     
@@ -316,6 +729,7 @@ class HeadlessFallDetection:
         finally:
             if self.cap:
                 self.cap.release()
+            self.transport.close()
             
             logger.info(f"📈 Total frames processed: {frame_count}")
             logger.info(f"📊 Total falls detected: {self.fall_count}")
@@ -328,16 +742,29 @@ def main():
                        help='User ID (default: default)')
     parser.add_argument('--verbose', action='store_true', 
                        help='Verbose logging')
+    parser.add_argument('--pipelined', action='store_true',
+                       help='Capture, encode and send in parallel pipeline stages')
+    parser.add_argument('--window', type=int, default=4,
+                       help='Max requests in flight in pipelined mode (default: 4)')
+    parser.add_argument('--fps', type=float, default=30,
+                       help='Target capture FPS in pipelined mode (default: 30)')
+    parser.add_argument('--transport', choices=['auto', 'websocket', 'http'], default='auto',
+                       help='Frame transport; auto streams over the websocket and falls back to HTTP (default: auto)')
     
     args = parser.parse_args()
     
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
-    app = HeadlessFallDetection(args.server_url, args.user_id)
+    app = HeadlessFallDetection(
+        args.server_url, args.user_id, transport=args.transport, pool_size=max(1, args.window)
+    )
     
     try:
-        app.run()
+        if args.pipelined:
+            app.run_pipelined(window=max(1, args.window), fps=args.fps)
+        else:
+            app.run()
     except KeyboardInterrupt:
         logger.info("Application stopped")
 
@@ -0,0 +1,382 @@
+"""
+Offline fall detection over recorded video.
+
+    python -m app.batch footage/ --output results/ --workers 8
+
+Videos are split into chunks that are decoded and scored in parallel
+worker processes. Each chunk starts decoding a little before its first
+frame so pose tracking and the temporal fall features are warm at the
+boundary. Per-frame scores are written per video as columnar .npz (or
+.csv), laid out like the input folders, and detected fall events to
+events.csv. Frames of a chunk that failed are still written, with scored
+false, and every failure is listed in failures.csv; the exit status is
+then non-zero.
+"""
+import argparse
+import csv
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm', '.mpg', '.mpeg'}
+
+# Per-frame columns, in output order. scored is false for the frames of a
+# chunk that failed, whose other scores are then zero or NaN.
+SCORE_COLUMNS = {
+    'frame': np.int64,
+    'time': np.float64,
+    'scored': np.bool_,
+    'has_pose': np.bool_,
+    'fall_detected': np.bool_,
+    'confidence': np.float32,
+    'angle': np.float32,
+    'velocity': np.float32,
+    'peak_velocity': np.float32,
+    'angle_change': np.float32,
+    'stillness': np.float32
+}
+
+
+class ChunkJob(NamedTuple):
+    """
+    A frame range of one video to score in a worker
+    """
+    path: str
+    index: int
+    start: int  # first frame scored
+    end: int  # one past the last frame scored
+    warmup_start: int  # first frame decoded
+    fps: float
+    frame_step: int
+    tier: Optional[str]
+
+
+# Per-process detector, created once by _init_worker inside each worker
+_fall_detector = None
+
+
+def _init_worker():
+    global _fall_detector
+
+    from .services.fall_detector import FallDetector
+
+    _fall_detector = FallDetector()
+
+
+def _score_chunk(job: ChunkJob) -> Dict[str, np.ndarray]:
+    """
+    Decode and score one chunk, returning its per-frame columns
+    """
+    columns = {name: [] for name in SCORE_COLUMNS}
+    person_id = f"{job.path}#{job.index}"
+
+    cap = cv2.VideoCapture(job.path)
+    try:
+        if job.warmup_start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, job.warmup_start)
+
+        for frame_index in range(job.warmup_start, job.end):
+            # Only decode the frames we score; grab() just advances
+            if (frame_index - job.start) % job.frame_step:
+                if not cap.grab():
+                    break
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            # Video time stands in for the capture time
+            frame_time = frame_index / job.fps
+            result = _fall_detector.detect_fall(frame, person_id, tier=job.tier, capture_ts=frame_time)
+
+            if frame_index < job.start:
+                continue
+
+            columns['frame'].append(frame_index)
+            columns['time'].append(frame_time)
+            columns['scored'].append(True)
+            columns['has_pose'].append(len(result['landmarks']) > 0)
+            for name in ('fall_detected', 'confidence', 'angle', 'velocity',
+                         'peak_velocity', 'angle_change', 'stillness'):
+                columns[name].append(result[name])
+    finally:
+        cap.release()
+        _fall_detector.reset_person(person_id)
+
+    return {name: np.asarray(values, dtype=SCORE_COLUMNS[name]) for name, values in columns.items()}
+
+
+def failed_chunk(job: ChunkJob) -> Dict[str, np.ndarray]:
+    """
+    Columns for a chunk that could not be scored: its frames, marked as
+    not scored, so the output shows the gap instead of hiding it
+    """
+    frames = np.arange(job.start, job.end, job.frame_step, dtype=np.int64)
+    columns = {}
+    for name, dtype in SCORE_COLUMNS.items():
+        fill = np.nan if np.issubdtype(dtype, np.floating) else 0
+        columns[name] = np.full(len(frames), fill, dtype=dtype)
+    columns['frame'] = frames
+    columns['time'] = frames / job.fps
+    return columns
+
+
+def find_videos(inputs: List[str]) -> List[Tuple[Path, Path]]:
+    """
+    Expand files and directories into the video files to analyse, each
+    with its path relative to the directory it was found in (just its
+    name for files given directly)
+    """
+    videos = []
+    seen = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found = sorted(p for p in path.rglob('*') if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS)
+            pairs = [(video, video.relative_to(path)) for video in found]
+        elif path.is_file():
+            pairs = [(path, Path(path.name))]
+        else:
+            logger.warning(f"Skipping {item}: not a file or directory")
+            continue
+
+        for video, relative in pairs:
+            if video.resolve() not in seen:
+                seen.add(video.resolve())
+                videos.append((video, relative))
+    return videos
+
+
+def output_paths(videos: List[Tuple[Path, Path]], output_dir: Path, output_format: str) -> Dict[str, Path]:
+    """
+    Where each video's scores go: its relative path under output_dir, so
+    videos of the same name in different folders do not overwrite each
+    other. Videos differing only in extension keep it in the name.
+    Raises ValueError if two videos would still share an output.
+    """
+    by_stem: Dict[Path, List[Tuple[Path, Path]]] = {}
+    for video, relative in videos:
+        by_stem.setdefault(relative.with_suffix(''), []).append((video, relative))
+
+    paths = {}
+    owners: Dict[Path, Path] = {}
+    for stem, group in by_stem.items():
+        for video, relative in group:
+            name = relative if len(group) > 1 else stem
+            path = output_dir / f"{name}.scores.{output_format}"
+            if path in owners:
+                raise ValueError(f"{video} and {owners[path]} would both be written to {path}")
+            owners[path] = video
+            paths[str(video)] = path
+    return paths
+
+
+def plan_chunks(path: Path, chunk_seconds: float, overlap_seconds: float,
+                frame_step: int, tier: Optional[str]) -> List[ChunkJob]:
+    """
+    Split a video into chunks of chunk_seconds, each decoding
+    overlap_seconds of the previous chunk first to warm up
+    """
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened():
+            logger.error(f"Cannot open video {path}")
+            return []
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+    if frame_count <= 0:
+        logger.error(f"Cannot read frame count of {path}")
+        return []
+
+    chunk_frames = max(1, int(chunk_seconds * fps)) if chunk_seconds > 0 else frame_count
+    overlap_frames = max(0, int(overlap_seconds * fps))
+
+    return [
+        ChunkJob(str(path), index, start, min(start + chunk_frames, frame_count),
+                 max(0, start - overlap_frames), fps, frame_step, tier)
+        for index, start in enumerate(range(0, frame_count, chunk_frames))
+    ]
+
+
+def find_events(scores: Dict[str, np.ndarray], min_frames: int = 1) -> List[Dict]:
+    """
+    Group consecutive fall frames into events
+    """
+    detected = scores['fall_detected']
+    if not detected.any():
+        return []
+
+    # Run boundaries of the fall_detected column
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], detected.astype(np.int8), [0]))))
+    events = []
+    for begin, end in zip(edges[::2], edges[1::2]):
+        if end - begin < min_frames:
+            continue
+        events.append({
+            'start_frame': int(scores['frame'][begin]),
+            'end_frame': int(scores['frame'][end - 1]),
+            'start_time': float(scores['time'][begin]),
+            'end_time': float(scores['time'][end - 1]),
+            'max_confidence': float(scores['confidence'][begin:end].max())
+        })
+    return events
+
+
+def write_scores(scores: Dict[str, np.ndarray], path: Path, output_format: str):
+    """
+    Write per-frame columns to path as .npz or .csv
+    """
+    if output_format == 'npz':
+        np.savez_compressed(path, **scores)
+        return
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(scores.keys())
+        writer.writerows(zip(*(column.tolist() for column in scores.values())))
+
+
+def run(videos: List[Tuple[Path, Path]], output_dir: Path, workers: int, chunk_seconds: float,
+        overlap_seconds: float, frame_step: int, tier: Optional[str], output_format: str,
+        min_event_frames: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Score all videos (as returned by find_videos) and write their outputs,
+    returning the detected events and the failures
+    """
+    outputs = output_paths(videos, output_dir, output_format)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    failures = []
+    for video, _ in videos:
+        chunks = plan_chunks(video, chunk_seconds, overlap_seconds, frame_step, tier)
+        if not chunks:
+            failures.append({'video': str(video), 'chunk': '', 'start_frame': '', 'end_frame': '',
+                             'error': 'cannot read video'})
+        jobs.extend(chunks)
+    chunks_per_video = {}
+    for job in jobs:
+        chunks_per_video[job.path] = chunks_per_video.get(job.path, 0) + 1
+    logger.info(f"Scoring {len(videos)} videos as {len(jobs)} chunks on {workers} workers")
+
+    done: Dict[str, Dict[int, Dict[str, np.ndarray]]] = {}
+    all_events = []
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+        futures = {executor.submit(_score_chunk, job): job for job in jobs}
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                chunk = future.result()
+            except Exception as e:
+                logger.error(f"Chunk {job.index} of {job.path} failed: {str(e)}")
+                chunk = failed_chunk(job)
+                failures.append({'video': job.path, 'chunk': job.index, 'start_frame': job.start,
+                                 'end_frame': job.end - 1, 'error': str(e) or type(e).__name__})
+
+            chunks = done.setdefault(job.path, {})
+            chunks[job.index] = chunk
+            if len(chunks) < chunks_per_video[job.path]:
+                continue
+
+            # All chunks of this video are in: stitch them and write it out
+            scores = {
+                name: np.concatenate([chunks[i][name] for i in sorted(chunks)])
+                for name in SCORE_COLUMNS
+            }
+            del done[job.path]
+
+            video = Path(job.path)
+            output = outputs[job.path]
+            output.parent.mkdir(parents=True, exist_ok=True)
+            write_scores(scores, output, output_format)
+
+            events = find_events(scores, min_event_frames)
+            for event in events:
+                event['video'] = job.path
+            all_events.extend(events)
+            unscored = int(np.count_nonzero(~scores['scored']))
+            logger.info(
+                f"{video.name}: {len(scores['frame']) - unscored} frames scored, {len(events)} falls"
+                + (f", {unscored} frames NOT scored" if unscored else "")
+            )
+
+    with open(output_dir / 'events.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(
+            f, fieldnames=['video', 'start_frame', 'end_frame', 'start_time', 'end_time', 'max_confidence']
+        )
+        writer.writeheader()
+        writer.writerows(sorted(all_events, key=lambda e: (e['video'], e['start_frame'])))
+
+    with open(output_dir / 'failures.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['video', 'chunk', 'start_frame', 'end_frame', 'error'])
+        writer.writeheader()
+        writer.writerows(sorted(failures, key=lambda e: (e['video'], -1 if e['chunk'] == '' else e['chunk'])))
+
+    return all_events, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline fall detection over recorded video')
+    parser.add_argument('inputs', nargs='+', help='Video files or directories to scan for videos')
+    parser.add_argument('--output', default='batch-results', help='Output directory (default: batch-results)')
+    parser.add_argument('--workers', type=int, default=settings.INFERENCE_WORKERS,
+                        help='Worker processes (default: INFERENCE_WORKERS)')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0,
+                        help='Length of the chunks videos are split into, 0 for whole videos (default: 60)')
+    parser.add_argument('--overlap-seconds', type=float, default=3.0,
+                        help='Video decoded before each chunk to warm up temporal state (default: 3)')
+    parser.add_argument('--frame-step', type=int, default=1,
+                        help='Score every n-th frame (default: 1)')
+    parser.add_argument('--tier', choices=sorted(settings.POSE_MODEL_TIERS),
+                        help='Pose model tier (default: POSE_MODEL_TIER)')
+    parser.add_argument('--format', dest='output_format', choices=['npz', 'csv'], default='npz',
+                        help='Per-frame score format (default: npz)')
+    parser.add_argument('--min-event-frames', type=int, default=3,
+                        help='Consecutive fall frames needed for an event (default: 3)')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        parser.error("no videos found")
+
+    try:
+        events, failures = run(
+            videos,
+            Path(args.output),
+            workers=max(1, args.workers),
+            chunk_seconds=args.chunk_seconds,
+            overlap_seconds=args.overlap_seconds,
+            frame_step=max(1, args.frame_step),
+            tier=args.tier,
+            output_format=args.output_format,
+            min_event_frames=max(1, args.min_event_frames)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    logger.info(f"Done: {len(events)} falls detected, results in {args.output}")
+    if failures:
+        logger.error(f"{len(failures)} chunks or videos could not be scored, see {Path(args.output) / 'failures.csv'}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
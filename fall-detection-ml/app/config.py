@@ -11,6 +11,9 @@ class Settings:
     # API settings
     API_V1_STR = "/api/v1"
     
+    # MediaPipe pose model_complexity for each inference tier
+    POSE_MODEL_TIERS = {'lite': 0, 'full': 1, 'heavy': 2}
+    
     # NestJS backend URL
     BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:3000")
     
@@ -18,9 +21,78 @@ class Settings:
     FALL_THRESHOLD_ANGLE = float(os.getenv("FALL_THRESHOLD_ANGLE", 60.0))
     FALL_THRESHOLD_VELOCITY = float(os.getenv("FALL_THRESHOLD_VELOCITY", 2.5))
     CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", 0.7))
+    FALL_WINDOW_SIZE = int(os.getenv("FALL_WINDOW_SIZE", 30))  # frames of landmark history per person
+    FALL_STILLNESS_FRAMES = int(os.getenv("FALL_STILLNESS_FRAMES", 10))
+    FALL_STILLNESS_VELOCITY = float(os.getenv("FALL_STILLNESS_VELOCITY", 20.0))  # mean body speed, pixels/s
+    
+    # Inference settings
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", os.cpu_count() or 1))
+    MAX_POSE_SESSIONS = int(os.getenv("MAX_POSE_SESSIONS", 64))  # per worker
+    POSE_SESSION_TTL = int(os.getenv("POSE_SESSION_TTL", 300))  # seconds
+    MAX_PERSON_STATES = int(os.getenv("MAX_PERSON_STATES", 1024))  # per worker
+    PERSON_STATE_TTL = int(os.getenv("PERSON_STATE_TTL", 600))  # seconds
+    # Longest side in pixels frames are downscaled to for inference (0 = full resolution)
+    INFERENCE_MAX_DIMENSION = int(os.getenv("INFERENCE_MAX_DIMENSION", 0))
+    # Run inference on the person's last bounding box (plus margin) before the full frame
+    INFERENCE_ROI_CROP = os.getenv("INFERENCE_ROI_CROP", "false").lower() == "true"
+    INFERENCE_ROI_MARGIN = float(os.getenv("INFERENCE_ROI_MARGIN", 0.25))  # fraction of box size
+    # When the crop misses, retry on the full frame at most once per this many frames
+    INFERENCE_ROI_FALLBACK_FRAMES = int(os.getenv("INFERENCE_ROI_FALLBACK_FRAMES", 5))
+    POSE_MODEL_TIER = os.getenv("POSE_MODEL_TIER", "full")  # lite, full or heavy
+    MIN_DETECTION_CONFIDENCE = float(os.getenv("MIN_DETECTION_CONFIDENCE", 0.7))
+    MIN_TRACKING_CONFIDENCE = float(os.getenv("MIN_TRACKING_CONFIDENCE", 0.5))
+    
+    # Landmark scoring (edge clients uploading their own landmarks): person
+    # states kept by the API process and frames accepted per batch
+    LANDMARK_MAX_PERSON_STATES = int(os.getenv("LANDMARK_MAX_PERSON_STATES", 4096))
+    LANDMARK_MAX_BATCH_FRAMES = int(os.getenv("LANDMARK_MAX_BATCH_FRAMES", 256))
+    # Client capture times further than this from server time are rejected
+    # (landmark batches) or replaced with server time (frames)
+    CAPTURE_TS_MAX_SKEW_SECONDS = float(os.getenv("CAPTURE_TS_MAX_SKEW_SECONDS", 300))
+    
+    # Warm-up: at startup every worker runs WARMUP_FRAMES synthetic frames
+    # through the models it will serve; /ready reports not ready until then
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_FRAMES = int(os.getenv("WARMUP_FRAMES", 3))
+    
+    # Load governor: streams drop to the lite tier while per-frame latency or
+    # queue depth is above the high marks, and return once both are below the low marks
+    GOVERNOR_ENABLED = os.getenv("GOVERNOR_ENABLED", "true").lower() == "true"
+    GOVERNOR_LATENCY_HIGH_MS = float(os.getenv("GOVERNOR_LATENCY_HIGH_MS", 250.0))
+    GOVERNOR_LATENCY_LOW_MS = float(os.getenv("GOVERNOR_LATENCY_LOW_MS", 100.0))
+    GOVERNOR_QUEUE_HIGH = int(os.getenv("GOVERNOR_QUEUE_HIGH", 32))
+    GOVERNOR_QUEUE_LOW = int(os.getenv("GOVERNOR_QUEUE_LOW", 8))
+    GOVERNOR_MIN_DWELL_SECONDS = float(os.getenv("GOVERNOR_MIN_DWELL_SECONDS", 10.0))  # between switches
+    
+    # Adaptive sampling: idle streams are only inferred idle_fps times per second,
+    # every frame is inferred for hot_hold seconds after motion, a body angle
+    # above SAMPLER_HOT_ANGLE or a detected fall
+    SAMPLER_ENABLED = os.getenv("SAMPLER_ENABLED", "true").lower() == "true"
+    SAMPLER_IDLE_FPS = float(os.getenv("SAMPLER_IDLE_FPS", 2.0))
+    SAMPLER_MOTION_THRESHOLD = float(os.getenv("SAMPLER_MOTION_THRESHOLD", 0.01))  # fraction of changed pixels
+    SAMPLER_HOT_ANGLE = float(os.getenv("SAMPLER_HOT_ANGLE", 30.0))  # degrees
+    SAMPLER_HOT_HOLD = float(os.getenv("SAMPLER_HOT_HOLD", 3.0))  # seconds
+    
+    # Batching settings (larger batches and waits favour throughput over latency)
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 8))
+    BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 5.0))
     
     # Notification settings
     NOTIFICATION_COOLDOWN = int(os.getenv("NOTIFICATION_COOLDOWN", 30))  # seconds
+    NOTIFICATION_TIMEOUT = float(os.getenv("NOTIFICATION_TIMEOUT", 5.0))  # seconds
+    NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", 4))
+    NOTIFICATION_OUTBOX_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_SIZE", 1000))
+    NOTIFICATION_MAX_RETRIES = int(os.getenv("NOTIFICATION_MAX_RETRIES", 5))
+    NOTIFICATION_RETRY_BACKOFF = float(os.getenv("NOTIFICATION_RETRY_BACKOFF", 1.0))  # seconds, doubled per attempt
+    NOTIFICATION_RETRY_MAX_BACKOFF = float(os.getenv("NOTIFICATION_RETRY_MAX_BACKOFF", 30.0))  # seconds
+    
+    # Profiling: POST /api/v1/admin/profile samples the API process and
+    # inference workers for up to PROFILER_MAX_SECONDS; off unless enabled
+    ENABLE_PROFILER = os.getenv("ENABLE_PROFILER", "false").lower() == "true"
+    PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60.0))
+    
+    # Metrics: per-stream series beyond this are folded into user_id="_other"
+    METRICS_MAX_STREAMS = int(os.getenv("METRICS_MAX_STREAMS", 1000))
     
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
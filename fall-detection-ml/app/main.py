@@ -1,22 +1,31 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
+from fastapi.responses import JSONResponse, PlainTextResponse
 import numpy as np
-import json
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 import asyncio
+import threading
+import time
 from datetime import datetime
 import base64
-from io import BytesIO
-from PIL import Image
-import uvicorn
-from pathlib import Path
 
 from .config import settings
-from .services.fall_detector import FallDetector
 from .services.notification_service import NotificationService
-from .services.camera_service import CameraService
+from .services.inference_pool import InferencePool
+from .services.batch_scheduler import BatchScheduler
+from .services.load_governor import LoadGovernor
+from .services.frame_ingest import FRAME_HEADER, LatestFrameReceiver, check_capture_ts, parse_frame
+from .services.frame_sampler import FrameSampler
+from .services.session_registry import SessionRegistry
+from .services.result_codec import encode_result
+from .services.landmark_codec import (
+    LANDMARK_BATCH_HEADER, LANDMARK_RECORD, decode_landmark_batch, validate_landmark_batch
+)
+from .services.fall_detector import FallDetector
+from .services.metrics import metrics, StreamMetrics
+from .services.profiler import SamplingProfiler, collapse_profiles
+from .models.landmarks import empty_landmarks, landmarks_to_dicts
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
@@ -38,37 +47,151 @@ app.add_middleware(
 )
 
 # Initialize services
-fall_detector = FallDetector()
 notification_service = NotificationService()
-camera_service = CameraService()
+inference_pool = InferencePool()
+batch_scheduler = BatchScheduler(inference_pool)
+
+# Scores pre-computed landmarks in this process; no pose model is loaded
+# since only FallDetector.score_landmarks is used. It keeps its own person
+# state budget, sized for the edge streams of this instance. Batches are
+# scored in threads, one at a time, off the event loop.
+landmark_scorer = FallDetector(max_person_states=settings.LANDMARK_MAX_PERSON_STATES)
+landmark_lock = threading.Lock()
+
+# Frame samplers for REST callers, which have no connection to hang them on
+rest_samplers = SessionRegistry(
+    factory=lambda user_id: FrameSampler(),
+    max_sessions=settings.MAX_POSE_SESSIONS,
+    ttl=settings.POSE_SESSION_TTL
+)
 
 # WebSocket connections
 active_connections: List[WebSocket] = []
 
+_scoring_timer = metrics.stage_seconds.labels('scoring')
+
+# Held while a profile is being taken, one at a time
+profile_lock = asyncio.Lock()
+
+# Warms up the inference workers after startup; the service is ready once
+# it has finished with every worker able to serve the default model tier
+warm_up_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def startup_event():
+    global warm_up_task
+    inference_pool.start()
+    batch_scheduler.start()
+    await notification_service.start()
+    # In the background, so the server accepts connections (and answers
+    # /health) while the workers spawn and load their models
+    warm_up_task = asyncio.create_task(_warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await batch_scheduler.stop()
+    inference_pool.shutdown()
+    await notification_service.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Fall Detection ML Service", "version": "1.0.0"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    """
+    Liveness check, healthy as long as the process is up; ready shows
+    whether warm-up has finished (see /ready)
+    """
+    return {"status": "healthy", "ready": _readiness()['ready'], "timestamp": datetime.utcnow().isoformat()}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 until the inference workers have started and
+    warmed up, so a restarted or newly scaled instance only gets traffic
+    once it can serve frames at full speed
+    """
+    readiness = _readiness()
+    return JSONResponse(readiness, status_code=200 if readiness['ready'] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Service metrics in the Prometheus text format, merged across the API
+    process and every inference worker
+    """
+    session_stats = await inference_pool.get_session_stats()
+    landmark_stats = landmark_scorer.get_person_state_stats()
+    
+    metrics.active_connections.set(len(active_connections))
+    metrics.queue_depth.set(batch_scheduler.queue_depth)
+    metrics.in_flight.set(batch_scheduler.in_flight)
+    metrics.notification_outbox_depth.set(notification_service.outbox_depth)
+    metrics.governor_degraded.set(int(batch_scheduler.governor.degraded))
+    metrics.pose_sessions.set(session_stats['totals'].get('active', 0))
+    for scope in ('fall_detection', 'camera_stream'):
+        metrics.person_states.set(
+            sum(worker['person_state'][scope]['active'] for worker in session_stats['workers']), scope
+        )
+        metrics.person_state_bytes.set(
+            sum(worker['person_state'][scope]['memory_bytes'] for worker in session_stats['workers']), scope
+        )
+    metrics.person_states.set(landmark_stats['active'], 'landmark_scoring')
+    metrics.person_state_bytes.set(landmark_stats['memory_bytes'], 'landmark_scoring')
+    
+    return PlainTextResponse(
+        metrics.render(await inference_pool.get_metrics()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 @app.post("/api/v1/detect-fall")
-async def detect_fall_endpoint(file: UploadFile = File(...), user_id: str = "default"):
+async def detect_fall_endpoint(
+    file: UploadFile = File(...),
+    user_id: str = "default",
+    tier: Optional[str] = None,
+    capture_ts: Optional[float] = None,
+    seq: Optional[int] = None
+):
     """
     Detect fall from uploaded image
+    
+    capture_ts (seconds since epoch) is when the client captured the image
+    and is used for velocity and other temporal features; server time is
+    used instead when it is not within CAPTURE_TS_MAX_SKEW_SECONDS of it.
+    seq is echoed back in the result.
     """
+    if not _is_valid_tier(tier):
+        raise HTTPException(status_code=400, detail=f"Unknown model tier: {tier}")
+    capture_ts = check_capture_ts(capture_ts)
+    
     try:
         # Read image
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
-        if frame is None:
-            raise HTTPException(status_code=400, detail="Invalid image format")
+        stream = metrics.stream(user_id, 'rest')
+        stream.received.inc()
+        
+        # Replay the last result for frames the sampler skips
+        sampler = rest_samplers.acquire(user_id)
+        if not await _should_sample(sampler, contents) and sampler.last_result is not None:
+            result = sampler.skipped_result()
+            stream.skipped.inc()
+        else:
+            # Decode and detect fall in the next inference batch
+            result = await batch_scheduler.detect_fall(contents, user_id, tier=tier, capture_ts=capture_ts)
+            
+            if result is None:
+                raise HTTPException(status_code=400, detail="Invalid image format")
+            
+            stream.record_result(result)
+            sampler.update(result)
+            result = dict(result, skipped=False)
         
-        # Detect fall
-        result = fall_detector.detect_fall(frame, user_id)
+        result['seq'] = seq
+        result['landmarks'] = landmarks_to_dicts(result['landmarks'])
         
         # Send notification if fall detected
         if result['fall_detected'] and result.get('should_notify', False):
@@ -81,101 +204,335 @@ async def detect_fall_endpoint(file: UploadFile = File(...), user_id: str = "def
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.websocket("/ws/fall-detection/{user_id}")
-async def websocket_fall_detection(websocket: WebSocket, user_id: str):
+async def websocket_fall_detection(
+    websocket: WebSocket,
+    user_id: str,
+    protocol: str = "json",
+    frame_every: Optional[int] = None,
+    tier: Optional[str] = None
+):
     """
     WebSocket endpoint for real-time fall detection with camera stream
+    
+    protocol=json sends each result as JSON with a base64 annotated frame.
+    protocol=binary sends compact records (see services.result_codec) and
+    only attaches the annotated JPEG to every frame_every-th result
+    (never by default).
+    tier selects the pose model (lite/full/heavy) for this stream; a tier
+    this node cannot load runs at the default one instead.
+    Frames the adaptive sampler skips are answered with the last result,
+    flagged as skipped.
+    Frames may carry a header with a sequence number and capture time
+    (see services.frame_ingest); the sequence number is echoed back in
+    the result.
     """
+    if protocol not in ("json", "binary") or not _is_valid_tier(tier):
+        await websocket.close(code=1003)
+        return
+    
+    binary = protocol == "binary"
+    if frame_every is None:
+        frame_every = 0 if binary else 1
+    processed_count = 0
+    
     await websocket.accept()
     active_connections.append(websocket)
+    stream = metrics.stream(user_id, 'ws_fall_detection')
+    
+    # Keep only the newest frame so results never lag behind the camera
+    frames = LatestFrameReceiver(websocket, stream)
+    frames.start()
+    sampler = FrameSampler()
     
     try:
         while True:
-            # Receive frame data
-            data = await websocket.receive_bytes()
+            # Take the freshest frame, dropping any that arrived meanwhile
+            data, seq, capture_ts = parse_frame(await frames.next_frame())
+            
+            # Skip inference on static scenes, replaying the last result
+            if not await _should_sample(sampler, data) and sampler.last_result is not None:
+                stream.skipped.inc()
+                result = sampler.skipped_result()
+                result['seq'] = seq
+                if binary:
+                    await websocket.send_bytes(encode_result(result))
+                else:
+                    await websocket.send_json(_result_json(result, None))
+                continue
+            
+            # Only render and encode the annotated frame when it will be sent
+            with_frame = frame_every > 0 and processed_count % frame_every == 0
             
-            # Decode frame
-            nparr = np.frombuffer(data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Decode frame and detect fall in the next inference batch
+            result = await batch_scheduler.detect_fall(
+                data, user_id, encode_frame=with_frame, tier=tier, capture_ts=capture_ts
+            )
             
-            if frame is not None:
-                # Detect fall
-                result = fall_detector.detect_fall(frame, user_id)
+            if result is not None:
+                processed_count += 1
+                stream.record_result(result)
+                sampler.update(result)
+                result['seq'] = seq
+                frame_jpeg = result.get('processed_frame')
                 
                 # Send notification if fall detected
                 if result['fall_detected'] and result.get('should_notify', False):
                     await notification_service.send_fall_notification(user_id, result)
                 
                 # Send result back to client
-                await websocket.send_json({
-                    'fall_detected': result['fall_detected'],
-                    'confidence': result['confidence'],
-                    'angle': result['angle'],
-                    'velocity': result['velocity'],
-                    'timestamp': result['timestamp'],
-                    'landmarks': result['landmarks'],
-                    'processed_frame': _encode_frame_to_base64(result['processed_frame'])
-                })
+                if binary:
+                    await websocket.send_bytes(encode_result(result, frame_jpeg))
+                else:
+                    await websocket.send_json(_result_json(result, frame_jpeg))
                 
     except WebSocketDisconnect:
         active_connections.remove(websocket)
-        fall_detector.reset_person(user_id)
-        logger.info(f"WebSocket disconnected for user {user_id}")
+        await inference_pool.reset_person(user_id)
+        logger.info(
+            f"WebSocket disconnected for user {user_id} "
+            f"({frames.dropped_count}/{frames.received_count} stale frames dropped, "
+            f"{sampler.skipped_count} skipped by sampling)"
+        )
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
         if websocket in active_connections:
             active_connections.remove(websocket)
+    finally:
+        await frames.stop()
 
 @app.post("/api/v1/reset-detector/{user_id}")
 async def reset_detector(user_id: str):
     """
     Reset fall detector for specific user
     """
-    fall_detector.reset_person(user_id)
+    await inference_pool.reset_person(user_id)
+    rest_samplers.remove(user_id)
+    landmark_scorer.reset_person(user_id)
     return {"message": f"Detector reset for user {user_id}"}
 
-@app.websocket("/ws/camera-stream/{user_id}")
-async def websocket_camera_stream(websocket: WebSocket, user_id: str):
+@app.get("/api/v1/sessions")
+async def get_sessions():
     """
-    WebSocket endpoint for real-time camera streaming with fall detection overlay
+    Get pose session counts across inference workers
+    """
+    stats = await inference_pool.get_session_stats()
+    stats['batching'] = batch_scheduler.get_stats()
+    stats['landmark_scoring'] = landmark_scorer.get_person_state_stats()
+    return stats
+
+@app.post("/api/v1/score-landmarks")
+async def score_landmarks_endpoint(request: Request, user_id: str = "default", notify: bool = True):
+    """
+    Detect falls from pre-computed pose landmarks
+    
+    The body is a packed landmark batch of one or more frames (see
+    services.landmark_codec). Only fall scoring runs, no image decode or
+    pose inference. notify=false skips backend notifications, e.g. for
+    edge clients that upload their own fall events.
+    
+    Batches of more than LANDMARK_MAX_BATCH_FRAMES frames are refused with
+    413, and frames with impossible landmark counts, non-finite values or
+    a capture time more than CAPTURE_TS_MAX_SKEW_SECONDS from server time
+    with 422.
+    """
+    body = await _read_landmark_batch(request)
+    try:
+        records = decode_landmark_batch(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(records) > settings.LANDMARK_MAX_BATCH_FRAMES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.LANDMARK_MAX_BATCH_FRAMES} frames per batch")
+    try:
+        validate_landmark_batch(records)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        results = await asyncio.to_thread(
+            _score_landmark_records, records, user_id, metrics.stream(user_id, 'landmarks_rest')
+        )
+        
+        if notify:
+            await _notify_falls(user_id, results)
+        
+        return {'results': [_landmark_result_json(result) for result in results]}
+        
+    except Exception as e:
+        logger.error(f"Error scoring landmarks: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.websocket("/ws/landmarks/{user_id}")
+async def websocket_landmarks(websocket: WebSocket, user_id: str, protocol: str = "binary", notify: bool = True):
+    """
+    WebSocket endpoint for fall detection from pre-computed pose landmarks
+    
+    Each message is a packed landmark batch (see services.landmark_codec)
+    and is answered with one result per frame: concatenated binary result
+    records without landmarks (protocol=binary) or a JSON list.
+    Every frame is scored in order, none are dropped, so temporal
+    features stay intact. A batch over LANDMARK_MAX_BATCH_FRAMES frames
+    closes the connection with 1009, an invalid one with 1007.
     """
+    if protocol not in ("json", "binary"):
+        await websocket.close(code=1003)
+        return
+    
     await websocket.accept()
     active_connections.append(websocket)
+    stream = metrics.stream(user_id, 'ws_landmarks')
     
     try:
         while True:
-            # Receive frame data
             data = await websocket.receive_bytes()
             
-            # Decode frame
-            nparr = np.frombuffer(data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            try:
+                records = decode_landmark_batch(data)
+                if len(records) <= settings.LANDMARK_MAX_BATCH_FRAMES:
+                    validate_landmark_batch(records)
+            except ValueError as e:
+                logger.error(f"Invalid landmark batch from user {user_id}: {str(e)}")
+                await websocket.close(code=1007)
+                break
+            if len(records) > settings.LANDMARK_MAX_BATCH_FRAMES:
+                logger.error(f"Landmark batch of {len(records)} frames from user {user_id} is too large")
+                await websocket.close(code=1009)
+                break
+            
+            results = await asyncio.to_thread(_score_landmark_records, records, user_id, stream)
+            
+            if notify:
+                await _notify_falls(user_id, results)
             
-            if frame is not None:
-                # Process frame with fall detection and overlay
-                processed_frame = camera_service.process_frame_with_overlay(frame, user_id)
+            if protocol == "binary":
+                await websocket.send_bytes(b''.join(
+                    encode_result(dict(result, landmarks=empty_landmarks())) for result in results
+                ))
+            else:
+                await websocket.send_json([_landmark_result_json(result) for result in results])
                 
-                # Encode processed frame back to bytes
-                _, buffer = cv2.imencode('.jpg', processed_frame)
-                processed_bytes = buffer.tobytes()
+    except WebSocketDisconnect:
+        logger.info(f"Landmark stream disconnected for user {user_id}")
+    except Exception as e:
+        logger.error(f"Landmark stream error: {str(e)}")
+    finally:
+        if websocket in active_connections:
+            active_connections.remove(websocket)
+
+@app.websocket("/ws/camera-stream/{user_id}")
+async def websocket_camera_stream(websocket: WebSocket, user_id: str, tier: Optional[str] = None):
+    """
+    WebSocket endpoint for real-time camera streaming with fall detection overlay
+    
+    Frames the adaptive sampler skips are echoed back without an overlay.
+    A frame header (see services.frame_ingest) is echoed back in front of
+    the processed JPEG.
+    """
+    if not _is_valid_tier(tier):
+        await websocket.close(code=1003)
+        return
+    
+    await websocket.accept()
+    active_connections.append(websocket)
+    stream = metrics.stream(user_id, 'ws_camera_stream')
+    
+    # Keep only the newest frame so results never lag behind the camera
+    frames = LatestFrameReceiver(websocket, stream)
+    frames.start()
+    sampler = FrameSampler()
+    
+    try:
+        while True:
+            # Take the freshest frame, dropping any that arrived meanwhile
+            received = await frames.next_frame()
+            data, seq, capture_ts = parse_frame(received)
+            
+            # Skip inference on static scenes
+            if not await _should_sample(sampler, data):
+                stream.skipped.inc()
+                await websocket.send_bytes(received)
+                continue
+            
+            # Decode frame, add fall detection overlay and re-encode in the next inference batch
+            processed_bytes = await batch_scheduler.process_frame_with_overlay(
+                data, user_id, tier=tier, capture_ts=capture_ts
+            )
+            
+            if processed_bytes is not None:
+                stream.inferred.inc()
                 
-                # Send processed frame back to client
+                # Send processed frame back to client, behind the header it came with
+                if seq is not None:
+                    processed_bytes = received[:FRAME_HEADER.size] + processed_bytes
                 await websocket.send_bytes(processed_bytes)
                 
     except WebSocketDisconnect:
         active_connections.remove(websocket)
-        camera_service.cleanup_user(user_id)
-        logger.info(f"Camera stream disconnected for user {user_id}")
+        await inference_pool.cleanup_user(user_id)
+        logger.info(
+            f"Camera stream disconnected for user {user_id} "
+            f"({frames.dropped_count}/{frames.received_count} stale frames dropped, "
+            f"{sampler.skipped_count} skipped by sampling)"
+        )
     except Exception as e:
         logger.error(f"Camera stream error: {str(e)}")
         if websocket in active_connections:
             active_connections.remove(websocket)
+    finally:
+        await frames.stop()
+
+@app.post("/api/v1/admin/profile")
+async def profile_service(
+    seconds: float = 10.0,
+    interval_ms: float = 5.0,
+    memory: bool = False,
+    format: str = "collapsed"
+):
+    """
+    Profile the API process and every inference worker under live load
+    
+    Samples all threads' stacks every interval_ms for seconds (capped at
+    PROFILER_MAX_SECONDS), with memory=true also tracing allocations.
+    format=collapsed returns collapsed stacks rooted at the process name,
+    ready for flamegraph.pl or speedscope; format=json returns each
+    process's profile with samples per component (PoseDetector,
+    FallDetector, CameraService, decode, encode, ...) and, with memory,
+    allocation totals. Only available with ENABLE_PROFILER=true.
+    """
+    if not settings.ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    seconds = min(max(seconds, 0.1), settings.PROFILER_MAX_SECONDS)
+    interval = max(interval_ms, 1.0) / 1000.0
+    
+    async with profile_lock:
+        logger.info(f"Profiling for {seconds:.1f}s (interval {interval * 1000:.0f} ms, memory {memory})")
+        api_profiler = SamplingProfiler(seconds, interval, memory)
+        api_profiler.start()
+        try:
+            await inference_pool.start_profiler(seconds, interval, memory)
+            await asyncio.sleep(seconds)
+        finally:
+            worker_profiles = await inference_pool.stop_profiler()
+            api_profile = api_profiler.stop()
+    
+    profiles = {'api': api_profile}
+    for index, worker_profile in enumerate(worker_profiles):
+        profiles[f'worker-{index}'] = worker_profile
+    
+    if format == "collapsed":
+        return PlainTextResponse(collapse_profiles(profiles))
+    return profiles
 
 @app.post("/api/v1/start-camera-detection/{user_id}")
 async def start_camera_detection(user_id: str):
     """
     Start camera-based fall detection for a user
     """
-    camera_service.start_detection(user_id)
+    await inference_pool.start_detection(user_id)
     return {"message": f"Camera detection started for user {user_id}"}
 
 @app.post("/api/v1/stop-camera-detection/{user_id}")
@@ -183,13 +540,127 @@ async def stop_camera_detection(user_id: str):
     """
     Stop camera-based fall detection for a user
     """
-    camera_service.stop_detection(user_id)
+    await inference_pool.stop_detection(user_id)
     return {"message": f"Camera detection stopped for user {user_id}"}
 
-def _encode_frame_to_base64(frame: np.ndarray) -> str:
-    """Encode frame to base64 string"""
-    _, buffer = cv2.imencode('.jpg', frame)
-    return base64.b64encode(buffer).decode('utf-8')
+async def _warm_up() -> Dict:
+    """
+    Warm up the inference workers for the default model tier, and the lite
+    tier if the load governor may switch streams to it. With warm-up
+    disabled the workers are only spawned.
+    """
+    tiers = []
+    if settings.WARMUP_ENABLED:
+        tiers.append(settings.POSE_MODEL_TIER)
+        if settings.GOVERNOR_ENABLED and LoadGovernor.LITE_TIER not in tiers:
+            tiers.append(LoadGovernor.LITE_TIER)
+    
+    start = time.monotonic()
+    try:
+        workers = await inference_pool.warm_up(tiers, settings.WARMUP_FRAMES)
+    except Exception as e:
+        logger.exception("Warm-up of inference workers failed")
+        return {'ready': False, 'error': str(e)}
+    
+    seconds = round(time.monotonic() - start, 3)
+    ready = all(settings.POSE_MODEL_TIER not in worker['errors'] for worker in workers)
+    if ready:
+        logger.info(f"Warmed up {len(workers)} inference workers for tiers {tiers} in {seconds}s")
+    else:
+        logger.error(f"Inference workers failed to warm up the {settings.POSE_MODEL_TIER} pose model")
+    
+    # Requests for a tier that failed fall back to the default tier rather
+    # than fail in the worker on every frame
+    batch_scheduler.available_tiers -= {tier for worker in workers for tier in worker['errors']}
+    
+    # The governor moves every stream at once, so it must never move them
+    # onto a tier that cannot load (e.g. an offline node without the model)
+    governor = batch_scheduler.governor
+    if governor.enabled and LoadGovernor.LITE_TIER not in batch_scheduler.available_tiers:
+        governor.enabled = False
+        logger.error(f"The {LoadGovernor.LITE_TIER} pose model failed to load, disabling the load governor")
+    return {
+        'ready': ready,
+        'tiers': tiers,
+        'seconds': seconds,
+        'workers': workers,
+        'available_tiers': sorted(batch_scheduler.available_tiers),
+        'governor_enabled': governor.enabled
+    }
+
+def _readiness() -> Dict:
+    """Readiness state from the warm-up task"""
+    if warm_up_task is None or not warm_up_task.done():
+        return {'ready': False, 'status': 'warming up'}
+    if warm_up_task.cancelled():
+        return {'ready': False, 'status': 'stopped'}
+    report = warm_up_task.result()
+    return dict(report, status='ready' if report['ready'] else 'failed')
+
+async def _should_sample(sampler: FrameSampler, data: bytes) -> bool:
+    """Run a sampler's motion gate, which decodes the frame, off the event loop"""
+    if not sampler.enabled:
+        return sampler.should_sample(data)
+    return await asyncio.to_thread(sampler.should_sample, data)
+
+async def _read_landmark_batch(request: Request) -> bytes:
+    """Read a landmark batch body, refusing with 413 once it exceeds the frame cap"""
+    limit = LANDMARK_BATCH_HEADER.size + settings.LANDMARK_MAX_BATCH_FRAMES * LANDMARK_RECORD.itemsize
+    too_large = HTTPException(status_code=413, detail=f"At most {settings.LANDMARK_MAX_BATCH_FRAMES} frames per batch")
+    
+    if int(request.headers.get('content-length') or 0) > limit:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+def _score_landmark_records(records: np.ndarray, user_id: str, stream: StreamMetrics) -> List[Dict]:
+    """Score validated landmark records in order; runs in a thread"""
+    results = []
+    with landmark_lock:
+        stream.received.inc(len(records))
+        for record in records:
+            landmarks = record['points'] if record['landmarks'] else empty_landmarks()
+            capture_ts = float(record['capture_ts']) or None
+            frame_shape = (int(record['height']), int(record['width']))
+            
+            with _scoring_timer.time():
+                result = landmark_scorer.score_landmarks(landmarks, frame_shape, user_id, capture_ts)
+            stream.record_result(result)
+            result['seq'] = int(record['seq'])
+            results.append(result)
+    return results
+
+async def _notify_falls(user_id: str, results: List[Dict]):
+    """Send notifications for scored results that call for one"""
+    for result in results:
+        if result['fall_detected'] and result.get('should_notify', False):
+            await notification_service.send_fall_notification(user_id, result)
+
+def _landmark_result_json(result: Dict) -> Dict:
+    """Build the JSON result for a scored landmark frame, without echoing landmarks"""
+    return {key: value for key, value in result.items() if key != 'landmarks'}
+
+def _result_json(result: Dict, frame_jpeg: Optional[bytes]) -> Dict:
+    """Build the JSON websocket message for a detection result"""
+    return {
+        'fall_detected': result['fall_detected'],
+        'confidence': result['confidence'],
+        'angle': result['angle'],
+        'velocity': result['velocity'],
+        'timestamp': result['timestamp'],
+        'seq': result.get('seq'),
+        'skipped': result.get('skipped', False),
+        'landmarks': landmarks_to_dicts(result['landmarks']),
+        'processed_frame': base64.b64encode(frame_jpeg).decode('utf-8') if frame_jpeg else None
+    }
+
+def _is_valid_tier(tier: Optional[str]) -> bool:
+    """Check an optional model tier parameter"""
+    return tier is None or tier in settings.POSE_MODEL_TIERS
 
 if __name__ == "__main__":
     import uvicorn
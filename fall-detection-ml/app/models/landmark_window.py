@@ -0,0 +1,97 @@
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+import numpy as np
+
+
+class LandmarkWindow:
+    """
+    Ring buffer of per-frame body measurements (time, center height, angle
+    and speed) for a person's last `size` frames, with the windowed fall
+    features derived from them. Each push updates the features
+    incrementally in O(1) amortized time:
+
+    - peak downward velocity of the body center over the window, tracked
+      with a monotonic deque (sliding maximum)
+    - angle change: the current body angle minus the most upright angle
+      in the window, tracked the same way (sliding minimum)
+    - stillness: mean body center speed over the last `still_frames`
+      frames, kept as a running sum
+    """
+
+    def __init__(self, size: int = 30, still_frames: int = 10):
+        self.size = max(2, size)
+        self.still_frames = max(1, min(still_frames, self.size))
+
+        self.timestamps = np.zeros(self.size, dtype=np.float64)
+        self.centers = np.zeros(self.size, dtype=np.float32)
+        self.angles = np.zeros(self.size, dtype=np.float32)
+        self.speeds = np.zeros(self.size, dtype=np.float32)
+
+        # Total frames pushed; frame n lives at slot n % size
+        self.count = 0
+
+        # (frame number, value) pairs for the sliding extremes
+        self._velocity_peaks: Deque[Tuple[int, float]] = deque()
+        self._angle_lows: Deque[Tuple[int, float]] = deque()
+        self._speed_sum = 0.0
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def push(self, timestamp: float, center_y: float, angle: float) -> Dict:
+        """
+        Add a frame and get the windowed features including it
+        """
+        frame = self.count
+        slot = frame % self.size
+
+        velocity = 0.0
+        if frame > 0:
+            prev = (frame - 1) % self.size
+            time_diff = timestamp - self.timestamps[prev]
+            if time_diff > 0:
+                velocity = (center_y - self.centers[prev]) / time_diff
+
+        # Drop the speed leaving the stillness window before overwriting it
+        if frame >= self.still_frames:
+            self._speed_sum -= self.speeds[(frame - self.still_frames) % self.size]
+
+        self.timestamps[slot] = timestamp
+        self.centers[slot] = center_y
+        self.angles[slot] = angle
+        self.speeds[slot] = abs(velocity)
+        self._speed_sum += abs(velocity)
+        self.count += 1
+
+        oldest = frame - self.size + 1
+        self._slide(self._velocity_peaks, frame, velocity, oldest, keep_max=True)
+        self._slide(self._angle_lows, frame, angle, oldest, keep_max=False)
+
+        return {
+            'velocity': velocity,
+            'peak_velocity': self._velocity_peaks[0][1],
+            'angle_change': angle - self._angle_lows[0][1],
+            'stillness': self._speed_sum / min(self.count, self.still_frames)
+        }
+
+    def clear(self):
+        """
+        Forget all frames
+        """
+        self.count = 0
+        self._velocity_peaks.clear()
+        self._angle_lows.clear()
+        self._speed_sum = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.centers.nbytes + self.angles.nbytes + self.speeds.nbytes
+
+    @staticmethod
+    def _slide(extremes: Deque[Tuple[int, float]], frame: int, value: float, oldest: int, keep_max: bool):
+        while extremes and (extremes[-1][1] <= value if keep_max else extremes[-1][1] >= value):
+            extremes.pop()
+        extremes.append((frame, value))
+        while extremes[0][0] < oldest:
+            extremes.popleft()
@@ -0,0 +1,103 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+# Pose landmarks are kept as one (33, 4) float32 array per frame with
+# columns x, y (pixels), z and visibility, indexed by MediaPipe landmark id
+NUM_LANDMARKS = 33
+X, Y, Z, VISIBILITY = range(4)
+LANDMARK_DTYPE = np.float32
+
+VISIBILITY_THRESHOLD = 0.5
+
+# Define key points for fall detection
+KEY_POINTS = {
+    'NOSE': 0,
+    'LEFT_SHOULDER': 11,
+    'RIGHT_SHOULDER': 12,
+    'LEFT_HIP': 23,
+    'RIGHT_HIP': 24,
+    'LEFT_KNEE': 25,
+    'RIGHT_KNEE': 26,
+    'LEFT_ANKLE': 27,
+    'RIGHT_ANKLE': 28
+}
+
+_SHOULDERS = [KEY_POINTS['LEFT_SHOULDER'], KEY_POINTS['RIGHT_SHOULDER']]
+_HIPS = [KEY_POINTS['LEFT_HIP'], KEY_POINTS['RIGHT_HIP']]
+
+
+def empty_landmarks() -> np.ndarray:
+    """
+    Landmark array for a frame where no person was detected
+    """
+    return np.empty((0, 4), dtype=LANDMARK_DTYPE)
+
+
+def landmarks_to_dicts(landmarks: np.ndarray) -> List[Dict]:
+    """
+    Convert a landmark array to the list of dicts returned by the API
+    """
+    return [
+        {
+            'id': idx,
+            'x': int(x),
+            'y': int(y),
+            'z': float(z),
+            'visibility': float(visibility)
+        }
+        for idx, (x, y, z, visibility) in enumerate(landmarks.tolist())
+    ]
+
+
+def body_angle(landmarks: np.ndarray) -> float:
+    """
+    Calculate the angle of the body relative to the vertical axis, in degrees
+    """
+    if len(landmarks) == 0:
+        return 0.0
+
+    shoulder_center = landmarks[_SHOULDERS, X:Y + 1].mean(axis=0)
+    hip_center = landmarks[_HIPS, X:Y + 1].mean(axis=0)
+    body_vector = np.abs(shoulder_center - hip_center)
+
+    return float(np.degrees(np.arctan2(body_vector[0], body_vector[1])))
+
+
+def visible_points(landmarks: np.ndarray) -> np.ndarray:
+    """
+    (x, y) of the landmarks visible enough to be trusted
+    """
+    if len(landmarks) == 0:
+        return landmarks[:, X:Y + 1]
+    return landmarks[landmarks[:, VISIBILITY] > VISIBILITY_THRESHOLD, X:Y + 1]
+
+
+def bounding_box(landmarks: np.ndarray) -> Optional[Dict]:
+    """
+    Get bounding box of the visible landmarks
+    """
+    points = visible_points(landmarks)
+    if len(points) == 0:
+        return None
+
+    x_min, y_min = points.min(axis=0).tolist()
+    x_max, y_max = points.max(axis=0).tolist()
+
+    return {
+        'x_min': x_min,
+        'y_min': y_min,
+        'x_max': x_max,
+        'y_max': y_max,
+        'width': x_max - x_min,
+        'height': y_max - y_min
+    }
+
+
+def centroid(landmarks: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Mean (x, y) of the visible landmarks
+    """
+    points = visible_points(landmarks)
+    if len(points) == 0:
+        return None
+    return points.mean(axis=0)
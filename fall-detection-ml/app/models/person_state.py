@@ -0,0 +1,52 @@
+import sys
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .landmark_window import LandmarkWindow
+
+# Detected falls remembered per person, as (timestamp, confidence)
+FALL_HISTORY_SIZE = 16
+
+
+class PersonState:
+    """
+    Temporal state kept between frames for one tracked person
+    """
+
+    __slots__ = ('timestamp', 'bbox', 'angle', 'last_notification_time', 'fall_history', 'window')
+
+    def __init__(self, window_size: int = 30, still_frames: int = 10):
+        self.timestamp: Optional[float] = None
+        self.bbox: Optional[Dict] = None
+        self.angle = 0.0
+        self.last_notification_time: Optional[float] = None
+        self.fall_history: Deque[Tuple[float, float]] = deque(maxlen=FALL_HISTORY_SIZE)
+        self.window = LandmarkWindow(window_size, still_frames)
+
+    @property
+    def has_position(self) -> bool:
+        return self.timestamp is not None
+
+    def update_position(self, timestamp: float, bbox: Optional[Dict], angle: float):
+        """
+        Remember where the person was in the latest frame
+        """
+        self.timestamp = timestamp
+        self.bbox = bbox
+        self.angle = angle
+
+    def record_fall(self, timestamp: float, confidence: float):
+        """
+        Remember a detected fall
+        """
+        self.fall_history.append((timestamp, confidence))
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by this record
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.fall_history)
+        size += len(self.fall_history) * sys.getsizeof((0.0, 0.0))
+        if self.bbox is not None:
+            size += sys.getsizeof(self.bbox)
+        return size + self.window.nbytes
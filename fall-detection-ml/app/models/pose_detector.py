@@ -1,119 +1,179 @@
 import cv2
-import mediapipe as mp
+import importlib.util
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+import os
+from typing import Dict, Optional, Tuple
+
+from . import landmarks as landmark_utils
+from ..services.metrics import metrics
+
+_preprocess_timer = metrics.stage_seconds.labels('preprocess')
+_inference_timer = metrics.stage_seconds.labels('inference')
+
+# Pose landmark models by complexity. MediaPipe only ships the full one and
+# downloads the others the first time a graph needs them.
+_POSE_MODEL_FILES = {0: 'pose_landmark_lite.tflite', 1: 'pose_landmark_full.tflite', 2: 'pose_landmark_heavy.tflite'}
+
+def pose_model_available(model_complexity: int) -> bool:
+    """Check whether a pose model is installed, so building its graph needs no download"""
+    # Located without importing MediaPipe (see PoseDetector.__init__)
+    spec = importlib.util.find_spec('mediapipe')
+    if spec is None or spec.origin is None:
+        return False
+    path = os.path.join(os.path.dirname(spec.origin), 'modules', 'pose_landmark', _POSE_MODEL_FILES[model_complexity])
+    return os.path.exists(path)
 
 class PoseDetector:
-    def __init__(self, static_image_mode=False, model_complexity=1, min_detection_confidence=0.7):
-        self.mp_pose = mp.solutions.pose
-        self.mp_draw = mp.solutions.drawing_utils
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=static_image_mode,
+    KEY_POINTS = landmark_utils.KEY_POINTS
+    
+    def __init__(self, static_image_mode=False, model_complexity=1, min_detection_confidence=0.7,
+                 min_tracking_confidence=0.5, max_dimension=0, roi_margin=0.25, roi_fallback_frames=5):
+        self.model_complexity = model_complexity
+        # Frames (or ROI crops) whose longest side exceeds max_dimension are
+        # downscaled before inference; 0 keeps the full resolution
+        self.max_dimension = max_dimension
+        self.roi_margin = roi_margin
+        # When the ROI crop misses the person, the whole frame is only tried
+        # again once this many frames have passed since it last was
+        self.roi_fallback_frames = max(1, roi_fallback_frames)
+        self._frame_index = 0
+        self._last_full_frame: Optional[int] = None
+        self._pose_options = dict(
             model_complexity=model_complexity,
-            min_detection_confidence=min_detection_confidence
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
         )
-        
-        # Define key points for fall detection
-        self.KEY_POINTS = {
-            'NOSE': 0,
-            'LEFT_SHOULDER': 11,
-            'RIGHT_SHOULDER': 12,
-            'LEFT_HIP': 23,
-            'RIGHT_HIP': 24,
-            'LEFT_KNEE': 25,
-            'RIGHT_KNEE': 26,
-            'LEFT_ANKLE': 27,
-            'RIGHT_ANKLE': 28
-        }
+        # Imported here so processes that never build a graph (the API
+        # process only scores landmarks) do not pay for loading MediaPipe
+        import mediapipe as mp
+        self.mp_pose = mp.solutions.pose
+        self.pose = self.mp_pose.Pose(static_image_mode=static_image_mode, **self._pose_options)
+        # Crops get a tracking graph of their own, built on first use, so
+        # no graph ever tracks across crop and full-frame coordinates
+        self._roi_pose = None
     
-    def detect_pose(self, frame: np.ndarray) -> Tuple[bool, List[Dict], np.ndarray]:
+    def detect_pose(self, frame: np.ndarray, roi: Optional[Dict] = None) -> Tuple[bool, np.ndarray]:
         """
-        Detect pose in frame and return landmarks
+        Detect pose in frame and return landmarks as a (33, 4) array of
+        x, y (pixels), z and visibility. The frame is not modified.
+        
+        If roi (a bounding box as returned by get_person_bounding_box) is
+        given, inference runs on that region plus a margin first. When no
+        person is found there it falls back to the whole frame, at most
+        once every roi_fallback_frames frames. With ROI cropping the main
+        graph should be in static image mode: it then only finds the person
+        in whole frames, and has no track that goes stale between uses.
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(rgb_frame)
+        self._frame_index += 1
+        if roi is not None:
+            if self._roi_pose is None:
+                self._roi_pose = self.mp_pose.Pose(static_image_mode=False, **self._pose_options)
+            success, landmarks = self._detect_in_region(frame, self._expand_roi(roi, frame.shape), self._roi_pose)
+            if success or (self._last_full_frame is not None
+                           and self._frame_index - self._last_full_frame < self.roi_fallback_frames):
+                return success, landmarks
         
-        landmarks = []
-        success = False
+        self._last_full_frame = self._frame_index
+        h, w, _ = frame.shape
+        return self._detect_in_region(frame, (0, 0, w, h), self.pose)
+    
+    def _detect_in_region(self, frame: np.ndarray, region: Tuple[int, int, int, int],
+                          pose) -> Tuple[bool, np.ndarray]:
+        x_min, y_min, x_max, y_max = region
+        image = frame[y_min:y_max, x_min:x_max]
+        region_h, region_w = image.shape[:2]
         
-        if results.pose_landmarks:
-            success = True
-            h, w, _ = frame.shape
+        with _preprocess_timer.time():
+            # Downscale for inference; landmarks come back normalized to the
+            # region, so they map back to full resolution regardless
+            longest_side = max(region_h, region_w)
+            if self.max_dimension and longest_side > self.max_dimension:
+                scale = self.max_dimension / longest_side
+                image = cv2.resize(
+                    image,
+                    (max(1, round(region_w * scale)), max(1, round(region_h * scale))),
+                    interpolation=cv2.INTER_AREA
+                )
             
-            for idx, landmark in enumerate(results.pose_landmarks.landmark):
-                landmarks.append({
-                    'id': idx,
-                    'x': int(landmark.x * w),
-                    'y': int(landmark.y * h),
-                    'z': landmark.z,
-                    'visibility': landmark.visibility
-                })
-            
-            # Draw pose landmarks
-            self.mp_draw.draw_landmarks(
-                frame, 
-                results.pose_landmarks, 
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_draw.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=2),
-                self.mp_draw.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-            )
+            rgb_frame = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        
+        with _inference_timer.time():
+            results = pose.process(rgb_frame)
         
-        return success, landmarks, frame
+        if not results.pose_landmarks:
+            return False, landmark_utils.empty_landmarks()
+        
+        landmarks = np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in results.pose_landmarks.landmark],
+            dtype=landmark_utils.LANDMARK_DTYPE
+        )
+        landmarks[:, landmark_utils.X] = landmarks[:, landmark_utils.X] * region_w + x_min
+        landmarks[:, landmark_utils.Y] = landmarks[:, landmark_utils.Y] * region_h + y_min
+        
+        return True, landmarks
     
-    def get_body_angle(self, landmarks: List[Dict]) -> float:
+    def _expand_roi(self, roi: Dict, frame_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
         """
-        Calculate the angle of the body relative to the ground
+        Grow a bounding box by the ROI margin and clip it to the frame
         """
-        if not landmarks:
-            return 0.0
+        h, w = frame_shape[:2]
+        margin = self.roi_margin * max(roi['width'], roi['height'])
         
-        # Get shoulder and hip points
-        left_shoulder = landmarks[self.KEY_POINTS['LEFT_SHOULDER']]
-        right_shoulder = landmarks[self.KEY_POINTS['RIGHT_SHOULDER']]
-        left_hip = landmarks[self.KEY_POINTS['LEFT_HIP']]
-        right_hip = landmarks[self.KEY_POINTS['RIGHT_HIP']]
+        x_min = int(max(0, roi['x_min'] - margin))
+        y_min = int(max(0, roi['y_min'] - margin))
+        x_max = int(min(w, roi['x_max'] + margin))
+        y_max = int(min(h, roi['y_max'] + margin))
         
-        # Calculate center points
-        shoulder_center = {
-            'x': (left_shoulder['x'] + right_shoulder['x']) / 2,
-            'y': (left_shoulder['y'] + right_shoulder['y']) / 2
-        }
+        if x_max <= x_min or y_max <= y_min:
+            return 0, 0, w, h
+        return x_min, y_min, x_max, y_max
+    
+    def draw_landmarks(self, frame: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Return a copy of the frame with the pose skeleton drawn on it
+        """
+        annotated = frame.copy()
+        if len(landmarks) == 0:
+            return annotated
         
-        hip_center = {
-            'x': (left_hip['x'] + right_hip['x']) / 2,
-            'y': (left_hip['y'] + right_hip['y']) / 2
-        }
+        points = landmarks[:, landmark_utils.X:landmark_utils.Y + 1].astype(np.int32).tolist()
+        visible = (landmarks[:, landmark_utils.VISIBILITY] > landmark_utils.VISIBILITY_THRESHOLD).tolist()
         
-        # Calculate body vector
-        body_vector = {
-            'x': shoulder_center['x'] - hip_center['x'],
-            'y': shoulder_center['y'] - hip_center['y']
-        }
+        for start, end in self.mp_pose.POSE_CONNECTIONS:
+            if visible[start] and visible[end]:
+                cv2.line(annotated, tuple(points[start]), tuple(points[end]), (245, 66, 230), 2)
         
-        # Calculate angle with vertical axis
-        angle = np.arctan2(abs(body_vector['x']), abs(body_vector['y']))
-        angle_degrees = np.degrees(angle)
+        for point, is_visible in zip(points, visible):
+            if is_visible:
+                cv2.circle(annotated, tuple(point), 2, (245, 117, 66), 2)
         
-        return angle_degrees
+        return annotated
+    
+    def close(self):
+        """
+        Release the MediaPipe graphs
+        """
+        self.pose.close()
+        if self._roi_pose is not None:
+            self._roi_pose.close()
+    
+    @staticmethod
+    def get_body_angle(landmarks: np.ndarray) -> float:
+        """
+        Calculate the angle of the body relative to the ground
+        """
+        return landmark_utils.body_angle(landmarks)
     
-    def get_person_bounding_box(self, landmarks: List[Dict]) -> Dict:
+    @staticmethod
+    def get_person_bounding_box(landmarks: np.ndarray) -> Optional[Dict]:
         """
         Get bounding box of person from landmarks
         """
-        if not landmarks:
-            return None
-        
-        x_coords = [lm['x'] for lm in landmarks if lm['visibility'] > 0.5]
-        y_coords = [lm['y'] for lm in landmarks if lm['visibility'] > 0.5]
-        
-        if not x_coords or not y_coords:
-            return None
-        
-        return {
-            'x_min': min(x_coords),
-            'y_min': min(y_coords),
-            'x_max': max(x_coords),
-            'y_max': max(y_coords),
-            'width': max(x_coords) - min(x_coords),
-            'height': max(y_coords) - min(y_coords)
-        }
\ No newline at end of file
+        return landmark_utils.bounding_box(landmarks)
+    
+    @staticmethod
+    def get_person_centroid(landmarks: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Get the center of the person from landmarks
+        """
+        return landmark_utils.centroid(landmarks)
\ No newline at end of file
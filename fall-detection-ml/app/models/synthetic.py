@@ -0,0 +1,111 @@
+import math
+from typing import List
+
+import cv2
+import numpy as np
+
+from .landmarks import NUM_LANDMARKS, LANDMARK_DTYPE
+
+# Joint positions of a standing person as (x, y) offsets from the feet in
+# units of body height, by MediaPipe landmark id
+_STANDING_POSE = {
+    0: (0.0, -0.93),  # nose
+    1: (-0.02, -0.95), 2: (-0.03, -0.95), 3: (-0.04, -0.95),
+    4: (0.02, -0.95), 5: (0.03, -0.95), 6: (0.04, -0.95),
+    7: (-0.06, -0.94), 8: (0.06, -0.94),
+    9: (-0.02, -0.91), 10: (0.02, -0.91),
+    11: (-0.12, -0.82), 12: (0.12, -0.82),  # shoulders
+    13: (-0.15, -0.65), 14: (0.15, -0.65),  # elbows
+    15: (-0.16, -0.50), 16: (0.16, -0.50),  # wrists
+    17: (-0.17, -0.47), 18: (0.17, -0.47),
+    19: (-0.16, -0.46), 20: (0.16, -0.46),
+    21: (-0.15, -0.48), 22: (0.15, -0.48),
+    23: (-0.08, -0.52), 24: (0.08, -0.52),  # hips
+    25: (-0.08, -0.27), 26: (0.08, -0.27),  # knees
+    27: (-0.08, -0.03), 28: (0.08, -0.03),  # ankles
+    29: (-0.09, -0.01), 30: (0.09, -0.01),
+    31: (-0.05, 0.0), 32: (0.11, 0.0)
+}
+
+# Colors (BGR) and widths, in units of body height, of the drawn figure
+_SKIN = (150, 180, 225)
+_SHIRT = (160, 60, 40)
+_TROUSERS = (60, 50, 40)
+_DARK = (30, 30, 40)
+_LIMBS = [
+    (11, 13, _SHIRT, 0.07), (13, 15, _SKIN, 0.05), (12, 14, _SHIRT, 0.07), (14, 16, _SKIN, 0.05),
+    (23, 25, _TROUSERS, 0.09), (25, 27, _TROUSERS, 0.075), (24, 26, _TROUSERS, 0.09), (26, 28, _TROUSERS, 0.075)
+]
+
+
+def synthetic_landmarks(count: int, width: int = 640, height: int = 480) -> List[np.ndarray]:
+    """
+    Landmarks of a person walking in and falling over sideways: upright
+    for the first half, tipping to horizontal over the next quarter and
+    lying still for the rest. Deterministic for a given count and size.
+    """
+    standing = np.zeros((NUM_LANDMARKS, 2), dtype=np.float64)
+    for idx, offset in _STANDING_POSE.items():
+        standing[idx] = offset
+    body_height = 0.7 * height
+
+    sequence = []
+    for i in range(count):
+        progress = i / max(1, count - 1)
+        fall = min(1.0, max(0.0, (progress - 0.5) * 4))
+        theta = fall * math.pi / 2
+        rotation = np.array([[math.cos(theta), -math.sin(theta)], [math.sin(theta), math.cos(theta)]])
+
+        feet = np.array([width * (0.3 + 0.2 * min(progress, 0.5)), height * 0.9])
+        points = standing @ rotation.T * body_height + feet
+
+        landmarks = np.empty((NUM_LANDMARKS, 4), dtype=LANDMARK_DTYPE)
+        landmarks[:, :2] = points
+        landmarks[:, 2] = 0.0
+        landmarks[:, 3] = 0.95
+        sequence.append(landmarks)
+    return sequence
+
+
+def synthetic_frames(count: int, width: int = 640, height: int = 480, seed: int = 0) -> List[np.ndarray]:
+    """
+    BGR frames of a clothed figure falling over a fixed noisy background,
+    following synthetic_landmarks. Detailed enough for MediaPipe to find
+    a person in nearly every frame, so they exercise the same detection
+    and tracking paths as a camera. Identical for a given count, size and
+    seed.
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(130, 190, size=(height, width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 3)
+    scale = 0.7 * height
+
+    def size(fraction: float) -> int:
+        return max(1, int(scale * fraction))
+
+    frames = []
+    for landmarks in synthetic_landmarks(count, width, height):
+        frame = background.copy()
+        p = landmarks[:, :2].astype(np.int32)
+        point = lambda idx: tuple(p[idx].tolist())
+
+        # Torso, limbs, hands and feet
+        cv2.fillConvexPoly(frame, p[[11, 12, 24, 23]], _SHIRT)
+        for start, end, color, width_fraction in _LIMBS:
+            cv2.line(frame, point(start), point(end), color, size(width_fraction))
+        for idx in (15, 16):
+            cv2.circle(frame, point(idx), size(0.03), _SKIN, -1)
+        for idx in (27, 28):
+            cv2.ellipse(frame, point(idx), (size(0.05), size(0.025)), 0, 0, 360, _DARK, -1)
+
+        # Neck, head with hair, eyes and mouth; the face stays upright,
+        # which is close enough for the detector
+        neck = tuple(((p[11] + p[12]) // 2).tolist())
+        cv2.line(frame, neck, point(0), _SKIN, size(0.05))
+        cv2.ellipse(frame, (p[0][0], p[0][1] - size(0.02)), (size(0.055), size(0.07)), 0, 0, 360, _SKIN, -1)
+        cv2.ellipse(frame, (p[0][0], p[0][1] - size(0.06)), (size(0.058), size(0.04)), 0, 180, 360, _DARK, -1)
+        for idx in (2, 5):
+            cv2.circle(frame, point(idx), 4, (40, 30, 30), -1)
+        cv2.line(frame, point(9), point(10), (60, 60, 150), 2)
+        frames.append(frame)
+    return frames
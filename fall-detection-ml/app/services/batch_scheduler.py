@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from ..config import settings
+from ..models.pose_detector import pose_model_available
+from .inference_pool import InferencePool, InferenceJob
+from .load_governor import LoadGovernor
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_queue_timer = metrics.stage_seconds.labels('queue')
+_total_timer = metrics.stage_seconds.labels('total')
+
+
+class _PendingFrame:
+    __slots__ = ('job', 'future', 'enqueued')
+
+    def __init__(self, job: InferenceJob, future: asyncio.Future):
+        self.job = job
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Collects frames from all active streams into micro-batches, bounded by
+    a maximum batch size and a maximum wait, and hands each batch to the
+    inference pool in one round trip per worker. Results are fanned back to
+    the caller awaiting each frame. Per-frame latency and queue depth feed
+    the load governor, which picks the pose model tier each frame runs at.
+    """
+
+    def __init__(
+        self,
+        inference_pool: InferencePool,
+        max_batch_size: int = settings.BATCH_MAX_SIZE,
+        max_wait_ms: float = settings.BATCH_MAX_WAIT_MS,
+        governor: Optional[LoadGovernor] = None
+    ):
+        self.inference_pool = inference_pool
+        self.governor = governor or LoadGovernor()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches = set()
+
+        self.in_flight = 0
+        self.batch_count = 0
+        self.frame_count = 0
+
+        # Tiers whose model this node can load without a download; warm-up
+        # also removes any tier that failed to load in a worker
+        self.available_tiers = {
+            tier for tier, complexity in settings.POSE_MODEL_TIERS.items() if pose_model_available(complexity)
+        }
+        self._fallback_logged = set()
+
+    def start(self):
+        """
+        Start collecting batches on the running event loop
+        """
+        if self._task is not None:
+            return
+
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Batch scheduler started (max batch {self.max_batch_size}, "
+            f"max wait {self.max_wait * 1000:.1f} ms)"
+        )
+
+    async def stop(self):
+        """
+        Stop the scheduler and fail any frames still waiting
+        """
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def detect_fall(self, data: bytes, user_id: str, encode_frame: bool = False,
+                          tier: Optional[str] = None, capture_ts: Optional[float] = None) -> Optional[Dict]:
+        """
+        Queue an encoded image for fall detection and wait for the result
+        """
+        tier = self.resolve_tier(tier)
+        return await self._submit(InferenceJob('detect_fall', data, user_id, encode_frame, tier, capture_ts))
+
+    async def process_frame_with_overlay(self, data: bytes, user_id: str, tier: Optional[str] = None,
+                                         capture_ts: Optional[float] = None) -> Optional[bytes]:
+        """
+        Queue an encoded image for overlay rendering and wait for the JPEG
+        """
+        tier = self.resolve_tier(tier)
+        return await self._submit(InferenceJob('overlay', data, user_id, tier=tier, capture_ts=capture_ts))
+
+    def resolve_tier(self, tier: Optional[str]) -> str:
+        """
+        Get the tier a frame runs at: the requested one if this node can
+        load it, else the default, lowered to lite by the governor under load
+        """
+        tier = tier or settings.POSE_MODEL_TIER
+        if tier not in self.available_tiers:
+            if tier not in self._fallback_logged:
+                self._fallback_logged.add(tier)
+                logger.warning(
+                    f"The {tier} pose model is not available on this node, "
+                    f"running its streams at {settings.POSE_MODEL_TIER}"
+                )
+            tier = settings.POSE_MODEL_TIER
+        return self.governor.effective_tier(tier)
+
+    async def _submit(self, job: InferenceJob):
+        if self._queue is None:
+            raise RuntimeError("Batch scheduler is not started")
+
+        future = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+
+        await self._queue.put(_PendingFrame(job, future))
+        self.governor.record_queue_depth(self.queue_depth + self.in_flight)
+
+        try:
+            return await future
+        finally:
+            latency = time.perf_counter() - started
+            self.governor.record_latency(latency)
+            _total_timer.observe(latency)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    # Still take whatever is already queued
+                    if self._queue.empty():
+                        break
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Keep collecting the next batch while this one is in the workers
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[_PendingFrame]):
+        self.in_flight += len(batch)
+        self.batch_count += 1
+        self.frame_count += len(batch)
+
+        dispatched = time.perf_counter()
+        for pending in batch:
+            _queue_timer.observe(dispatched - pending.enqueued)
+        metrics.batch_size.observe(len(batch))
+
+        try:
+            outcomes = await self.inference_pool.run_batch([pending.job for pending in batch])
+        except Exception as e:
+            logger.error(f"Error running batch: {str(e)}")
+            outcomes = [(False, e)] * len(batch)
+        finally:
+            self.in_flight -= len(batch)
+
+        for pending, (ok, value) in zip(batch, outcomes):
+            if pending.future.done():
+                continue
+            if ok:
+                pending.future.set_result(value)
+            else:
+                pending.future.set_exception(value)
+
+    def get_stats(self) -> Dict:
+        """
+        Get batching counters
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'batches': self.batch_count,
+            'frames': self.frame_count,
+            'average_batch_size': self.frame_count / self.batch_count if self.batch_count else 0.0,
+            'governor': self.governor.get_stats()
+        }
@@ -3,39 +3,50 @@ import numpy as np
 from typing import Optional
 import logging
 from datetime import datetime
-import asyncio
 
-from ..models.pose_detector import PoseDetector
+from ..models.landmarks import X, Y, VISIBILITY, VISIBILITY_THRESHOLD
 from ..services.fall_detector import FallDetector
+from ..services.metrics import metrics
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+_scoring_timer = metrics.stage_seconds.labels('scoring')
+_render_timer = metrics.stage_seconds.labels('render')
+
 class CameraService:
     def __init__(self):
-        self.pose_detector = PoseDetector()
         self.fall_detector = FallDetector()
         self.active_detections = {}  # user_id -> detection info
         
-    def process_frame_with_overlay(self, frame: np.ndarray, user_id: str) -> np.ndarray:
+    def process_frame_with_overlay(self, frame: np.ndarray, user_id: str, tier: Optional[str] = None,
+                                   capture_ts: Optional[float] = None) -> np.ndarray:
         """
-        Process frame with pose detection and fall detection overlay
+        Process frame with pose detection and fall detection overlay.
+        capture_ts is the client capture time used for temporal features.
         """
         try:
-            # Detect pose and get landmarks
-            success, landmarks, processed_frame = self.pose_detector.detect_pose(frame)
+            # Detect pose and get landmarks with this stream's tracker
+            pose_detector = self.fall_detector.get_pose_detector(user_id, tier)
+            success, landmarks = pose_detector.detect_pose(
+                frame, roi=self.fall_detector.get_inference_roi(user_id)
+            )
+            processed_frame = frame
             
             if success:
-                # Add pose landmarks overlay
-                processed_frame = self._add_pose_overlay(processed_frame, landmarks)
+                # Score the landmarks we already have instead of re-running pose detection
+                with _scoring_timer.time():
+                    fall_result = self.fall_detector.score_landmarks(landmarks, frame.shape, user_id, capture_ts)
                 
-                # Perform fall detection
-                fall_result = self.fall_detector.detect_fall(processed_frame, user_id)
-                
-                # Add fall detection overlay
-                processed_frame = self._add_fall_detection_overlay(
-                    processed_frame, fall_result
-                )
+                with _render_timer.time():
+                    # Draw the skeleton on a copy, then add pose landmarks overlay
+                    processed_frame = pose_detector.draw_landmarks(frame, landmarks)
+                    processed_frame = self._add_pose_overlay(processed_frame, landmarks)
+                    
+                    # Add fall detection overlay
+                    processed_frame = self._add_fall_detection_overlay(
+                        processed_frame, fall_result
+                    )
                 
                 # Store detection info
                 self._update_detection_info(user_id, fall_result)
@@ -46,7 +57,7 @@ class CameraService:
             logger.error(f"Error processing frame: {str(e)}")
             return frame
     
-    def _add_pose_overlay(self, frame: np.ndarray, landmarks: list) -> np.ndarray:
+    def _add_pose_overlay(self, frame: np.ndarray, landmarks: np.ndarray) -> np.ndarray:
         """
         Add pose landmarks overlay to frame
         """
@@ -64,30 +75,17 @@ class CameraService:
             (26, 28),  # right knee to ankle
         ]
         
-        for connection in connections:
-            if connection[0] < len(landmarks) and connection[1] < len(landmarks):
-                point1 = landmarks[connection[0]]
-                point2 = landmarks[connection[1]]
-                
-                if point1['visibility'] > 0.5 and point2['visibility'] > 0.5:
-                    cv2.line(
-                        frame,
-                        (int(point1['x']), int(point1['y'])),
-                        (int(point2['x']), int(point2['y'])),
-                        (0, 255, 0),
-                        2
-                    )
+        points = landmarks[:, X:Y + 1].astype(np.int32).tolist()
+        visible = (landmarks[:, VISIBILITY] > VISIBILITY_THRESHOLD).tolist()
+        
+        for start, end in connections:
+            if end < len(points) and visible[start] and visible[end]:
+                cv2.line(frame, tuple(points[start]), tuple(points[end]), (0, 255, 0), 2)
         
         # Draw key points
-        for landmark in landmarks:
-            if landmark['visibility'] > 0.5:
-                cv2.circle(
-                    frame,
-                    (int(landmark['x']), int(landmark['y'])),
-                    5,
-                    (255, 0, 0),
-                    -1
-                )
+        for point, is_visible in zip(points, visible):
+            if is_visible:
+                cv2.circle(frame, tuple(point), 5, (255, 0, 0), -1)
         
         return frame
     
@@ -1,112 +1,256 @@
 import time
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from ..models.pose_detector import PoseDetector
+from ..models.landmarks import empty_landmarks
+from ..models.person_state import PersonState
 from ..config import settings
+from .session_registry import SessionRegistry
+from .metrics import metrics
 
-class FallDetector:
+_scoring_timer = metrics.stage_seconds.labels('scoring')
+_render_timer = metrics.stage_seconds.labels('render')
+
+class PoseSession:
+    """
+    The PoseDetectors of one stream, one per model tier it has run at, so
+    the load governor switching tiers back and forth does not rebuild a
+    graph each time
+    """
+    
     def __init__(self):
-        self.pose_detector = PoseDetector()
-        self.previous_positions = {}
-        self.fall_history = {}
-        self.last_notification_time = {}
+        self.detectors: Dict[str, PoseDetector] = {}
+    
+    def close(self):
+        for pose_detector in self.detectors.values():
+            pose_detector.close()
+        self.detectors.clear()
+
+
+class FallDetector:
+    def __init__(self, max_person_states: int = settings.MAX_PERSON_STATES):
+        # One tracking-mode PoseSession per stream, so MediaPipe tracking
+        # is never fed frames from another camera
+        self.pose_sessions = SessionRegistry(
+            factory=lambda person_id: PoseSession(),
+            max_sessions=settings.MAX_POSE_SESSIONS,
+            ttl=settings.POSE_SESSION_TTL,
+            on_evict=lambda person_id, session: session.close()
+        )
+        # Temporal state per person, bounded so REST callers with ever new
+        # ids cannot grow it without limit
+        self.person_states = SessionRegistry(
+            factory=lambda person_id: PersonState(settings.FALL_WINDOW_SIZE, settings.FALL_STILLNESS_FRAMES),
+            max_sessions=max_person_states,
+            ttl=settings.PERSON_STATE_TTL
+        )
+        # Warmed-up PoseDetectors by tier, handed to the first new stream of
+        # that tier instead of building a cold one (see warm_up)
+        self._spare_detectors: Dict[str, List[PoseDetector]] = {}
         
-    def detect_fall(self, frame: np.ndarray, person_id: str = "default") -> Dict:
+    def detect_fall(self, frame: np.ndarray, person_id: str = "default", render: bool = False,
+                    tier: Optional[str] = None, capture_ts: Optional[float] = None) -> Dict:
         """
-        Detect if a person has fallen
+        Detect if a person has fallen.
+        With render=True the result also holds 'processed_frame', an
+        annotated copy of the frame. tier selects the pose model
+        (lite/full/heavy), defaulting to POSE_MODEL_TIER. capture_ts is
+        the time the client captured the frame (seconds since epoch).
         """
+        # Detect pose with this stream's own tracker
+        pose_detector = self.get_pose_detector(person_id, tier)
+        success, landmarks = pose_detector.detect_pose(frame, roi=self.get_inference_roi(person_id))
+        
+        with _scoring_timer.time():
+            result = self.score_landmarks(landmarks, frame.shape, person_id, capture_ts)
+        if render:
+            with _render_timer.time():
+                result['processed_frame'] = pose_detector.draw_landmarks(frame, landmarks)
+        return result
+    
+    def score_landmarks(self, landmarks: np.ndarray, frame_shape: Tuple[int, ...], person_id: str = "default",
+                        capture_ts: Optional[float] = None) -> Dict:
+        """
+        Detect if a person has fallen from already detected pose landmarks,
+        given as a (33, 4) array of x, y (pixels), z and visibility.
+        Temporal features use capture_ts when the client sent one, so
+        network and queueing delay do not distort them; otherwise the
+        time of processing.
+        """
+        current_time = capture_ts if capture_ts is not None else time.time()
+        
         result = {
             'fall_detected': False,
             'confidence': 0.0,
             'angle': 0.0,
             'velocity': 0.0,
-            'landmarks': [],
-            'processed_frame': frame,
-            'timestamp': datetime.utcnow().isoformat()
+            'peak_velocity': 0.0,
+            'angle_change': 0.0,
+            'stillness': 0.0,
+            'landmarks': empty_landmarks(),
+            'timestamp': datetime.utcfromtimestamp(current_time).isoformat()
         }
         
-        # Detect pose
-        success, landmarks, processed_frame = self.pose_detector.detect_pose(frame)
-        
-        if not success:
+        if len(landmarks) == 0:
             return result
         
         result['landmarks'] = landmarks
         
         # Calculate body angle
-        body_angle = self.pose_detector.get_body_angle(landmarks)
+        body_angle = PoseDetector.get_body_angle(landmarks)
         result['angle'] = body_angle
         
-        # Calculate velocity if we have previous position
-        velocity = 0.0
-        current_time = time.time()
+        bbox = PoseDetector.get_person_bounding_box(landmarks)
         
-        if person_id in self.previous_positions:
-            prev_data = self.previous_positions[person_id]
-            prev_time = prev_data['timestamp']
-            prev_bbox = prev_data['bbox']
-            
-            current_bbox = self.pose_detector.get_person_bounding_box(landmarks)
-            
-            if current_bbox and prev_bbox:
-                # Calculate center movement
-                prev_center_y = (prev_bbox['y_min'] + prev_bbox['y_max']) / 2
-                current_center_y = (current_bbox['y_min'] + current_bbox['y_max']) / 2
-                
-                time_diff = current_time - prev_time
-                if time_diff > 0:
-                    velocity = abs(current_center_y - prev_center_y) / time_diff
-        
-        result['velocity'] = velocity
+        state = self.person_states.acquire(person_id)
+        
+        # A frame captured before the last one we scored (e.g. concurrent
+        # REST uploads arriving out of order) must not rewrite history
+        in_order = not state.has_position or current_time > state.timestamp
+        
+        # Update the landmark window and its windowed features
+        window_updated = bool(bbox) and in_order
+        if window_updated:
+            center_y = (bbox['y_min'] + bbox['y_max']) / 2
+            features = state.window.push(current_time, center_y, body_angle)
+            result['velocity'] = abs(features['velocity'])
+            result['peak_velocity'] = features['peak_velocity']
+            result['angle_change'] = features['angle_change']
+            result['stillness'] = features['stillness']
         
         # Fall detection logic
         fall_confidence = 0.0
         
         # Check body angle (horizontal position)
         if body_angle > settings.FALL_THRESHOLD_ANGLE:
-            fall_confidence += 0.5
+            fall_confidence += 0.35
         
-        # Check velocity (sudden movement)
-        if velocity > settings.FALL_THRESHOLD_VELOCITY:
-            fall_confidence += 0.3
+        # Check peak downward velocity over the window (sudden drop)
+        if result['peak_velocity'] > settings.FALL_THRESHOLD_VELOCITY:
+            fall_confidence += 0.25
+        
+        # Check the body went from upright to horizontal within the window,
+        # rather than lying down all along
+        if result['angle_change'] > settings.FALL_THRESHOLD_ANGLE / 2:
+            fall_confidence += 0.2
         
         # Check if person is close to ground
-        bbox = self.pose_detector.get_person_bounding_box(landmarks)
         if bbox:
-            frame_height = frame.shape[0]
+            frame_height = frame_shape[0]
             if bbox['y_max'] > frame_height * 0.8:  # Close to bottom of frame
-                fall_confidence += 0.2
+                fall_confidence += 0.1
+        
+        # Check the person has stayed still since, judged only on windows
+        # this frame went into, so stale stillness never adds to the score
+        if (window_updated and len(state.window) >= state.window.still_frames and
+                result['stillness'] < settings.FALL_STILLNESS_VELOCITY):
+            fall_confidence += 0.1
         
         result['confidence'] = min(fall_confidence, 1.0)
         result['fall_detected'] = fall_confidence >= settings.CONFIDENCE_THRESHOLD
         
         # Update history
-        self.previous_positions[person_id] = {
-            'timestamp': current_time,
-            'bbox': bbox,
-            'angle': body_angle
-        }
+        if in_order:
+            state.update_position(current_time, bbox, body_angle)
         
         # Check if we should send notification
         if result['fall_detected']:
-            cooldown_passed = self._check_notification_cooldown(person_id)
+            state.record_fall(current_time, result['confidence'])
+            cooldown_passed = self._check_notification_cooldown(state)
             if cooldown_passed:
                 result['should_notify'] = True
-                self.last_notification_time[person_id] = current_time
+                # Cooldown runs on the server clock, whatever the client's says
+                state.last_notification_time = time.time()
         
-        result['processed_frame'] = processed_frame
         return result
     
-    def _check_notification_cooldown(self, person_id: str) -> bool:
+    def get_pose_detector(self, person_id: str, tier: Optional[str] = None) -> PoseDetector:
+        """
+        Get a stream's PoseDetector for a model tier. Each stream keeps the
+        detector of every tier it has used, so switching back to a tier
+        reuses its warm graph; if the person moved meanwhile, MediaPipe
+        loses the stale track and detects them afresh on its own.
+        """
+        tier = tier or settings.POSE_MODEL_TIER
+        
+        session = self.pose_sessions.acquire(person_id)
+        pose_detector = session.detectors.get(tier)
+        if pose_detector is None:
+            pose_detector = session.detectors[tier] = self._create_pose_detector(tier)
+        return pose_detector
+    
+    def warm_up(self, tier: str, frames: List[np.ndarray]) -> float:
+        """
+        Build a PoseDetector for a model tier and run frames through it, so
+        the first stream on that tier skips graph setup and the slow first
+        inference. The detector is kept for that stream as is: resetting
+        it would restart its graphs, undoing most of the warm-up, and
+        MediaPipe drops the synthetic person's track on the first real
+        frame anyway. Returns the seconds taken.
+        """
+        start = time.perf_counter()
+        pose_detector = self._build_pose_detector(tier)
+        roi = None
+        for frame in frames:
+            success, landmarks = pose_detector.detect_pose(frame, roi)
+            # Crop to the person as a stream would, warming the ROI graph too
+            if success and settings.INFERENCE_ROI_CROP:
+                roi = pose_detector.get_person_bounding_box(landmarks)
+        self._spare_detectors.setdefault(tier, []).append(pose_detector)
+        return time.perf_counter() - start
+    
+    def _create_pose_detector(self, tier: str) -> PoseDetector:
+        spares = self._spare_detectors.get(tier)
+        if spares:
+            return spares.pop()
+        return self._build_pose_detector(tier)
+    
+    def _build_pose_detector(self, tier: str) -> PoseDetector:
+        return PoseDetector(
+            # With ROI cropping, whole frames are only used to find the person
+            static_image_mode=settings.INFERENCE_ROI_CROP,
+            model_complexity=settings.POSE_MODEL_TIERS[tier],
+            min_detection_confidence=settings.MIN_DETECTION_CONFIDENCE,
+            min_tracking_confidence=settings.MIN_TRACKING_CONFIDENCE,
+            max_dimension=settings.INFERENCE_MAX_DIMENSION,
+            roi_margin=settings.INFERENCE_ROI_MARGIN,
+            roi_fallback_frames=settings.INFERENCE_ROI_FALLBACK_FRAMES
+        )
+    
+    def get_inference_roi(self, person_id: str) -> Optional[Dict]:
+        """
+        Get the region to run pose detection on: the person's last known
+        bounding box, if ROI cropping is enabled
+        """
+        if not settings.INFERENCE_ROI_CROP:
+            return None
+        state = self.person_states.get(person_id)
+        return state.bbox if state is not None else None
+    
+    def get_session_stats(self) -> Dict:
+        """
+        Get pose session counts
+        """
+        return self.pose_sessions.get_stats()
+    
+    def get_person_state_stats(self) -> Dict:
+        """
+        Get per-person state counts and approximate memory use
+        """
+        stats = self.person_states.get_stats()
+        stats['memory_bytes'] = sum(state.nbytes() for state in self.person_states.values())
+        return stats
+    
+    def _check_notification_cooldown(self, state: PersonState) -> bool:
         """
         Check if enough time has passed since last notification
         """
-        if person_id not in self.last_notification_time:
+        if state.last_notification_time is None:
             return True
         
         current_time = time.time()
-        time_since_last = current_time - self.last_notification_time[person_id]
+        time_since_last = current_time - state.last_notification_time
         
         return time_since_last >= settings.NOTIFICATION_COOLDOWN
     
@@ -114,7 +258,5 @@ class FallDetector:
         """
         Reset data for a specific person
         """
-        if person_id in self.previous_positions:
-            del self.previous_positions[person_id]
-        if person_id in self.last_notification_time:
-            del self.last_notification_time[person_id]
\ No newline at end of file
+        self.person_states.remove(person_id)
+        self.pose_sessions.remove(person_id)
\ No newline at end of file
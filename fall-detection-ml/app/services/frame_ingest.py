@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import math
+import struct
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import WebSocket
+
+from ..config import settings
+from .metrics import StreamMetrics
+
+logger = logging.getLogger(__name__)
+
+# Optional header clients put in front of a JPEG frame, little endian:
+#   magic        4s   b'FDF1'
+#   seq          I    frame sequence number, echoed back in the result
+#   capture_ts   d    capture time, seconds since epoch
+# JPEG data always starts with 0xFFD8, so framed and bare frames are
+# told apart by the magic.
+FRAME_MAGIC = b'FDF1'
+FRAME_HEADER = struct.Struct('<4sId')
+
+
+def parse_frame(data: bytes) -> Tuple[bytes, Optional[int], Optional[float]]:
+    """
+    Split a received frame into JPEG bytes, sequence number and capture time
+    """
+    if len(data) >= FRAME_HEADER.size and data[:4] == FRAME_MAGIC:
+        _, seq, capture_ts = FRAME_HEADER.unpack_from(data)
+        return data[FRAME_HEADER.size:], seq, check_capture_ts(capture_ts)
+    return data, None, None
+
+
+def check_capture_ts(capture_ts: Optional[float], max_skew: float = settings.CAPTURE_TS_MAX_SKEW_SECONDS,
+                     now: Optional[float] = None) -> Optional[float]:
+    """
+    Get a client capture time fit for temporal features, or None (server
+    time) when it is not finite or more than max_skew seconds from now
+    """
+    if capture_ts is None:
+        return None
+    now = time.time() if now is None else now
+    if not math.isfinite(capture_ts) or abs(capture_ts - now) > max_skew:
+        logger.debug(f"Ignoring capture time {capture_ts}, using server time")
+        return None
+    return capture_ts
+
+
+def pack_frame(jpeg: bytes, seq: int, capture_ts: float) -> bytes:
+    """
+    Put the frame header in front of JPEG bytes
+    """
+    return FRAME_HEADER.pack(FRAME_MAGIC, seq, capture_ts) + jpeg
+
+
+class LatestFrameReceiver:
+    """
+    Reads frames from a websocket in the background and keeps only the
+    newest undecoded one. When processing falls behind, stale frames are
+    dropped instead of queueing up, so every result is about the freshest
+    frame the client sent. Received and dropped frames are also counted in
+    stream's metrics, if given.
+    """
+
+    def __init__(self, websocket: WebSocket, stream: Optional[StreamMetrics] = None):
+        self.websocket = websocket
+        self.stream = stream
+        self._latest: Optional[bytes] = None
+        self._available = asyncio.Event()
+        self._error: Optional[Exception] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.received_count = 0
+        self.dropped_count = 0
+
+    def start(self):
+        """
+        Start reading frames from the websocket
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._read())
+
+    async def stop(self):
+        """
+        Stop reading frames
+        """
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def next_frame(self) -> bytes:
+        """
+        Wait for and take the newest frame.
+        Re-raises the receive error (e.g. WebSocketDisconnect) once the
+        socket is closed.
+        """
+        await self._available.wait()
+
+        if self._error is not None:
+            raise self._error
+
+        data = self._latest
+        self._latest = None
+        self._available.clear()
+        return data
+
+    async def _read(self):
+        try:
+            while True:
+                data = await self.websocket.receive_bytes()
+                self.received_count += 1
+                if self.stream is not None:
+                    self.stream.received.inc()
+
+                # Replace the frame nobody has picked up yet
+                if self._latest is not None:
+                    self.dropped_count += 1
+                    if self.stream is not None:
+                        self.stream.dropped.inc()
+                self._latest = data
+                self._available.set()
+        except Exception as e:
+            self._error = e
+            self._available.set()
+
+    def get_stats(self) -> Dict:
+        """
+        Get frame counters for this connection
+        """
+        return {
+            'received': self.received_count,
+            'dropped': self.dropped_count
+        }
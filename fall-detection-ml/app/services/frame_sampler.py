@@ -0,0 +1,132 @@
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FrameSampler:
+    """
+    Decides which incoming frames of one stream are worth running pose
+    inference on. A cheap motion gate compares a 1/8 scale grayscale decode
+    of each frame with the last sampled one. While the stream is hot
+    (recent motion, a body angle above hot_angle or a detected fall) every
+    frame is sampled, otherwise only idle_fps frames per second are. A
+    sampler may be shared by concurrent requests of one user, so its state
+    is updated under a lock.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.SAMPLER_ENABLED,
+        idle_fps: float = settings.SAMPLER_IDLE_FPS,
+        motion_threshold: float = settings.SAMPLER_MOTION_THRESHOLD,
+        hot_angle: float = settings.SAMPLER_HOT_ANGLE,
+        hot_hold: float = settings.SAMPLER_HOT_HOLD,
+        pixel_delta: int = 25
+    ):
+        self.enabled = enabled
+        self.idle_interval = 1.0 / idle_fps if idle_fps > 0 else float('inf')
+        self.motion_threshold = motion_threshold
+        self.hot_angle = hot_angle
+        self.hot_hold = hot_hold
+        self.pixel_delta = pixel_delta
+
+        self._lock = threading.Lock()
+        self._reference: Optional[np.ndarray] = None
+        self._hot_until = 0.0
+        self._last_sampled = float('-inf')
+
+        # Last inference result, replayed for skipped frames
+        self.last_result: Optional[Dict] = None
+
+        self.sampled_count = 0
+        self.skipped_count = 0
+
+    def should_sample(self, data: bytes, now: Optional[float] = None) -> bool:
+        """
+        Check whether an encoded frame should go to inference. This decodes
+        the frame (well under a millisecond, but per frame), so the service
+        calls it in a thread rather than on the event loop.
+        """
+        if not self.enabled:
+            with self._lock:
+                self.sampled_count += 1
+            return True
+
+        thumbnail = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+        # Compare with the baseline, decide and move the baseline as one step
+        with self._lock:
+            if now is None:
+                now = time.monotonic()
+
+            if thumbnail is None:
+                # Let inference report the invalid frame
+                self.sampled_count += 1
+                return True
+
+            if self._has_motion(thumbnail):
+                self._hot_until = now + self.hot_hold
+
+            if now < self._hot_until or now - self._last_sampled >= self.idle_interval:
+                self._reference = thumbnail
+                self._last_sampled = now
+                self.sampled_count += 1
+                return True
+
+            self.skipped_count += 1
+            return False
+
+    def update(self, result: Optional[Dict], now: Optional[float] = None):
+        """
+        Feed the result of a sampled frame back into the sampler
+        """
+        if result is None:
+            return
+
+        with self._lock:
+            self.last_result = result
+            if result['fall_detected'] or result['angle'] > self.hot_angle:
+                self._hot_until = (now if now is not None else time.monotonic()) + self.hot_hold
+
+    def skipped_result(self) -> Optional[Dict]:
+        """
+        Last result marked as a replay for a skipped frame
+        """
+        last_result = self.last_result
+        if last_result is None:
+            return None
+
+        result = dict(last_result, skipped=True, should_notify=False)
+        result.pop('processed_frame', None)
+        return result
+
+    @property
+    def hot(self) -> bool:
+        return time.monotonic() < self._hot_until
+
+    def _has_motion(self, thumbnail: np.ndarray) -> bool:
+        if self._reference is None:
+            return False
+        if self._reference.shape != thumbnail.shape:
+            return True
+
+        changed = cv2.absdiff(thumbnail, self._reference) > self.pixel_delta
+        return np.count_nonzero(changed) > self.motion_threshold * changed.size
+
+    def get_stats(self) -> Dict:
+        """
+        Get sampling counters for this stream
+        """
+        return {
+            'sampled': self.sampled_count,
+            'skipped': self.skipped_count,
+            'hot': self.hot
+        }
@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..config import settings
+from .metrics import metrics
+from .profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+class InferenceJob(NamedTuple):
+    """
+    One frame to process in a worker, as queued by the batch scheduler
+    """
+    kind: str  # 'detect_fall' or 'overlay'
+    data: bytes
+    user_id: str
+    encode_frame: bool = False
+    tier: Optional[str] = None
+    capture_ts: Optional[float] = None  # client capture time, seconds since epoch
+
+
+# Per-process services, created once by _init_worker inside each worker
+_fall_detector = None
+_camera_service = None
+_profiler: Optional[SamplingProfiler] = None
+
+
+def _init_worker():
+    """
+    Build the MediaPipe-backed services owned by this worker process
+    """
+    global _fall_detector, _camera_service
+
+    from .fall_detector import FallDetector
+    from .camera_service import CameraService
+
+    _fall_detector = FallDetector()
+    _camera_service = CameraService()
+
+
+_decode_timer = metrics.stage_seconds.labels('decode')
+_encode_timer = metrics.stage_seconds.labels('encode')
+
+
+def _decode_frame(data: bytes) -> Optional[np.ndarray]:
+    with _decode_timer.time():
+        nparr = np.frombuffer(data, np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def _encode_frame(frame: np.ndarray) -> bytes:
+    with _encode_timer.time():
+        _, buffer = cv2.imencode('.jpg', frame)
+        return buffer.tobytes()
+
+
+def _detect_fall(data: bytes, person_id: str, encode_frame: bool, tier: Optional[str] = None,
+                 capture_ts: Optional[float] = None) -> Optional[Dict]:
+    frame = _decode_frame(data)
+    if frame is None:
+        return None
+
+    # Only render the annotated frame when the caller uses it, and ship it as JPEG
+    result = _fall_detector.detect_fall(frame, person_id, render=encode_frame, tier=tier, capture_ts=capture_ts)
+    if encode_frame:
+        result['processed_frame'] = _encode_frame(result['processed_frame'])
+
+    return result
+
+
+def _process_frame_with_overlay(data: bytes, user_id: str, tier: Optional[str] = None,
+                                capture_ts: Optional[float] = None) -> Optional[bytes]:
+    frame = _decode_frame(data)
+    if frame is None:
+        return None
+
+    processed_frame = _camera_service.process_frame_with_overlay(frame, user_id, tier, capture_ts)
+    return _encode_frame(processed_frame)
+
+
+def _process_batch(jobs: List[InferenceJob]) -> List[Tuple[bool, Any]]:
+    """
+    Run every job of a batch, returning (ok, result or exception) per job
+    """
+    outcomes = []
+    for job in jobs:
+        try:
+            if job.kind == 'detect_fall':
+                outcomes.append((True, _detect_fall(
+                    job.data, job.user_id, job.encode_frame, job.tier, job.capture_ts
+                )))
+            elif job.kind == 'overlay':
+                outcomes.append((True, _process_frame_with_overlay(
+                    job.data, job.user_id, job.tier, job.capture_ts
+                )))
+            else:
+                outcomes.append((False, ValueError(f"Unknown job kind: {job.kind}")))
+        except Exception as e:
+            outcomes.append((False, e))
+    return outcomes
+
+
+def _get_session_stats() -> Dict:
+    return {
+        'fall_detection': _fall_detector.get_session_stats(),
+        'camera_stream': _camera_service.fall_detector.get_session_stats(),
+        'person_state': {
+            'fall_detection': _fall_detector.get_person_state_stats(),
+            'camera_stream': _camera_service.fall_detector.get_person_state_stats()
+        }
+    }
+
+
+def _get_metrics() -> List[Dict]:
+    return metrics.collect()
+
+
+def _start_profiler(duration: float, interval: float, trace_memory: bool):
+    global _profiler
+
+    # Sampling runs in a thread of its own, so this returns at once and
+    # the worker keeps processing frames while it is profiled
+    _profiler = SamplingProfiler(duration, interval, trace_memory)
+    _profiler.start()
+
+
+def _stop_profiler() -> Optional[Dict]:
+    global _profiler
+
+    if _profiler is None:
+        return None
+    profile = _profiler.stop()
+    _profiler = None
+    return profile
+
+
+def _warm_up(tiers: List[str], frame_count: int) -> Dict:
+    """
+    Warm up this worker: run synthetic frames through the JPEG codec and a
+    PoseDetector of each tier for both services. A tier that fails is
+    reported rather than raised, so the others still get warmed up.
+    """
+    from ..models.synthetic import synthetic_frames
+
+    frames = [_decode_frame(_encode_frame(frame)) for frame in synthetic_frames(frame_count)]
+
+    seconds: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    for tier in tiers:
+        try:
+            seconds[tier] = round(
+                _fall_detector.warm_up(tier, frames) + _camera_service.fall_detector.warm_up(tier, frames), 3
+            )
+        except Exception as e:
+            logger.exception(f"Warm-up of the {tier} pose model failed")
+            errors[tier] = str(e)
+    return {'seconds': seconds, 'errors': errors}
+
+
+def _reset_person(person_id: str):
+    _fall_detector.reset_person(person_id)
+
+
+def _cleanup_user(user_id: str):
+    _camera_service.cleanup_user(user_id)
+
+
+def _start_detection(user_id: str):
+    _camera_service.start_detection(user_id)
+
+
+def _stop_detection(user_id: str):
+    _camera_service.stop_detection(user_id)
+
+
+class InferencePool:
+    """
+    Runs pose inference and fall scoring in worker processes so the event
+    loop never blocks on MediaPipe. Each stream is pinned to one worker by
+    user id, keeping its tracking and fall history in a single process.
+    A worker that dies is replaced, failing only the calls in flight on it;
+    the streams pinned to it start over with fresh state.
+    """
+
+    def __init__(self, num_workers: int = settings.INFERENCE_WORKERS):
+        self.num_workers = max(1, num_workers)
+        self._executors: List[ProcessPoolExecutor] = []
+
+    def start(self):
+        """
+        Start the worker processes
+        """
+        if self._executors:
+            return
+
+        self._executors = [self._new_executor() for _ in range(self.num_workers)]
+        logger.info(f"Started inference pool with {self.num_workers} workers")
+
+    def shutdown(self):
+        """
+        Stop the worker processes
+        """
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors = []
+        logger.info("Inference pool stopped")
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+        )
+
+    def _worker_index(self, user_id: str) -> int:
+        return zlib.crc32(user_id.encode('utf-8')) % len(self._executors)
+
+    async def _call(self, index: int, func, *args):
+        """
+        Run func in one worker, replacing the worker if it has died
+        """
+        executor = self._executors[index]
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self._replace_worker(index, executor)
+            raise
+
+    async def _call_all(self, func, *args) -> List:
+        """
+        Run func in every worker
+        """
+        if not self._executors:
+            raise RuntimeError("Inference pool is not started")
+
+        return await asyncio.gather(*[self._call(index, func, *args) for index in range(len(self._executors))])
+
+    def _replace_worker(self, index: int, executor: ProcessPoolExecutor):
+        # Every call in flight on a dead worker fails; only the first one
+        # to notice replaces it
+        if index >= len(self._executors) or self._executors[index] is not executor:
+            return
+
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._executors[index] = self._new_executor()
+        metrics.worker_restarts.inc()
+        logger.error(f"Inference worker {index} died, started a replacement")
+
+    async def _run(self, user_id: str, func, *args):
+        if not self._executors:
+            raise RuntimeError("Inference pool is not started")
+
+        return await self._call(self._worker_index(user_id), func, *args)
+
+    async def run_batch(self, jobs: List[InferenceJob]) -> List[Tuple[bool, Any]]:
+        """
+        Run a batch of jobs with one round trip per worker involved.
+        Returns (ok, result or exception) for each job, in order.
+        """
+        if not self._executors:
+            raise RuntimeError("Inference pool is not started")
+
+        groups: Dict[int, List[int]] = {}
+        for position, job in enumerate(jobs):
+            groups.setdefault(self._worker_index(job.user_id), []).append(position)
+
+        worker_outcomes = await asyncio.gather(*[
+            self._run_group(index, [jobs[position] for position in positions])
+            for index, positions in groups.items()
+        ])
+
+        outcomes: List[Tuple[bool, Any]] = [None] * len(jobs)
+        for positions, group_outcomes in zip(groups.values(), worker_outcomes):
+            for position, outcome in zip(positions, group_outcomes):
+                outcomes[position] = outcome
+        return outcomes
+
+    async def _run_group(self, index: int, jobs: List[InferenceJob]) -> List[Tuple[bool, Any]]:
+        # A dead worker fails its own jobs, not the rest of the batch
+        try:
+            return await self._call(index, _process_batch, jobs)
+        except BrokenProcessPool as e:
+            return [(False, e)] * len(jobs)
+
+    async def get_session_stats(self) -> Dict:
+        """
+        Collect pose session counts from every worker
+        """
+        workers = await self._call_all(_get_session_stats)
+
+        totals = {}
+        person_state_totals = {}
+        for worker in workers:
+            for kind in ('fall_detection', 'camera_stream'):
+                for key in ('active', 'created', 'evicted', 'expired'):
+                    totals[key] = totals.get(key, 0) + worker[kind][key]
+                for key in ('active', 'created', 'evicted', 'expired', 'memory_bytes'):
+                    person_state_totals[key] = person_state_totals.get(key, 0) + worker['person_state'][kind][key]
+
+        return {'workers': workers, 'totals': totals, 'person_state_totals': person_state_totals}
+
+    async def get_metrics(self) -> List[List[Dict]]:
+        """
+        Collect the metrics recorded inside every worker
+        """
+        return await self._call_all(_get_metrics)
+
+    async def start_profiler(self, duration: float, interval: float, trace_memory: bool):
+        """
+        Start a sampling profiler in every worker
+        """
+        await self._call_all(_start_profiler, duration, interval, trace_memory)
+
+    async def stop_profiler(self) -> List[Optional[Dict]]:
+        """
+        Stop the workers' profilers and collect their profiles
+        """
+        return await self._call_all(_stop_profiler)
+
+    async def warm_up(self, tiers: List[str], frame_count: int) -> List[Dict]:
+        """
+        Warm up every worker for the given model tiers, which also waits
+        for the workers to spawn. Returns what each worker reported.
+        """
+        return await self._call_all(_warm_up, tiers, frame_count)
+
+    async def reset_person(self, user_id: str):
+        await self._run(user_id, _reset_person, user_id)
+
+    async def cleanup_user(self, user_id: str):
+        await self._run(user_id, _cleanup_user, user_id)
+
+    async def start_detection(self, user_id: str):
+        await self._run(user_id, _start_detection, user_id)
+
+    async def stop_detection(self, user_id: str):
+        await self._run(user_id, _stop_detection, user_id)
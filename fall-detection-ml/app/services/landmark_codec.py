@@ -0,0 +1,102 @@
+import struct
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..models.landmarks import NUM_LANDMARKS
+
+# Packed landmark batch, little endian:
+#   magic        4s   b'FDL1'
+#   count        I    number of frame records
+# followed by count fixed-size frame records (LANDMARK_RECORD):
+#   seq          u4   frame sequence number
+#   capture_ts   f8   capture time, seconds since epoch
+#   width        u2   frame width in pixels
+#   height       u2   frame height in pixels
+#   landmarks    u1   number of valid landmarks (0 or 33)
+#   (padding)    3 bytes
+#   points       33 x 4 f4 (x px, y px, z, visibility), zeros when absent
+# Records have a fixed size so a whole batch decodes with one frombuffer.
+LANDMARK_MAGIC = b'FDL1'
+LANDMARK_BATCH_HEADER = struct.Struct('<4sI')
+LANDMARK_RECORD = np.dtype([
+    ('seq', '<u4'),
+    ('capture_ts', '<f8'),
+    ('width', '<u2'),
+    ('height', '<u2'),
+    ('landmarks', 'u1'),
+    ('padding', 'V3'),
+    ('points', '<f4', (NUM_LANDMARKS, 4))
+])
+
+
+def decode_landmark_batch(data: bytes) -> np.ndarray:
+    """
+    Unpack a landmark batch into a structured array of LANDMARK_RECORD
+    """
+    if len(data) < LANDMARK_BATCH_HEADER.size:
+        raise ValueError("Landmark batch too short")
+
+    magic, count = LANDMARK_BATCH_HEADER.unpack_from(data)
+    if magic != LANDMARK_MAGIC:
+        raise ValueError("Not a landmark batch")
+
+    expected = LANDMARK_BATCH_HEADER.size + count * LANDMARK_RECORD.itemsize
+    if len(data) != expected:
+        raise ValueError(f"Landmark batch of {count} frames should be {expected} bytes, got {len(data)}")
+
+    return np.frombuffer(data, dtype=LANDMARK_RECORD, count=count, offset=LANDMARK_BATCH_HEADER.size)
+
+
+def validate_landmark_batch(records: np.ndarray, max_skew: float = settings.CAPTURE_TS_MAX_SKEW_SECONDS,
+                            now: Optional[float] = None):
+    """
+    Check decoded records hold usable frames: 0 or NUM_LANDMARKS landmarks
+    each, only finite numbers, and a capture time (when set) within
+    max_skew seconds of now, which scoring relies on. Raises ValueError
+    naming the first bad frame.
+    """
+    counts = records['landmarks']
+    bad = np.flatnonzero((counts != 0) & (counts != NUM_LANDMARKS))
+    if len(bad):
+        record = records[bad[0]]
+        raise ValueError(
+            f"Frame {int(record['seq'])} has {int(record['landmarks'])} landmarks, expected 0 or {NUM_LANDMARKS}"
+        )
+
+    finite = np.isfinite(records['capture_ts']) & np.isfinite(records['points']).all(axis=(1, 2))
+    bad = np.flatnonzero(~finite)
+    if len(bad):
+        raise ValueError(f"Frame {int(records[bad[0]]['seq'])} has non-finite values")
+
+    # 0 means no capture time: the frame is scored at server time
+    capture_ts = records['capture_ts']
+    now = time.time() if now is None else now
+    bad = np.flatnonzero((capture_ts != 0) & (np.abs(capture_ts - now) > max_skew))
+    if len(bad):
+        record = records[bad[0]]
+        raise ValueError(
+            f"Frame {int(record['seq'])} has capture time {float(record['capture_ts'])}, "
+            f"more than {max_skew:g}s from server time"
+        )
+
+
+def encode_landmark_batch(frames: List[Dict]) -> bytes:
+    """
+    Pack frames given as dicts with seq, capture_ts, width, height and
+    landmarks ((33, 4) array, or empty when no person was found)
+    """
+    records = np.zeros(len(frames), dtype=LANDMARK_RECORD)
+    for record, frame in zip(records, frames):
+        landmarks = np.asarray(frame['landmarks'], dtype=np.float32).reshape(-1, 4)
+        record['seq'] = frame.get('seq') or 0
+        record['capture_ts'] = frame['capture_ts']
+        record['width'] = frame['width']
+        record['height'] = frame['height']
+        record['landmarks'] = len(landmarks)
+        if len(landmarks):
+            record['points'] = landmarks
+
+    return LANDMARK_BATCH_HEADER.pack(LANDMARK_MAGIC, len(records)) + records.tobytes()
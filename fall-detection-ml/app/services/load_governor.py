@@ -0,0 +1,108 @@
+import logging
+import time
+from typing import Dict
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoadGovernor:
+    """
+    Drops every stream to the lite pose model while the node is overloaded.
+    Overload starts when smoothed per-frame latency or queue depth crosses
+    its high mark and ends once both are back under their low marks, so
+    streams do not flap between tiers. Each switch also holds for at least
+    min_dwell seconds, since the switch itself briefly slows the first
+    frames on the new tier, which would otherwise read as a load change.
+    """
+
+    LITE_TIER = 'lite'
+
+    def __init__(
+        self,
+        enabled: bool = settings.GOVERNOR_ENABLED,
+        latency_high_ms: float = settings.GOVERNOR_LATENCY_HIGH_MS,
+        latency_low_ms: float = settings.GOVERNOR_LATENCY_LOW_MS,
+        queue_high: int = settings.GOVERNOR_QUEUE_HIGH,
+        queue_low: int = settings.GOVERNOR_QUEUE_LOW,
+        min_dwell: float = settings.GOVERNOR_MIN_DWELL_SECONDS,
+        smoothing: float = 0.2,
+        min_samples: int = 10
+    ):
+        self.enabled = enabled
+        self.latency_high_ms = latency_high_ms
+        self.latency_low_ms = latency_low_ms
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.min_dwell = min_dwell
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+
+        self.latency_ms = 0.0
+        self.latency_samples = 0
+        self.queue_depth = 0
+        self.degraded = False
+        self.degraded_count = 0
+        self.switched_at = float('-inf')
+
+    def record_latency(self, seconds: float):
+        """
+        Feed the end-to-end latency of one frame
+        """
+        self.latency_ms += self.smoothing * (seconds * 1000.0 - self.latency_ms)
+        self.latency_samples += 1
+        self._evaluate()
+
+    def record_queue_depth(self, depth: int):
+        """
+        Feed the number of frames waiting or in flight
+        """
+        self.queue_depth = depth
+        self._evaluate()
+
+    def effective_tier(self, requested: str) -> str:
+        """
+        Get the tier a stream should run at given the current load
+        """
+        return self.LITE_TIER if self.degraded else requested
+
+    def _evaluate(self):
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+        if now - self.switched_at < self.min_dwell:
+            return
+
+        # Ignore latency until the average has settled past cold-start frames
+        latency_high = self.latency_samples >= self.min_samples and self.latency_ms > self.latency_high_ms
+
+        if not self.degraded:
+            if latency_high or self.queue_depth > self.queue_high:
+                self.degraded = True
+                self.degraded_count += 1
+                self.switched_at = now
+                logger.warning(
+                    f"Load high (latency {self.latency_ms:.0f} ms, queue {self.queue_depth}), "
+                    f"switching streams to the {self.LITE_TIER} model"
+                )
+        elif self.latency_ms < self.latency_low_ms and self.queue_depth < self.queue_low:
+            self.degraded = False
+            self.switched_at = now
+            logger.info(
+                f"Load back to normal (latency {self.latency_ms:.0f} ms, queue {self.queue_depth}), "
+                f"restoring requested models"
+            )
+
+    def get_stats(self) -> Dict:
+        """
+        Get governor state
+        """
+        return {
+            'enabled': self.enabled,
+            'degraded': self.degraded,
+            'latency_ms': self.latency_ms,
+            'queue_depth': self.queue_depth,
+            'degraded_count': self.degraded_count
+        }
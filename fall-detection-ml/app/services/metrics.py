@@ -0,0 +1,335 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..config import settings
+
+# Label value that label sets beyond a metric's max_series are folded into
+OVERFLOW_LABEL = '_other'
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _Metric:
+    """
+    A named metric with one value (or histogram) per label set. Label sets
+    past max_series have their first label replaced by OVERFLOW_LABEL, so
+    per-stream labels cannot grow memory without bound.
+    """
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 max_series: Optional[int] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values) -> object:
+        """
+        Get the child for one label set, to update it without a lookup
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            if self.max_series is not None and len(self._children) >= self.max_series and self.labelnames:
+                key = (OVERFLOW_LABEL,) + key[1:]
+                child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> Dict:
+        """
+        Plain picklable state, for shipping between processes
+        """
+        return {
+            'name': self.name,
+            'type': self.type_name,
+            'documentation': self.documentation,
+            'labelnames': self.labelnames,
+            'samples': {key: child.state() for key, child in self._children.items()}
+        }
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def state(self) -> float:
+        return self.value
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.labels(*labels).inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float, *labels):
+        self.labels(*labels).set(value)
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def state(self) -> Tuple[List[int], float]:
+        return list(self.counts), self.sum
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = STAGE_BUCKETS, max_series: Optional[int] = None):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float, *labels):
+        self.labels(*labels).observe(value)
+
+    def time(self, *labels):
+        return self.labels(*labels).time()
+
+    def collect(self) -> Dict:
+        collected = super().collect()
+        collected['buckets'] = self.buckets
+        return collected
+
+
+class StreamMetrics:
+    """
+    Pre-resolved per-stream counters for one user on one endpoint
+    """
+
+    __slots__ = ('received', 'inferred', 'skipped', 'dropped', 'falls')
+
+    def __init__(self, metrics: 'Metrics', user_id: str, endpoint: str):
+        self.received = metrics.frames_received.labels(user_id, endpoint)
+        self.inferred = metrics.frames_inferred.labels(user_id, endpoint)
+        self.skipped = metrics.frames_skipped.labels(user_id, endpoint)
+        self.dropped = metrics.frames_dropped.labels(user_id, endpoint)
+        self.falls = metrics.falls_detected.labels(user_id, endpoint)
+
+    def record_result(self, result: Optional[Dict]):
+        """
+        Count an inferred frame and whether it showed a fall
+        """
+        if result is None:
+            return
+        self.inferred.inc()
+        if result['fall_detected']:
+            self.falls.inc()
+
+
+class Metrics:
+    """
+    The service's metrics. Every process (API and each inference worker)
+    has its own instance, updated in place with no locking or I/O, so
+    instrumentation stays cheap; workers' metrics are collected and merged
+    when /metrics is scraped.
+    """
+
+    def __init__(self, max_streams: int = settings.METRICS_MAX_STREAMS):
+        stream_labels = ('user_id', 'endpoint')
+
+        # Pipeline stages, observed where they run
+        self.stage_seconds = Histogram(
+            'fall_detection_stage_seconds',
+            'Time spent per frame in each pipeline stage',
+            ('stage',)
+        )
+        self.batch_size = Histogram(
+            'fall_detection_batch_size',
+            'Frames per inference batch',
+            buckets=BATCH_BUCKETS
+        )
+
+        # Per-stream counters
+        self.frames_received = Counter(
+            'fall_detection_frames_received_total', 'Frames received', stream_labels, max_streams
+        )
+        self.frames_inferred = Counter(
+            'fall_detection_frames_inferred_total', 'Frames run through pose inference or scoring',
+            stream_labels, max_streams
+        )
+        self.frames_skipped = Counter(
+            'fall_detection_frames_skipped_total', 'Frames skipped by adaptive sampling', stream_labels, max_streams
+        )
+        self.frames_dropped = Counter(
+            'fall_detection_frames_dropped_total', 'Stale frames dropped for a newer one', stream_labels, max_streams
+        )
+        self.falls_detected = Counter(
+            'fall_detection_falls_detected_total', 'Frames scored as a fall', stream_labels, max_streams
+        )
+
+        self.worker_restarts = Counter(
+            'fall_detection_worker_restarts_total', 'Inference workers replaced after dying'
+        )
+        
+        # Notifications
+        self.notifications = Counter(
+            'fall_detection_notifications_total', 'Fall notifications by outcome', ('user_id', 'outcome'),
+            max_streams
+        )
+        self.notification_lag_seconds = Histogram(
+            'fall_detection_notification_lag_seconds',
+            'Time from queueing a notification to its delivery',
+            buckets=LAG_BUCKETS
+        )
+
+        # Point-in-time state, set when scraped
+        self.active_connections = Gauge('fall_detection_active_connections', 'Open websocket connections')
+        self.queue_depth = Gauge('fall_detection_queue_depth', 'Frames waiting for an inference batch')
+        self.in_flight = Gauge('fall_detection_in_flight', 'Frames being processed by inference workers')
+        self.notification_outbox_depth = Gauge(
+            'fall_detection_notification_outbox_depth', 'Notifications waiting for delivery'
+        )
+        self.pose_sessions = Gauge('fall_detection_pose_sessions', 'Active pose tracking sessions')
+        self.person_states = Gauge('fall_detection_person_states', 'Tracked person states', ('scope',))
+        self.person_state_bytes = Gauge(
+            'fall_detection_person_state_bytes', 'Approximate memory held by person states', ('scope',)
+        )
+        self.governor_degraded = Gauge(
+            'fall_detection_governor_degraded', 'Whether the load governor has streams on the lite model'
+        )
+
+    def stream(self, user_id: str, endpoint: str) -> StreamMetrics:
+        return StreamMetrics(self, user_id, endpoint)
+
+    def all(self) -> List[_Metric]:
+        return [value for value in vars(self).values() if isinstance(value, _Metric)]
+
+    def collect(self) -> List[Dict]:
+        """
+        State of all metrics, for merging into another process's
+        """
+        return [metric.collect() for metric in self.all()]
+
+    def render(self, others: Iterable[List[Dict]] = ()) -> str:
+        """
+        Prometheus text exposition of these metrics merged with metrics
+        collected from other processes
+        """
+        merged: Dict[str, Dict] = {}
+        for collected in [self.collect(), *others]:
+            for metric in collected:
+                _merge(merged, metric)
+        return ''.join(_render_metric(metric) for metric in merged.values())
+
+
+def _merge(merged: Dict[str, Dict], metric: Dict):
+    target = merged.get(metric['name'])
+    if target is None:
+        merged[metric['name']] = dict(metric, samples=dict(metric['samples']))
+        return
+
+    samples = target['samples']
+    for key, state in metric['samples'].items():
+        current = samples.get(key)
+        if current is None:
+            samples[key] = state
+        elif metric['type'] == 'histogram':
+            samples[key] = ([a + b for a, b in zip(current[0], state[0])], current[1] + state[1])
+        elif metric['type'] == 'counter':
+            samples[key] = current + state
+        else:
+            # Gauges describe a single process's state; keep the latest
+            samples[key] = state
+
+
+def _render_metric(metric: Dict) -> str:
+    name = metric['name']
+    lines = [f"# HELP {name} {metric['documentation']}", f"# TYPE {name} {metric['type']}"]
+
+    for key, state in sorted(metric['samples'].items()):
+        labels = list(zip(metric['labelnames'], key))
+        if metric['type'] != 'histogram':
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(state)}")
+            continue
+
+        counts, total = state
+        cumulative = 0
+        for bound, count in zip(list(metric['buckets']) + [float('inf')], counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isfinite(value) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+metrics = Metrics()
@@ -1,43 +1,196 @@
-import requests
+import asyncio
+import time
+import httpx
 import logging
-from typing import Dict
+from typing import Dict, Optional
 from ..config import settings
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+class _OutboxItem:
+    __slots__ = ('user_id', 'payload', 'attempts', 'enqueued_at')
+
+    def __init__(self, user_id: str, payload: Dict):
+        self.user_id = user_id
+        self.payload = payload
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
 class NotificationService:
+    """
+    Delivers fall notifications to the backend in the background.
+    Notifications go into a bounded outbox and are sent over a pooled
+    async HTTP client, retried with exponential backoff, and de-duplicated
+    per user while one is still pending.
+    """
+
     def __init__(self):
         self.backend_url = settings.BACKEND_URL
-        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        self._pending: Dict[str, _OutboxItem] = {}  # user_id -> undelivered notification
+        self._workers = []
+        self._retries = set()
+
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
+        self.deduplicated_count = 0
+        self.last_delivery_lag = 0.0
+
+    async def start(self):
+        """
+        Open the HTTP connection pool and start the delivery workers
+        """
+        if self._client is not None:
+            return
+
+        self._client = httpx.AsyncClient(
+            base_url=self.backend_url,
+            timeout=settings.NOTIFICATION_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.NOTIFICATION_WORKERS,
+                max_keepalive_connections=settings.NOTIFICATION_WORKERS
+            )
+        )
+        self._outbox = asyncio.Queue(maxsize=settings.NOTIFICATION_OUTBOX_SIZE)
+        self._workers = [
+            asyncio.create_task(self._deliver_loop())
+            for _ in range(settings.NOTIFICATION_WORKERS)
+        ]
+
+    async def stop(self):
+        """
+        Stop delivery and close the HTTP connection pool
+        """
+        for task in self._workers + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retries, return_exceptions=True)
+        self._workers = []
+        self._retries.clear()
+
+        if self._outbox is not None and not self._outbox.empty():
+            logger.warning(f"Discarding {self._outbox.qsize()} undelivered notifications")
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def outbox_depth(self) -> int:
+        return self._outbox.qsize() if self._outbox is not None else 0
+
     async def send_fall_notification(self, user_id: str, fall_data: Dict) -> bool:
         """
-        Send fall notification to backend
+        Queue a fall notification for the backend without waiting on delivery
         """
-        try:
-            payload = {
-                'userId': user_id,
-                'type': 'FALL_DETECTED',
-                'data': {
-                    'confidence': fall_data['confidence'],
-                    'angle': fall_data['angle'],
-                    'velocity': fall_data['velocity'],
-                    'timestamp': fall_data['timestamp']
-                }
+        if self._outbox is None:
+            logger.error("Notification service is not started")
+            return False
+
+        # A notification for this user is still on its way
+        if user_id in self._pending:
+            self.deduplicated_count += 1
+            metrics.notifications.inc(user_id, 'deduplicated')
+            return True
+
+        payload = {
+            'userId': user_id,
+            'type': 'FALL_DETECTED',
+            'data': {
+                'confidence': fall_data['confidence'],
+                'angle': fall_data['angle'],
+                'velocity': fall_data['velocity'],
+                'timestamp': fall_data['timestamp']
             }
-            
-            response = requests.post(
-                f"{self.backend_url}/api/v1/notifications/fall-detected",
-                json=payload,
-                timeout=5
+        }
+        item = _OutboxItem(user_id, payload)
+
+        if self._outbox.full():
+            # Make room by dropping the oldest queued notification
+            oldest = self._outbox.get_nowait()
+            self._pending.pop(oldest.user_id, None)
+            self.dropped_count += 1
+            metrics.notifications.inc(oldest.user_id, 'dropped')
+            logger.error(f"Notification outbox full, dropped notification for user {oldest.user_id}")
+
+        self._pending[user_id] = item
+        self._outbox.put_nowait(item)
+        metrics.notifications.inc(user_id, 'queued')
+        return True
+
+    async def _deliver_loop(self):
+        while True:
+            item = await self._outbox.get()
+
+            if await self._post(item):
+                self._pending.pop(item.user_id, None)
+                self.sent_count += 1
+                self.last_delivery_lag = time.monotonic() - item.enqueued_at
+                metrics.notifications.inc(item.user_id, 'sent')
+                metrics.notification_lag_seconds.observe(self.last_delivery_lag)
+                logger.info(f"Fall notification sent successfully for user {item.user_id}")
+            elif item.attempts < settings.NOTIFICATION_MAX_RETRIES:
+                self._schedule_retry(item)
+            else:
+                self._pending.pop(item.user_id, None)
+                self.failed_count += 1
+                metrics.notifications.inc(item.user_id, 'failed')
+                logger.error(
+                    f"Giving up on notification for user {item.user_id} "
+                    f"after {item.attempts} attempts"
+                )
+
+    async def _post(self, item: _OutboxItem) -> bool:
+        item.attempts += 1
+        try:
+            response = await self._client.post(
+                "/api/v1/notifications/fall-detected",
+                json=item.payload
             )
-            
-            if response.status_code == 200:
-                logger.info(f"Fall notification sent successfully for user {user_id}")
+
+            if response.is_success:
                 return True
             else:
                 logger.error(f"Failed to send notification: {response.status_code}")
                 return False
-                
+
         except Exception as e:
             logger.error(f"Error sending notification: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+    def _schedule_retry(self, item: _OutboxItem):
+        delay = min(
+            settings.NOTIFICATION_RETRY_BACKOFF * (2 ** (item.attempts - 1)),
+            settings.NOTIFICATION_RETRY_MAX_BACKOFF
+        )
+        task = asyncio.create_task(self._requeue_after(item, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue_after(self, item: _OutboxItem, delay: float):
+        await asyncio.sleep(delay)
+
+        if self._outbox.full():
+            self._pending.pop(item.user_id, None)
+            self.dropped_count += 1
+            metrics.notifications.inc(item.user_id, 'dropped')
+            logger.error(f"Notification outbox full, dropped retry for user {item.user_id}")
+            return
+
+        self._outbox.put_nowait(item)
+
+    def get_stats(self) -> Dict:
+        """
+        Get delivery counters
+        """
+        return {
+            'outbox_depth': self.outbox_depth,
+            'pending': len(self._pending),
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'dropped': self.dropped_count,
+            'deduplicated': self.deduplicated_count,
+            'last_delivery_lag': self.last_delivery_lag
+        }
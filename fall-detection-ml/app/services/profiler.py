@@ -0,0 +1,209 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+# Components samples are attributed to, by source file and optionally
+# function. A sample counts for the innermost matching frame of its stack,
+# so MediaPipe time under PoseDetector is PoseDetector's.
+COMPONENTS: List[Tuple[str, str, Optional[str]]] = [
+    ('decode', 'inference_pool.py', '_decode_frame'),
+    ('encode', 'inference_pool.py', '_encode_frame'),
+    ('encode', 'result_codec.py', None),
+    ('FrameSampler', 'frame_sampler.py', None),
+    ('PoseDetector', 'pose_detector.py', None),
+    ('CameraService', 'camera_service.py', None),
+    ('FallDetector', 'fall_detector.py', None),
+    ('LandmarkWindow', 'landmark_window.py', None)
+]
+OTHER_COMPONENT = 'other'
+
+
+def _component(filename: str, function: Optional[str] = None) -> Optional[str]:
+    """
+    Component a frame belongs to. Allocation tracebacks carry no function
+    name; those frames get every component of their file, joined with '/'.
+    """
+    basename = os.path.basename(filename)
+    if function is not None:
+        for component, component_file, component_function in COMPONENTS:
+            if basename == component_file and component_function in (None, function):
+                return component
+        return None
+
+    components = []
+    for component, component_file, _ in COMPONENTS:
+        if basename == component_file and component not in components:
+            components.append(component)
+    return '/'.join(components) or None
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the current process. A background thread
+    snapshots every other thread's Python stack each interval and counts
+    identical stacks, which is cheap enough to run under production load.
+    Sampling stops on its own after duration seconds even if stop() is
+    never called. With trace_memory, tracemalloc records where memory
+    still held at the end of the profile was allocated.
+    
+    The sampler needs the GIL to take a sample, so time in native code
+    that holds it is charged to the Python line that runs next; MediaPipe
+    and OpenCV release it and are sampled where they run.
+    """
+
+    def __init__(self, duration: float, interval: float = 0.005, trace_memory: bool = False,
+                 memory_frames: int = 16, top_allocations: int = 25):
+        self.duration = duration
+        self.interval = max(0.001, interval)
+        self.trace_memory = trace_memory
+        self.memory_frames = memory_frames
+        self.top_allocations = top_allocations
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Dict[str, int] = {}
+        self._components: Dict[str, int] = {}
+        self._labels: Dict[object, str] = {}  # code object -> frame label
+        self._started_tracemalloc = False
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_memory = 0
+
+        self.sample_count = 0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start sampling in a background thread
+        """
+        if self._thread is not None:
+            return
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._started_tracemalloc = True
+
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict:
+        """
+        Stop sampling and get the profile
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        return self._profile()
+
+    def _run(self):
+        deadline = self.started_at + self.duration
+        own_id = threading.get_ident()
+
+        while not self._stop.wait(self.interval):
+            self._sample(own_id)
+            if time.monotonic() >= deadline:
+                break
+
+        self.stopped_at = time.monotonic()
+        self._finish_memory()
+
+    def _sample(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+
+            labels = []
+            component = None
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    name = getattr(code, 'co_qualname', code.co_name)
+                    label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    self._labels[code] = label
+                labels.append(label)
+                if component is None:
+                    component = _component(code.co_filename, code.co_name)
+                frame = frame.f_back
+
+            labels.append(names.get(thread_id, f'thread-{thread_id}'))
+            stack = ';'.join(reversed(labels))
+            self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+            component = component or OTHER_COMPONENT
+            self._components[component] = self._components.get(component, 0) + 1
+
+        self.sample_count += 1
+
+    def _finish_memory(self):
+        if not self._started_tracemalloc:
+            return
+
+        self._snapshot = tracemalloc.take_snapshot()
+        self._peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def _profile(self) -> Dict:
+        profile = {
+            'duration': round((self.stopped_at or time.monotonic()) - self.started_at, 3),
+            'interval': self.interval,
+            'samples': self.sample_count,
+            'components': dict(sorted(self._components.items(), key=lambda item: -item[1])),
+            'stacks': self._stacks
+        }
+        if self._snapshot is not None:
+            profile['memory'] = self._memory_profile()
+        return profile
+
+    def _memory_profile(self) -> Dict:
+        components: Dict[str, int] = {}
+        for trace in self._snapshot.traces:
+            component = None
+            for frame in reversed(trace.traceback):
+                component = _component(frame.filename)
+                if component is not None:
+                    break
+            component = component or OTHER_COMPONENT
+            components[component] = components.get(component, 0) + trace.size
+
+        top = self._snapshot.statistics('lineno')[:self.top_allocations]
+        return {
+            'peak_bytes': self._peak_memory,
+            'held_bytes': sum(components.values()),
+            'components': dict(sorted(components.items(), key=lambda item: -item[1])),
+            'top_allocations': [
+                {
+                    'file': stat.traceback[0].filename,
+                    'line': stat.traceback[0].lineno,
+                    'bytes': stat.size,
+                    'count': stat.count
+                }
+                for stat in top
+            ]
+        }
+
+
+def collapse_profiles(profiles: Dict[str, Dict]) -> str:
+    """
+    Render profiles of several processes as one collapsed-stack file
+    (stack frames separated by ';', then the sample count), with the
+    process name as the root frame, as read by flamegraph.pl, speedscope
+    and similar tools
+    """
+    lines = []
+    for process, profile in profiles.items():
+        if profile is None:
+            continue
+        for stack, count in sorted(profile['stacks'].items()):
+            lines.append(f"{process};{stack} {count}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,83 @@
+import struct
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import numpy as np
+
+# Compact fall detection result, little endian:
+#   magic        4s   b'FDR2'
+#   flags        B    FLAG_* bits
+#   landmarks    B    number of landmarks (0 or 33)
+#   confidence   f
+#   angle        f    degrees
+#   velocity     f
+#   timestamp    d    seconds since epoch (UTC), the capture time if the client sent one
+#   seq          I    sequence number of the frame, 0 if it had none
+#   frame_size   I    length of the trailing JPEG, 0 if none
+# followed by landmarks x float32 (x, y, z, visibility) and the JPEG bytes.
+RESULT_MAGIC = b'FDR2'
+RESULT_HEADER = struct.Struct('<4sBBfffdII')
+
+FLAG_FALL_DETECTED = 0x01
+FLAG_SHOULD_NOTIFY = 0x02
+FLAG_SKIPPED = 0x04  # replay of the last result for a frame the sampler skipped
+
+LANDMARK_DTYPE = np.dtype('<f4')
+LANDMARK_FIELDS = 4
+
+
+def encode_result(result: Dict, frame_jpeg: Optional[bytes] = None) -> bytes:
+    """
+    Pack a fall detection result into the compact binary record
+    """
+    flags = 0
+    if result['fall_detected']:
+        flags |= FLAG_FALL_DETECTED
+    if result.get('should_notify', False):
+        flags |= FLAG_SHOULD_NOTIFY
+    if result.get('skipped', False):
+        flags |= FLAG_SKIPPED
+
+    landmarks = np.asarray(result['landmarks'], dtype=LANDMARK_DTYPE).reshape(-1, LANDMARK_FIELDS)
+    timestamp = datetime.fromisoformat(result['timestamp']).replace(tzinfo=timezone.utc).timestamp()
+    frame_jpeg = frame_jpeg or b''
+
+    header = RESULT_HEADER.pack(
+        RESULT_MAGIC,
+        flags,
+        len(landmarks),
+        result['confidence'],
+        result['angle'],
+        result['velocity'],
+        timestamp,
+        result.get('seq') or 0,
+        len(frame_jpeg)
+    )
+    return header + landmarks.tobytes() + frame_jpeg
+
+
+def decode_result(data: bytes) -> Dict:
+    """
+    Unpack a compact binary record, with landmarks as an (N, 4) float32 array
+    """
+    magic, flags, count, confidence, angle, velocity, timestamp, seq, frame_size = \
+        RESULT_HEADER.unpack_from(data)
+    if magic != RESULT_MAGIC:
+        raise ValueError("Not a fall detection result record")
+
+    offset = RESULT_HEADER.size
+    landmarks = np.frombuffer(data, dtype=LANDMARK_DTYPE, count=count * LANDMARK_FIELDS, offset=offset)
+    offset += landmarks.nbytes
+
+    return {
+        'fall_detected': bool(flags & FLAG_FALL_DETECTED),
+        'should_notify': bool(flags & FLAG_SHOULD_NOTIFY),
+        'skipped': bool(flags & FLAG_SKIPPED),
+        'confidence': confidence,
+        'angle': angle,
+        'velocity': velocity,
+        'timestamp': timestamp,
+        'seq': seq,
+        'landmarks': landmarks.reshape(count, LANDMARK_FIELDS),
+        'processed_frame': data[offset:offset + frame_size] if frame_size else None
+    }
@@ -0,0 +1,148 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    __slots__ = ('value', 'last_used')
+
+    def __init__(self, value: Any, last_used: float):
+        self.value = value
+        self.last_used = last_used
+
+
+class SessionRegistry:
+    """
+    Keyed registry of per-stream objects, capped in size.
+    The least recently used session is evicted when the cap is reached and
+    sessions idle for longer than the TTL are expired.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any],
+        max_sessions: int,
+        ttl: float,
+        on_evict: Optional[Callable[[str, Any], None]] = None
+    ):
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self.on_evict = on_evict
+
+        # Ordered from least to most recently used
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+        self.created_count = 0
+        self.evicted_count = 0
+        self.expired_count = 0
+
+    def acquire(self, key: str, factory: Optional[Callable[[str], Any]] = None) -> Any:
+        """
+        Get the session for key, creating it if needed.
+        factory overrides the registry's default factory for this call.
+        """
+        now = time.monotonic()
+        self.sweep(now)
+
+        session = self._sessions.get(key)
+        if session is not None:
+            session.last_used = now
+            self._sessions.move_to_end(key)
+            return session.value
+
+        while len(self._sessions) >= self.max_sessions:
+            lru_key, lru_session = self._sessions.popitem(last=False)
+            self.evicted_count += 1
+            self._close(lru_key, lru_session.value)
+            logger.info(f"Evicted least recently used session {lru_key}")
+
+        value = (factory or self.factory)(key)
+        self._sessions[key] = _Session(value, now)
+        self.created_count += 1
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get the session for key without creating or touching it
+        """
+        session = self._sessions.get(key)
+        return session.value if session is not None else None
+
+    def values(self) -> List[Any]:
+        """
+        Get all session values, least recently used first
+        """
+        return [session.value for session in self._sessions.values()]
+
+    def remove(self, key: str) -> bool:
+        """
+        Close and remove the session for key
+        """
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return False
+
+        self._close(key, session.value)
+        return True
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Expire sessions idle for longer than the TTL
+        """
+        if now is None:
+            now = time.monotonic()
+
+        expired = 0
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl:
+                break
+
+            del self._sessions[key]
+            self._close(key, session.value)
+            expired += 1
+
+        if expired:
+            self.expired_count += expired
+            logger.info(f"Expired {expired} idle sessions")
+
+        return expired
+
+    def clear(self):
+        """
+        Close and remove all sessions
+        """
+        while self._sessions:
+            key, session = self._sessions.popitem(last=False)
+            self._close(key, session.value)
+
+    def get_stats(self) -> Dict:
+        """
+        Get session counts
+        """
+        return {
+            'active': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'created': self.created_count,
+            'evicted': self.evicted_count,
+            'expired': self.expired_count
+        }
+
+    def _close(self, key: str, value: Any):
+        if self.on_evict is None:
+            return
+
+        try:
+            self.on_evict(key, value)
+        except Exception as e:
+            logger.error(f"Error closing session {key}: {str(e)}")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
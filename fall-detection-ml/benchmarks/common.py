@@ -0,0 +1,125 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.models.synthetic import synthetic_frames
+
+
+def video_frames(path: str, count: int, width: Optional[int] = None, height: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Read the first count frames of a recorded video, looping it if it is
+    shorter, optionally resized
+    """
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                if not frames:
+                    raise ValueError(f"Cannot read frames from {path}")
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            if width and height:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def load_frames(count: int, width: int, height: int, video: Optional[str] = None) -> List[np.ndarray]:
+    """
+    Frames from video if given, otherwise synthetic frames
+    """
+    if video:
+        return video_frames(video, count, width, height)
+    return synthetic_frames(count, width, height)
+
+
+def summarize(samples: Iterable[float]) -> Dict:
+    """
+    Latency statistics in milliseconds for samples given in seconds
+    """
+    values = np.asarray(list(samples), dtype=np.float64) * 1000
+    if values.size == 0:
+        return {'count': 0}
+
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        'count': int(values.size),
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(p50), 4),
+        'p90_ms': round(float(p90), 4),
+        'p99_ms': round(float(p99), 4),
+        'min_ms': round(float(values.min()), 4),
+        'max_ms': round(float(values.max()), 4)
+    }
+
+
+def environment() -> Dict:
+    """
+    What the results were measured on, so runs can be compared
+    """
+    root = Path(__file__).resolve().parent.parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=root, capture_output=True,
+                                    text=True, timeout=10).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        commit, dirty = None, None
+
+    try:
+        import mediapipe
+        mediapipe_version = mediapipe.__version__
+    except ImportError:
+        mediapipe_version = None
+
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'mediapipe': mediapipe_version,
+        'settings': {
+            'POSE_MODEL_TIER': settings.POSE_MODEL_TIER,
+            'INFERENCE_WORKERS': settings.INFERENCE_WORKERS,
+            'INFERENCE_MAX_DIMENSION': settings.INFERENCE_MAX_DIMENSION,
+            'INFERENCE_ROI_CROP': settings.INFERENCE_ROI_CROP,
+            'BATCH_MAX_SIZE': settings.BATCH_MAX_SIZE,
+            'BATCH_MAX_WAIT_MS': settings.BATCH_MAX_WAIT_MS,
+            'FALL_WINDOW_SIZE': settings.FALL_WINDOW_SIZE
+        }
+    }
+
+
+def write_results(benchmark: str, config: Dict, results: Dict, output: Optional[str]):
+    """
+    Print results as JSON and write them to output if given
+    """
+    report = {
+        'benchmark': benchmark,
+        'environment': environment(),
+        'config': config,
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + '\n')
+        print(f"Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
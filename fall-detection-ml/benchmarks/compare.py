@@ -0,0 +1,91 @@
+"""
+Compare two benchmark result files, e.g. from before and after a change.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Prints every shared metric with its relative change and exits with status
+1 if a mean, median or p90 latency got slower, or a throughput lower, by
+more than the threshold percentage. Extremes and p99 are shown but not
+checked, as they are too noisy over short runs.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+# Metrics checked for regressions, by whether higher values are worse
+HIGHER_IS_WORSE = {'mean_ms', 'p50_ms', 'p90_ms'}
+LOWER_IS_WORSE = {'throughput_fps', 'detection_rate'}
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    """
+    Numeric leaves of nested results keyed by their path
+    """
+    metrics = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f'{path}/'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = float(value)
+    return metrics
+
+
+def regression(metric: str, change: float) -> Optional[float]:
+    """
+    How much worse a change of a metric is, in percent, or None if the
+    metric is not checked
+    """
+    name = metric.rsplit('/', 1)[-1]
+    if name in HIGHER_IS_WORSE:
+        return change
+    if name in LOWER_IS_WORSE:
+        return -change
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline', help='Results of the reference run')
+    parser.add_argument('candidate', help='Results of the run to check')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Regression in percent that fails the comparison (default: 10)')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get('benchmark') != candidate.get('benchmark'):
+        parser.error(f"cannot compare {baseline.get('benchmark')} results with {candidate.get('benchmark')} results")
+
+    before = flatten(baseline['results'])
+    after = flatten(candidate['results'])
+
+    print(f"baseline  {baseline['environment'].get('commit')}")
+    print(f"candidate {candidate['environment'].get('commit')}")
+    print(f"{'metric':<60} {'baseline':>12} {'candidate':>12} {'change':>9}")
+
+    regressions = []
+    for metric in sorted(before.keys() & after.keys()):
+        old, new = before[metric], after[metric]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = regression(metric, change)
+        flag = ''
+        if worse is not None and worse > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(metric)
+        print(f"{metric:<60} {old:>12.3f} {new:>12.3f} {change:>+8.1f}%{flag}")
+
+    for metric in sorted(before.keys() ^ after.keys()):
+        print(f"{metric:<60} only in {'baseline' if metric in before else 'candidate'}")
+
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed by more than {args.threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Per-stage latency of the frame processing hot path, measured in process.
+
+    python -m benchmarks.stages --frames 200 --output stages.json
+
+Stages run over the same deterministic frames (or a recorded video with
+--video) in the order the service runs them: JPEG decode, color
+conversion, pose inference, fall scoring, overlay rendering and JPEG
+encode, followed by the whole worker path for /ws/fall-detection and
+/ws/camera-stream frames.
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.models.synthetic import synthetic_landmarks
+from app.services import inference_pool
+from app.services.camera_service import CameraService
+from app.services.fall_detector import FallDetector
+
+from .common import load_frames, summarize, write_results
+
+
+def time_calls(func: Callable, items: List, warmup: int = 0) -> List[float]:
+    """
+    Call func on each item in turn and return the duration of each call
+    after the first warmup ones
+    """
+    durations = []
+    for i, item in enumerate(items):
+        start = time.perf_counter()
+        func(item)
+        if i >= warmup:
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def bench_codec(frames: List[np.ndarray], jpegs: List[bytes], warmup: int) -> Dict:
+    rgb = time_calls(lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), frames, warmup)
+    return {
+        'decode': summarize(time_calls(inference_pool._decode_frame, jpegs, warmup)),
+        'color_convert': summarize(rgb),
+        'encode': summarize(time_calls(inference_pool._encode_frame, frames, warmup))
+    }
+
+
+def bench_inference(frames: List[np.ndarray], tier: str, warmup: int) -> Dict:
+    """
+    Raw MediaPipe inference on RGB frames and the full detect_pose call,
+    each with its own tracking-mode detector fed the frames in order
+    """
+    detector = FallDetector()._create_pose_detector(tier)
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    raw = time_calls(detector.pose.process, rgb_frames[:warmup] + rgb_frames, warmup)
+    detector.close()
+
+    detector = FallDetector()._create_pose_detector(tier)
+    detected = []
+    pose = time_calls(lambda frame: detected.append(detector.detect_pose(frame)[0]), frames[:warmup] + frames, warmup)
+    detector.close()
+
+    return {
+        f'inference.{tier}': summarize(raw),
+        # Fraction of frames with a person found; inference costs more
+        # while tracking than when searching, so compare like with like
+        f'detect_pose.{tier}': dict(summarize(pose), detection_rate=round(float(np.mean(detected[warmup:])), 4))
+    }
+
+
+def bench_scoring(landmark_sequence: List[np.ndarray], frame_shape, warmup: int) -> Dict:
+    detector = FallDetector()
+    frames = list(enumerate(landmark_sequence[:warmup] + landmark_sequence))
+
+    # Video time at 30 FPS, restarting the person after the warmup frames
+    def score(item):
+        i, landmarks = item
+        person_id = 'warmup' if i < warmup else 'bench'
+        detector.score_landmarks(landmarks, frame_shape, person_id, capture_ts=1.0 + i / 30)
+
+    return {'scoring': summarize(time_calls(score, frames, warmup))}
+
+
+def bench_overlay(frames: List[np.ndarray], landmark_sequence: List[np.ndarray], tier: str, warmup: int) -> Dict:
+    """
+    Skeleton and status overlays as drawn for /ws/camera-stream, on the
+    synthetic landmarks so every frame has a person to draw
+    """
+    camera_service = CameraService()
+    pose_detector = camera_service.fall_detector._create_pose_detector(tier)
+    fall_result = {'fall_detected': True, 'confidence': 0.9, 'angle': 80.0, 'velocity': 120.0}
+
+    def draw(item):
+        frame, landmarks = item
+        processed = pose_detector.draw_landmarks(frame, landmarks)
+        processed = camera_service._add_pose_overlay(processed, landmarks)
+        camera_service._add_fall_detection_overlay(processed, fall_result)
+
+    pairs = list(zip(frames, landmark_sequence))
+    durations = time_calls(draw, pairs[:warmup] + pairs, warmup)
+    pose_detector.close()
+    return {'overlay': summarize(durations)}
+
+
+def bench_worker_paths(jpegs: List[bytes], tier: str, warmup: int) -> Dict:
+    """
+    The functions inference workers run per frame, decode to result
+    """
+    inference_pool._init_worker()
+    items = list(enumerate(jpegs[:warmup] + jpegs))
+
+    def detect(item):
+        i, data = item
+        inference_pool._detect_fall(data, f'detect-{i >= warmup}', False, tier, 1.0 + i / 30)
+
+    def detect_rendered(item):
+        i, data = item
+        inference_pool._detect_fall(data, f'render-{i >= warmup}', True, tier, 1.0 + i / 30)
+
+    def overlay(item):
+        i, data = item
+        inference_pool._process_frame_with_overlay(data, f'overlay-{i >= warmup}', tier, 1.0 + i / 30)
+
+    return {
+        f'end_to_end.detect_fall.{tier}': summarize(time_calls(detect, items, warmup)),
+        f'end_to_end.detect_fall_rendered.{tier}': summarize(time_calls(detect_rendered, items, warmup)),
+        f'end_to_end.camera_stream.{tier}': summarize(time_calls(overlay, items, warmup))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-stage latency of the fall detection hot path')
+    parser.add_argument('--frames', type=int, default=120, help='Frames timed per stage (default: 120)')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed frames before each stage (default: 10)')
+    parser.add_argument('--width', type=int, default=640, help='Frame width (default: 640)')
+    parser.add_argument('--height', type=int, default=480, help='Frame height (default: 480)')
+    parser.add_argument('--video', help='Use frames from this recorded video instead of synthetic ones')
+    parser.add_argument('--tier', action='append', choices=sorted(settings.POSE_MODEL_TIERS),
+                        help='Pose model tier to benchmark, may be repeated (default: POSE_MODEL_TIER)')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    tiers = args.tier or [settings.POSE_MODEL_TIER]
+    warmup = max(0, args.warmup)
+
+    frames = load_frames(args.frames, args.width, args.height, args.video)
+    jpegs = [inference_pool._encode_frame(frame) for frame in frames]
+    landmark_sequence = synthetic_landmarks(len(frames), args.width, args.height)
+
+    results = bench_codec(frames[:warmup] + frames, jpegs[:warmup] + jpegs, warmup)
+    for tier in tiers:
+        results.update(bench_inference(frames, tier, warmup))
+    results.update(bench_scoring(landmark_sequence, frames[0].shape, warmup))
+    results.update(bench_overlay(frames, landmark_sequence, tiers[0], warmup))
+    for tier in tiers:
+        results.update(bench_worker_paths(jpegs, tier, warmup))
+
+    config = {
+        'frames': len(frames),
+        'warmup': warmup,
+        'width': args.width,
+        'height': args.height,
+        'source': args.video or 'synthetic',
+        'tiers': tiers,
+        'mean_jpeg_bytes': int(np.mean([len(data) for data in jpegs]))
+    }
+    write_results('stages', config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
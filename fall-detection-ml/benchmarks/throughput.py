@@ -0,0 +1,266 @@
+"""
+End-to-end throughput and latency of the service with N concurrent
+synthetic clients.
+
+    python -m benchmarks.throughput --clients 1 4 8 --duration 20 --output throughput.json
+
+Each client sends deterministic frames over REST (/api/v1/detect-fall),
+/ws/fall-detection or /ws/camera-stream and waits for every reply before
+sending the next frame (closed loop), optionally capped with --fps.
+
+Without --url a server is started on a free local port with adaptive
+sampling and the load governor turned off, so every frame reaches
+inference, and notifications disabled; pass --env to override that.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+
+from app.services.frame_ingest import pack_frame
+from app.services.inference_pool import _encode_frame
+from app.services.result_codec import decode_result
+
+from .common import load_frames, summarize, write_results
+
+MODES = ('rest', 'ws-fall', 'ws-camera')
+
+# Server settings for runs against a server we start ourselves. The
+# synthetic frames show a fall, so notifications go to a closed local port
+# rather than a real backend.
+DEFAULT_SERVER_ENV = {
+    'SAMPLER_ENABLED': 'false',
+    'GOVERNOR_ENABLED': 'false',
+    'BACKEND_URL': 'http://127.0.0.1:9'
+}
+
+
+class ClientStats:
+    """
+    Replies and latencies seen by one client inside the measured window
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.skipped = 0
+        self.errors = 0
+
+
+async def run_rest_client(base_url: str, user_id: str, frames: List[bytes], start: float, measure_from: float,
+                          deadline: float, interval: float, stats: ClientStats):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        seq = 0
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            try:
+                response = await client.post(
+                    '/api/v1/detect-fall',
+                    params={'user_id': user_id, 'capture_ts': time.time(), 'seq': seq},
+                    files={'file': ('frame.jpg', frames[seq % len(frames)], 'image/jpeg')}
+                )
+                ok = response.status_code == 200
+                skipped = ok and response.json().get('skipped', False)
+            except httpx.HTTPError:
+                ok, skipped = False, False
+            _record(stats, sent, measure_from, ok, skipped)
+            seq += 1
+            await _pace(start, seq, interval)
+
+        await client.post(f'/api/v1/reset-detector/{user_id}')
+
+
+async def run_ws_client(ws_url: str, frames: List[bytes], start: float, measure_from: float, deadline: float,
+                        interval: float, stats: ClientStats, protocol: Optional[str]):
+    """
+    Client for both websocket endpoints; protocol is binary or json for
+    /ws/fall-detection and None for /ws/camera-stream
+    """
+    try:
+        async with websockets.connect(ws_url, max_size=None) as websocket:
+            seq = 0
+            while time.perf_counter() < deadline:
+                message = pack_frame(frames[seq % len(frames)], seq, time.time())
+                sent = time.perf_counter()
+                await websocket.send(message)
+                reply = await websocket.recv()
+
+                if protocol == 'binary':
+                    skipped = decode_result(reply)['skipped']
+                elif protocol == 'json':
+                    skipped = json.loads(reply).get('skipped', False)
+                else:
+                    # The camera stream echoes frames it skipped unchanged
+                    skipped = reply == message
+                _record(stats, sent, measure_from, True, skipped)
+                seq += 1
+                await _pace(start, seq, interval)
+    except (OSError, websockets.WebSocketException) as e:
+        print(f"Websocket client failed: {e}", file=sys.stderr)
+        stats.errors += 1
+
+
+def _record(stats: ClientStats, sent: float, measure_from: float, ok: bool, skipped: bool):
+    if sent < measure_from:
+        return
+    if not ok:
+        stats.errors += 1
+        return
+    stats.latencies.append(time.perf_counter() - sent)
+    stats.skipped += skipped
+
+
+async def _pace(start: float, sent_count: int, interval: float):
+    if interval > 0:
+        delay = start + sent_count * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def run_load(base_url: str, mode: str, clients: int, frames: List[bytes], duration: float, warmup: float,
+                   fps: float, protocol: str) -> Dict:
+    """
+    Run clients concurrent clients of one mode and summarize what they saw
+    """
+    ws_base = 'ws' + base_url[len('http'):]
+    interval = 1.0 / fps if fps > 0 else 0.0
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    all_stats = [ClientStats() for _ in range(clients)]
+    tasks = []
+    for i, stats in enumerate(all_stats):
+        user_id = f'bench-{mode}-{clients}-{i}'
+        # Offset each client's frames so they are not in lockstep
+        client_frames = frames[i % len(frames):] + frames[:i % len(frames)]
+        if mode == 'rest':
+            tasks.append(run_rest_client(base_url, user_id, client_frames, start, measure_from, deadline,
+                                         interval, stats))
+        elif mode == 'ws-fall':
+            tasks.append(run_ws_client(f'{ws_base}/ws/fall-detection/{user_id}?protocol={protocol}',
+                                       client_frames, start, measure_from, deadline, interval, stats, protocol))
+        else:
+            tasks.append(run_ws_client(f'{ws_base}/ws/camera-stream/{user_id}',
+                                       client_frames, start, measure_from, deadline, interval, stats, None))
+    await asyncio.gather(*tasks)
+
+    latencies = [latency for stats in all_stats for latency in stats.latencies]
+    return {
+        'clients': clients,
+        'frames': len(latencies),
+        'skipped': sum(stats.skipped for stats in all_stats),
+        'errors': sum(stats.errors for stats in all_stats),
+        'throughput_fps': round(len(latencies) / duration, 3),
+        'per_client_fps': [round(len(stats.latencies) / duration, 3) for stats in all_stats],
+        'latency_ms': summarize(latencies)
+    }
+
+
+def start_server(env_overrides: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """
+    Start the service on a free local port
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    env = dict(os.environ, **env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env
+    )
+    return process, f'http://127.0.0.1:{port}'
+
+
+def wait_until_ready(base_url: str, timeout: float = 120.0):
+    """
+    Wait for the server's readiness probe, or for /health on servers
+    predating /ready
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status = httpx.get(f'{base_url}/ready', timeout=2.0).status_code
+            if status == 404:
+                status = httpx.get(f'{base_url}/health', timeout=2.0).status_code
+            if status == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end throughput with concurrent synthetic clients')
+    parser.add_argument('--url', help='Benchmark a running server instead of starting one')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Environment for the started server, may be repeated')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help='Endpoints to load')
+    parser.add_argument('--clients', nargs='+', type=int, default=[1, 4], help='Concurrent clients per run')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds per run (default: 10)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Unmeasured seconds per run (default: 2)')
+    parser.add_argument('--fps', type=float, default=0.0, help='Frame rate cap per client, 0 for none')
+    parser.add_argument('--protocol', choices=['binary', 'json'], default='binary',
+                        help='Result protocol for /ws/fall-detection (default: binary)')
+    parser.add_argument('--frames', type=int, default=60, help='Distinct frames cycled by clients (default: 60)')
+    parser.add_argument('--width', type=int, default=640, help='Frame width (default: 640)')
+    parser.add_argument('--height', type=int, default=480, help='Frame height (default: 480)')
+    parser.add_argument('--video', help='Use frames from this recorded video instead of synthetic ones')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    frames = [_encode_frame(frame) for frame in load_frames(args.frames, args.width, args.height, args.video)]
+
+    server = None
+    server_env = {}
+    base_url = args.url
+    if base_url is None:
+        server_env = dict(DEFAULT_SERVER_ENV, **dict(item.split('=', 1) for item in args.env))
+        server, base_url = start_server(server_env)
+    base_url = base_url.rstrip('/')
+
+    results = {}
+    try:
+        wait_until_ready(base_url)
+        for mode in args.modes:
+            for clients in args.clients:
+                print(f"Running {mode} with {clients} clients", file=sys.stderr)
+                results[f'{mode}.c{clients}'] = dict(mode=mode, **asyncio.run(run_load(
+                    base_url, mode, clients, frames, args.duration, args.warmup, args.fps, args.protocol
+                )))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    config = {
+        'url': args.url,
+        'server_env': server_env,
+        'modes': args.modes,
+        'clients': args.clients,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'fps': args.fps,
+        'protocol': args.protocol,
+        'frames': len(frames),
+        'width': args.width,
+        'height': args.height,
+        'source': args.video or 'synthetic'
+    }
+    write_results('throughput', config, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,17 +15,28 @@ import time
 from datetime import datetime
 import argparse
 import logging
+import os
 from pathlib import Path
 import threading
 import queue
 
+# Frame header understood by the ML service (magic, sequence number and
+# capture time in front of the JPEG bytes), shared with the service so the
+# two cannot drift apart
+from app.services.frame_ingest import FRAME_HEADER, FRAME_MAGIC
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RealTimeFallDetection:
-    def __init__(self, server_url="http://localhost:3000", user_id="default"):
+    def __init__(self, server_url="http://localhost:3000", user_id="default", window=4, edge=False,
+                 upload_landmarks=False, landmark_batch_size=15, backend_url="http://localhost:3000",
+                 backend_token=None):
         self.server_url = server_url
+        self.backend_url = backend_url
+        # The backend's notifications API only accepts authenticated calls
+        self.backend_headers = {'Authorization': f'Bearer {backend_token}'} if backend_token else {}
         self.user_id = user_id
         self.ws_url = server_url.replace("http://", "ws://").replace("https://", "wss://")
         
@@ -43,6 +54,29 @@ class RealTimeFallDetection:
         # WebSocket connection
         self.websocket = None
         self.ws_connected = False
+        self.seq = 0
+        
+        # Frames sent but not yet answered, seq -> capture time. The server
+        # skips stale frames, so an answer settles every older seq too.
+        self.window = window
+        self.in_flight = {}
+        self.window_slots = None
+        self.round_trip_ms = 0.0
+        
+        # Edge mode: pose and fall detection run on this machine and only
+        # fall events are uploaded, to the backend's notifications API
+        self.edge = edge
+        self.fall_detector = None
+        self.event_queue = queue.Queue(maxsize=100)
+        self.event_max_attempts = 5
+        self.http = requests.Session()
+        
+        # Edge mode can also upload landmark batches for server-side scoring
+        self.upload_landmarks = upload_landmarks
+        self.landmark_batch_size = landmark_batch_size
+        self.landmark_buffer = []
+        self.landmark_queue = queue.Queue(maxsize=20)
+        self.encode_landmark_batch = None
         
     async def connect_to_server(self):
         """Connect to WebSocket server"""
@@ -56,31 +90,103 @@ class RealTimeFallDetection:
             logger.error(f"Failed to connect to WebSocket: {e}")
             return False
     
-    async def send_frame_to_server(self, frame):
-        """Send frame to server for processing"""
-        if not self.ws_connected or not self.detection_active:
-            return
-            
+    async def send_frame_to_server(self, frame, capture_ts):
+        """Send frame to server for processing, without waiting for the answer"""
+        # Encode frame to JPEG
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        self.seq += 1
+        frame_bytes = FRAME_HEADER.pack(FRAME_MAGIC, self.seq, capture_ts) + buffer.tobytes()
+        
+        # Send frame to server
+        self.in_flight[self.seq] = capture_ts
+        await self.websocket.send(frame_bytes)
+    
+    async def send_frames(self):
+        """Send captured frames while fewer than `window` are awaiting an answer"""
+        loop = asyncio.get_running_loop()
+        
+        while self.ws_connected:
+            try:
+                if not self.detection_active:
+                    await asyncio.sleep(0.05)
+                    continue
+                
+                # Wait for a free slot, then for the next captured frame,
+                # rechecking the connection while the window is full
+                try:
+                    await asyncio.wait_for(self.window_slots.acquire(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                try:
+                    if not self.ws_connected:
+                        self.window_slots.release()
+                        break
+                    item = await loop.run_in_executor(None, self.next_captured_frame)
+                    if item is None:
+                        self.window_slots.release()
+                        continue
+                    await self.send_frame_to_server(*item)
+                except Exception:
+                    self.window_slots.release()
+                    raise
+                    
+            except Exception as e:
+                logger.error(f"Error sending frame to server: {e}")
+                await asyncio.sleep(1)
+    
+    def next_captured_frame(self, timeout=0.5):
+        """Wait briefly for the next (frame, capture time) from the camera"""
         try:
-            # Encode frame to JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            frame_bytes = buffer.tobytes()
-            
-            # Send frame to server
-            await self.websocket.send(frame_bytes)
-            
-            # Receive processed frame
-            processed_bytes = await self.websocket.recv()
-            
-            # Decode processed frame
-            nparr = np.frombuffer(processed_bytes, np.uint8)
-            processed_frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            return processed_frame
-            
+            return self.frame_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    async def receive_frames(self):
+        """Receive processed frames and match them to sent frames by seq"""
+        try:
+            async for processed_bytes in self.websocket:
+                seq = None
+                if processed_bytes[:4] == FRAME_MAGIC:
+                    _, seq, _ = FRAME_HEADER.unpack_from(processed_bytes)
+                    processed_bytes = processed_bytes[FRAME_HEADER.size:]
+                
+                self.settle_frames(seq)
+                
+                # Decode processed frame
+                nparr = np.frombuffer(processed_bytes, np.uint8)
+                processed_frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                if processed_frame is None:
+                    continue
+                
+                # Add to result queue
+                if self.result_queue.full():
+                    self.result_queue.get()
+                self.result_queue.put(processed_frame)
+                
         except Exception as e:
-            logger.error(f"Error sending frame to server: {e}")
-            return frame
+            logger.error(f"Error receiving frames from server: {e}")
+        finally:
+            self.ws_connected = False
+            # No answers will come for frames still in flight: free their slots
+            for _ in self.in_flight:
+                self.window_slots.release()
+            self.in_flight.clear()
+            logger.warning("Disconnected from WebSocket server")
+    
+    def settle_frames(self, seq):
+        """Free the window slots of the answered frame and of any older ones the server skipped"""
+        if seq is None:
+            # No header echoed back: settle the oldest frame
+            settled = sorted(self.in_flight)[:1]
+        else:
+            settled = [s for s in self.in_flight if s <= seq]
+            if seq in self.in_flight:
+                round_trip = (time.time() - self.in_flight[seq]) * 1000
+                self.round_trip_ms += 0.1 * (round_trip - self.round_trip_ms)
+        
+        for s in settled:
+            del self.in_flight[s]
+            self.window_slots.release()
     
     def capture_frames(self):
         """Capture frames from camera"""
@@ -89,7 +195,7 @@ class RealTimeFallDetection:
             if ret:
                 if self.frame_queue.full():
                     self.frame_queue.get()
-                self.frame_queue.put(frame)
+                self.frame_queue.put((frame, time.time()))
             else:
                 logger.error("Failed to capture frame")
                 break
@@ -100,11 +206,12 @@ class RealTimeFallDetection:
         
         while True:
             try:
-                # Get processed frame from queue or use original
+                # Get processed frame from queue, or the camera frame while
+                # detection is off (frames are left to processing otherwise)
                 if not self.result_queue.empty():
                     frame = self.result_queue.get()
-                elif not self.frame_queue.empty():
-                    frame = self.frame_queue.get()
+                elif not self.detection_active and not self.frame_queue.empty():
+                    frame, _ = self.frame_queue.get()
                 else:
                     continue
                 
@@ -140,6 +247,11 @@ class RealTimeFallDetection:
         cv2.rectangle(frame, (10, 10), (300, 60), status_color, -1)
         cv2.putText(frame, status_text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         
+        # Add link stats
+        if self.ws_connected:
+            cv2.putText(frame, f"RTT: {self.round_trip_ms:.0f} ms | In flight: {len(self.in_flight)}/{self.window}",
+                        (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        
         # Add instructions
         cv2.putText(frame, "Press 'D' to toggle detection", (10, h - 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
         cv2.putText(frame, "Press 'R' to reset detector", (10, h - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
@@ -166,52 +278,197 @@ class RealTimeFallDetection:
             logger.error(f"Error resetting detector: {e}")
     
     async def process_frames_async(self):
-        """Process frames asynchronously"""
+        """Process frames asynchronously, sending and receiving independently, reconnecting after a drop"""
+        retry_delay = 1
         while True:
-            try:
-                if not self.frame_queue.empty() and self.detection_active and self.ws_connected:
-                    frame = self.frame_queue.get()
-                    
-                    # Send to server and get processed frame
-                    processed_frame = await self.send_frame_to_server(frame)
-                    
-                    # Add to result queue
-                    if self.result_queue.full():
-                        self.result_queue.get()
-                    self.result_queue.put(processed_frame)
-                    
-                    # Small delay to prevent overwhelming the server
-                    await asyncio.sleep(0.1)
-                    
-            except Exception as e:
-                logger.error(f"Error processing frame: {e}")
-                await asyncio.sleep(1)
+            self.window_slots = asyncio.Semaphore(self.window)
+            self.in_flight.clear()
+            await asyncio.gather(self.send_frames(), self.receive_frames())
+            
+            # Reconnect with backoff, pausing even before the first attempt
+            while True:
+                await asyncio.sleep(retry_delay)
+                if await self.connect_to_server():
+                    retry_delay = 1
+                    break
+                retry_delay = min(retry_delay * 2, 30)
     
     def run_sync_processing(self):
         """Run frame processing in sync mode (fallback)"""
+        if self.edge:
+            self.init_edge()
+        
         while True:
             try:
-                if not self.frame_queue.empty() and self.detection_active:
-                    frame = self.frame_queue.get()
-                    
-                    # Simple local processing (fallback)
-                    processed_frame = self.local_process_frame(frame)
-                    
-                    if self.result_queue.full():
-                        self.result_queue.get()
-                    self.result_queue.put(processed_frame)
-                    
+                if not self.detection_active:
+                    time.sleep(0.05)
+                    continue
+                
+                item = self.next_captured_frame()
+                if item is None:
+                    continue
+                frame, capture_ts = item
+                
+                # Local processing (fallback), with real inference in edge mode
+                processed_frame = self.local_process_frame(frame, capture_ts)
+                
+                if self.result_queue.full():
+                    self.result_queue.get()
+                self.result_queue.put(processed_frame)
+                
+                # Inference paces edge mode; otherwise keep the old pace
+                if self.fall_detector is None:
                     time.sleep(0.1)
                     
             except Exception as e:
                 logger.error(f"Error in sync processing: {e}")
                 time.sleep(1)
     
-    def local_process_frame(self, frame):
+    def init_edge(self):
+        """Load the ML service's pose and fall detection models on this machine"""
+        if self.fall_detector is not None:
+            return True
+        
+        try:
+            from app.services.fall_detector import FallDetector
+            from app.services.landmark_codec import encode_landmark_batch
+        except ImportError as e:
+            logger.error(f"Edge mode needs the ML service dependencies (mediapipe): {e}")
+            return False
+        
+        self.fall_detector = FallDetector()
+        self.encode_landmark_batch = encode_landmark_batch
+        
+        if not self.backend_headers:
+            logger.warning("No backend token (--backend-token or BACKEND_TOKEN): the backend will reject fall events")
+        
+        uploader = threading.Thread(target=self.upload_events)
+        uploader.daemon = True
+        uploader.start()
+        
+        if self.upload_landmarks:
+            landmark_uploader = threading.Thread(target=self.upload_landmark_batches)
+            landmark_uploader.daemon = True
+            landmark_uploader.start()
+        
+        logger.info("Edge mode: running pose and fall detection locally")
+        return True
+    
+    def local_process_frame(self, frame, capture_ts=None):
         """Local frame processing (fallback when server is unavailable)"""
-        # Add simple text overlay indicating local processing
-        cv2.putText(frame, "LOCAL PROCESSING", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-        return frame
+        if self.fall_detector is None:
+            # Add simple text overlay indicating local processing
+            cv2.putText(frame, "LOCAL PROCESSING", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+            return frame
+        
+        result = self.fall_detector.detect_fall(frame, self.user_id, render=True, capture_ts=capture_ts)
+        processed_frame = result['processed_frame']
+        
+        if result['fall_detected']:
+            status_text, status_color = f"EDGE: FALL DETECTED ({result['confidence']:.0%})", (0, 0, 255)
+        else:
+            status_text, status_color = "EDGE: MONITORING", (0, 255, 255)
+        cv2.putText(processed_frame, status_text, (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, status_color, 2)
+        
+        # Only events and, optionally, landmarks leave the device
+        if result['fall_detected'] and result.get('should_notify', False):
+            self.queue_event(result)
+        if self.upload_landmarks:
+            self.buffer_landmarks(result, frame.shape, capture_ts)
+        
+        return processed_frame
+    
+    def buffer_landmarks(self, result, frame_shape, capture_ts):
+        """Collect landmarks into batches for upload"""
+        self.seq += 1
+        self.landmark_buffer.append({
+            'seq': self.seq,
+            'capture_ts': capture_ts if capture_ts is not None else time.time(),
+            'width': frame_shape[1],
+            'height': frame_shape[0],
+            'landmarks': result['landmarks']
+        })
+        
+        if len(self.landmark_buffer) >= self.landmark_batch_size:
+            batch = self.encode_landmark_batch(self.landmark_buffer)
+            self.landmark_buffer = []
+            
+            # Landmarks are best effort: drop the oldest batch on a slow uplink
+            if self.landmark_queue.full():
+                self.landmark_queue.get()
+            self.landmark_queue.put(batch)
+    
+    def upload_landmark_batches(self):
+        """Upload landmark batches for server-side scoring, without server notifications"""
+        while True:
+            batch = self.landmark_queue.get()
+            try:
+                response = self.http.post(
+                    f"{self.server_url}/api/v1/score-landmarks",
+                    params={'user_id': self.user_id, 'notify': 'false'},
+                    data=batch,
+                    headers={'Content-Type': 'application/octet-stream'},
+                    timeout=10
+                )
+                if not response.ok:
+                    logger.error(f"Failed to upload landmarks: {response.status_code}")
+            except Exception as e:
+                logger.error(f"Error uploading landmarks: {e}")
+    
+    def queue_event(self, result):
+        """Queue a fall event for upload without blocking inference"""
+        event = {
+            'userId': self.user_id,
+            'type': 'FALL_DETECTED',
+            'data': {
+                'confidence': result['confidence'],
+                'angle': result['angle'],
+                'velocity': result['velocity'],
+                'timestamp': result['timestamp']
+            }
+        }
+        
+        if self.event_queue.full():
+            self.event_queue.get()
+            logger.error("Event queue full, dropped oldest fall event")
+        self.event_queue.put(event)
+    
+    def upload_events(self):
+        """
+        Upload queued fall events to the backend. Server errors and network
+        failures are retried with backoff up to event_max_attempts times;
+        an event the backend rejects (4xx) is dropped, as resending it
+        cannot succeed.
+        """
+        while True:
+            event = self.event_queue.get()
+            retry_delay = 1
+            for attempt in range(1, self.event_max_attempts + 1):
+                try:
+                    response = self.http.post(
+                        f"{self.backend_url}/api/v1/notifications/fall-detected",
+                        json=event,
+                        headers=self.backend_headers,
+                        timeout=10
+                    )
+                    if response.ok:
+                        logger.info("Fall event uploaded")
+                        break
+                    if response.status_code in (401, 403):
+                        logger.error(f"Backend refused the fall event ({response.status_code}): check the backend token")
+                        break
+                    if 400 <= response.status_code < 500:
+                        logger.error(f"Fall event rejected by the backend, dropping it: {response.status_code} - {response.text}")
+                        break
+                    logger.error(f"Failed to upload fall event: {response.status_code}")
+                except Exception as e:
+                    logger.error(f"Error uploading fall event: {e}")
+                
+                if attempt == self.event_max_attempts:
+                    logger.error(f"Giving up on fall event after {attempt} attempts")
+                    break
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
     
     async def run_async(self):
         """Run the application with async processing"""
@@ -230,8 +487,8 @@ class RealTimeFallDetection:
         capture_thread.daemon = True
         capture_thread.start()
         
-        # Run display in main thread
-        self.display_frames()
+        # Run display off the event loop so sending and receiving keep going
+        await asyncio.get_running_loop().run_in_executor(None, self.display_frames)
         
         # Cleanup
         self.cap.release()
@@ -260,21 +517,36 @@ def main():
     parser = argparse.ArgumentParser(description='Real-time Fall Detection Camera App')
     parser.add_argument('--server-url', default='http://localhost:3000', 
                        help='Server URL (default: http://localhost:3000)')
+    parser.add_argument('--backend-url', default='http://localhost:3000',
+                       help='Backend URL that fall events are uploaded to in edge mode (default: http://localhost:3000)')
+    parser.add_argument('--backend-token', default=os.getenv('BACKEND_TOKEN'),
+                       help='Bearer token (JWT) for the backend in edge mode (default: BACKEND_TOKEN env var)')
     parser.add_argument('--user-id', default='default', 
                        help='User ID (default: default)')
     parser.add_argument('--use-async', dest='use_async', action='store_true', 
                        help='Use async processing (requires server connection)')
     parser.add_argument('--local-only', action='store_true', 
                        help='Run in local-only mode without server')
+    parser.add_argument('--window', type=int, default=4,
+                       help='Max frames awaiting an answer from the server (default: 4)')
+    parser.add_argument('--edge', action='store_true',
+                       help='Run pose and fall detection on this machine and upload only fall events')
+    parser.add_argument('--upload-landmarks', action='store_true',
+                       help='In edge mode, also upload landmark batches to the server')
     
     args = parser.parse_args()
     
     app = RealTimeFallDetection(
         server_url=args.server_url,
-        user_id=args.user_id
+        user_id=args.user_id,
+        window=max(1, args.window),
+        edge=args.edge,
+        upload_landmarks=args.upload_landmarks,
+        backend_url=args.backend_url,
+        backend_token=args.backend_token
     )
     
-    if args.use_async and not args.local_only:
+    if args.use_async and not args.local_only and not args.edge:
         try:
             asyncio.run(app.run_async())
         except KeyboardInterrupt:
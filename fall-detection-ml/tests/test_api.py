@@ -0,0 +1,132 @@
+"""
+Endpoint checks that need no inference workers: landmark scoring runs in
+the API process, and frame inference is replaced by scoring no landmarks
+at the frame's capture time, which is where bad capture times failed.
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.models.landmarks import empty_landmarks
+from app.services.frame_ingest import pack_frame
+from app.services.landmark_codec import encode_landmark_batch
+from app.services.result_codec import decode_result
+
+client = TestClient(main.app)
+
+LANDMARKS = np.random.default_rng(0).random((33, 4), dtype=np.float32) * 100
+
+
+def run_session(func, timeout=10.0):
+    """Run a websocket exchange, failing instead of blocking if the server drops the session"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = func()
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "websocket session stalled"
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('value')
+
+
+def landmark_batch(capture_ts, count=3):
+    return encode_landmark_batch([
+        {'seq': seq, 'capture_ts': capture_ts, 'width': 640, 'height': 480, 'landmarks': LANDMARKS}
+        for seq in range(1, count + 1)
+    ])
+
+
+def post_landmarks(data, user_id='api-test'):
+    return client.post(
+        '/api/v1/score-landmarks',
+        params={'user_id': user_id, 'notify': 'false'},
+        content=data,
+        headers={'Content-Type': 'application/octet-stream'}
+    )
+
+
+def test_score_landmarks():
+    response = post_landmarks(landmark_batch(time.time()))
+    assert response.status_code == 200
+    assert [result['seq'] for result in response.json()['results']] == [1, 2, 3]
+
+
+@pytest.mark.parametrize('data,status', [
+    (b'junk', 400),
+    (landmark_batch(1e20), 422),
+    (landmark_batch(float('nan')), 422),
+])
+def test_score_landmarks_rejects_bad_batches(data, status):
+    assert post_landmarks(data).status_code == status
+
+
+def test_score_landmarks_rejects_large_batches(monkeypatch):
+    monkeypatch.setattr(main.settings, 'LANDMARK_MAX_BATCH_FRAMES', 2)
+    assert post_landmarks(landmark_batch(time.time(), count=3)).status_code == 413
+
+
+def test_landmark_websocket_closes_on_bad_capture_time():
+    def session():
+        with client.websocket_connect('/ws/landmarks/api-test?notify=false') as websocket:
+            websocket.send_bytes(landmark_batch(time.time()))
+            assert len(websocket.receive_bytes()) > 0
+
+            websocket.send_bytes(landmark_batch(1e20))
+            return websocket.receive()
+
+    message = run_session(session)
+    assert message['type'] == 'websocket.close'
+    assert message['code'] == 1007
+
+
+@pytest.fixture
+def scored_inference(monkeypatch):
+    """Replace frame inference with landmark scoring, recording capture times"""
+    capture_times = []
+
+    async def detect_fall(data, user_id, encode_frame=False, tier=None, capture_ts=None):
+        capture_times.append(capture_ts)
+        return main.landmark_scorer.score_landmarks(empty_landmarks(), (480, 640), user_id, capture_ts)
+
+    async def reset_person(user_id):
+        pass
+
+    monkeypatch.setattr(main.batch_scheduler, 'detect_fall', detect_fall)
+    monkeypatch.setattr(main.inference_pool, 'reset_person', reset_person)
+    monkeypatch.setattr(main.settings, 'SAMPLER_ENABLED', False)
+    return capture_times
+
+
+@pytest.mark.parametrize('capture_ts', ['1e20', 'nan', 'inf', '-1e20'])
+def test_detect_fall_ignores_unusable_capture_times(scored_inference, capture_ts):
+    response = client.post(
+        '/api/v1/detect-fall',
+        params={'user_id': 'api-test', 'capture_ts': capture_ts},
+        files={'file': ('frame.jpg', b'\xff\xd8', 'image/jpeg')}
+    )
+    assert response.status_code == 200
+    assert scored_inference == [None]
+
+
+def test_websocket_survives_unusable_capture_times(scored_inference):
+    now = time.time()
+
+    def session():
+        with client.websocket_connect('/ws/fall-detection/api-test?protocol=binary') as websocket:
+            for seq, capture_ts in enumerate([1e20, float('nan'), now], start=1):
+                websocket.send_bytes(pack_frame(b'\xff\xd8', seq, capture_ts))
+                assert decode_result(websocket.receive_bytes())['seq'] == seq
+
+    run_session(session)
+    assert scored_inference == [None, None, now]
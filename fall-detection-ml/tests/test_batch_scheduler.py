@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.batch_scheduler import BatchScheduler
+from app.services.load_governor import LoadGovernor
+
+
+class FakePool:
+    """Answers each job with its data, failing jobs whose data is b'fail'"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def run_batch(self, jobs):
+        self.batches.append(jobs)
+        await asyncio.sleep(0)
+        return [(False, ValueError('bad frame')) if job.data == b'fail' else (True, (job.data, job.tier))
+                for job in jobs]
+
+
+def make_scheduler(pool, **options):
+    scheduler = BatchScheduler(pool, governor=LoadGovernor(enabled=False), **options)
+    scheduler.available_tiers = set(settings.POSE_MODEL_TIERS)
+    return scheduler
+
+
+def test_frames_are_batched_and_answered():
+    async def scenario():
+        pool = FakePool()
+        scheduler = make_scheduler(pool, max_batch_size=4, max_wait_ms=50)
+        scheduler.start()
+        try:
+            results = await asyncio.gather(*(
+                scheduler.detect_fall(str(i).encode(), f'user{i}') for i in range(6)
+            ))
+        finally:
+            await scheduler.stop()
+        return pool, scheduler, results
+
+    pool, scheduler, results = asyncio.run(scenario())
+    assert [data for data, _ in results] == [str(i).encode() for i in range(6)]
+    assert [len(batch) for batch in pool.batches] == [4, 2]
+    assert scheduler.get_stats()['frames'] == 6
+
+
+def test_failed_frames_raise_for_their_caller_only():
+    async def scenario():
+        scheduler = make_scheduler(FakePool(), max_batch_size=8, max_wait_ms=20)
+        scheduler.start()
+        try:
+            return await asyncio.gather(
+                scheduler.detect_fall(b'ok', 'a'), scheduler.detect_fall(b'fail', 'b'), return_exceptions=True
+            )
+        finally:
+            await scheduler.stop()
+
+    ok, failed = asyncio.run(scenario())
+    assert ok[0] == b'ok'
+    assert isinstance(failed, ValueError)
+
+
+def test_submit_before_start_fails():
+    with pytest.raises(RuntimeError):
+        asyncio.run(make_scheduler(FakePool()).detect_fall(b'x', 'a'))
+
+
+def test_unavailable_tier_falls_back_to_default():
+    scheduler = make_scheduler(FakePool())
+    scheduler.available_tiers = {settings.POSE_MODEL_TIER}
+    other = next(tier for tier in settings.POSE_MODEL_TIERS if tier != settings.POSE_MODEL_TIER)
+
+    assert scheduler.resolve_tier(other) == settings.POSE_MODEL_TIER
+    assert scheduler.resolve_tier(None) == settings.POSE_MODEL_TIER
+
+
+def test_governor_lowers_resolved_tier():
+    scheduler = make_scheduler(FakePool())
+    scheduler.governor = LoadGovernor(enabled=True, min_dwell=0)
+    scheduler.governor.record_queue_depth(scheduler.governor.queue_high + 1)
+
+    assert scheduler.resolve_tier('heavy') == LoadGovernor.LITE_TIER
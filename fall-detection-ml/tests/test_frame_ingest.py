@@ -0,0 +1,72 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from app.services.frame_ingest import FRAME_HEADER, LatestFrameReceiver, check_capture_ts, pack_frame, parse_frame
+
+JPEG = b'\xff\xd8jpeg data'
+
+
+def test_pack_and_parse_round_trip():
+    now = time.time()
+    assert parse_frame(pack_frame(JPEG, 7, now)) == (JPEG, 7, now)
+
+
+def test_parse_drops_capture_time_far_from_server_time():
+    assert parse_frame(pack_frame(JPEG, 7, 1e20)) == (JPEG, 7, None)
+
+
+def test_parse_bare_jpeg():
+    assert parse_frame(JPEG) == (JPEG, None, None)
+
+
+def test_parse_short_frame_with_magic():
+    data = b'FDF1' + bytes(FRAME_HEADER.size - 5)
+    assert parse_frame(data) == (data, None, None)
+
+
+@pytest.mark.parametrize('capture_ts', [1e20, -1e20, math.nan, math.inf, 999.0, 1_700_000_301.0])
+def test_check_capture_ts_rejects_unusable_times(capture_ts):
+    assert check_capture_ts(capture_ts, max_skew=300, now=1_700_000_000.0) is None
+
+
+@pytest.mark.parametrize('capture_ts', [1_700_000_000.0, 1_699_999_700.0, 1_700_000_300.0])
+def test_check_capture_ts_keeps_times_near_server_time(capture_ts):
+    assert check_capture_ts(capture_ts, max_skew=300, now=1_700_000_000.0) == capture_ts
+
+
+def test_check_capture_ts_without_time():
+    assert check_capture_ts(None) is None
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+
+    async def receive_bytes(self):
+        item = await self.incoming.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+def test_latest_frame_receiver_keeps_only_the_newest_frame():
+    async def scenario():
+        websocket = FakeWebSocket()
+        frames = LatestFrameReceiver(websocket)
+        frames.start()
+        for data in (b'1', b'2', b'3'):
+            websocket.incoming.put_nowait(data)
+        await asyncio.sleep(0.01)
+
+        assert await frames.next_frame() == b'3'
+        assert frames.get_stats() == {'received': 3, 'dropped': 2}
+
+        websocket.incoming.put_nowait(ConnectionError('closed'))
+        with pytest.raises(ConnectionError):
+            await frames.next_frame()
+        await frames.stop()
+
+    asyncio.run(scenario())
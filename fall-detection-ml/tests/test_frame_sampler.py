@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from app.services.frame_sampler import FrameSampler
+
+
+def jpeg(value):
+    frame = np.full((240, 320, 3), value, dtype=np.uint8)
+    return cv2.imencode('.jpg', frame)[1].tobytes()
+
+
+def make_sampler(**overrides):
+    options = dict(enabled=True, idle_fps=1.0, motion_threshold=0.01, hot_angle=30.0, hot_hold=3.0)
+    options.update(overrides)
+    return FrameSampler(**options)
+
+
+def test_static_scene_is_sampled_at_idle_rate():
+    sampler = make_sampler()
+    frame = jpeg(100)
+    decisions = [sampler.should_sample(frame, now=i * 0.1) for i in range(21)]
+    assert decisions.count(True) == 3  # t = 0, 1 and 2 s
+
+
+def test_motion_makes_stream_hot():
+    sampler = make_sampler()
+    assert sampler.should_sample(jpeg(0), now=0.0)
+    assert sampler.should_sample(jpeg(255), now=0.1)
+    # Still hot after the motion, though the scene is static again
+    assert sampler.should_sample(jpeg(255), now=0.2)
+    # Once the hold is over only the idle rate is left
+    assert sampler.should_sample(jpeg(255), now=3.2)
+    assert not sampler.should_sample(jpeg(255), now=3.3)
+
+
+def test_result_keeps_stream_hot_and_is_replayed():
+    sampler = make_sampler()
+    sampler.should_sample(jpeg(0), now=0.0)
+    sampler.update({'fall_detected': False, 'angle': 45.0, 'processed_frame': b'x'}, now=0.0)
+
+    assert sampler.should_sample(jpeg(0), now=0.5)
+    replay = sampler.skipped_result()
+    assert replay['skipped'] and not replay['should_notify']
+    assert 'processed_frame' not in replay
+
+
+def test_invalid_frames_go_to_inference():
+    assert make_sampler().should_sample(b'not a jpeg', now=0.0)
+
+
+def test_concurrent_calls_keep_counts_consistent():
+    sampler = make_sampler()
+    frames = [jpeg(value) for value in (0, 80, 160, 240)]
+    with ThreadPoolExecutor(8) as executor:
+        decisions = list(executor.map(lambda i: sampler.should_sample(frames[i % 4]), range(400)))
+
+    assert sampler.sampled_count == decisions.count(True)
+    assert sampler.sampled_count + sampler.skipped_count == 400
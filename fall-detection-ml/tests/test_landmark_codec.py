@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.services.landmark_codec import (
+    LANDMARK_BATCH_HEADER, LANDMARK_RECORD, decode_landmark_batch, encode_landmark_batch, validate_landmark_batch
+)
+
+NOW = 1_700_000_000.0
+
+
+def make_frames(count=3, capture_ts=NOW):
+    rng = np.random.default_rng(0)
+    frames = []
+    for seq in range(1, count + 1):
+        frames.append({
+            'seq': seq,
+            'capture_ts': capture_ts + seq / 30,
+            'width': 640,
+            'height': 480,
+            # Every other frame without a person
+            'landmarks': rng.random((33, 4), dtype=np.float32) * 100 if seq % 2 else np.empty((0, 4))
+        })
+    return frames
+
+
+def test_round_trip():
+    frames = make_frames()
+    records = decode_landmark_batch(encode_landmark_batch(frames))
+
+    assert len(records) == len(frames)
+    for record, frame in zip(records, frames):
+        assert record['seq'] == frame['seq']
+        assert record['capture_ts'] == frame['capture_ts']
+        assert (record['width'], record['height']) == (640, 480)
+        assert record['landmarks'] == len(frame['landmarks'])
+        if len(frame['landmarks']):
+            np.testing.assert_array_equal(record['points'], frame['landmarks'])
+        else:
+            assert not record['points'].any()
+
+
+def test_empty_batch():
+    assert len(decode_landmark_batch(encode_landmark_batch([]))) == 0
+
+
+@pytest.mark.parametrize('data', [
+    b'FD',
+    b'XXXX' + bytes(4),
+    LANDMARK_BATCH_HEADER.pack(b'FDL1', 2) + bytes(LANDMARK_RECORD.itemsize),
+    LANDMARK_BATCH_HEADER.pack(b'FDL1', 1) + bytes(LANDMARK_RECORD.itemsize + 1),
+])
+def test_decode_rejects_malformed_batches(data):
+    with pytest.raises(ValueError):
+        decode_landmark_batch(data)
+
+
+def test_validate_accepts_good_batch():
+    validate_landmark_batch(decode_landmark_batch(encode_landmark_batch(make_frames())), now=NOW)
+
+
+def test_validate_accepts_missing_capture_time():
+    frames = make_frames()
+    for frame in frames:
+        frame['capture_ts'] = 0.0
+    validate_landmark_batch(decode_landmark_batch(encode_landmark_batch(frames)), now=NOW)
+
+
+def test_validate_rejects_bad_landmark_count():
+    records = decode_landmark_batch(encode_landmark_batch(make_frames())).copy()
+    records[1]['landmarks'] = 5
+    with pytest.raises(ValueError, match='Frame 2 has 5 landmarks'):
+        validate_landmark_batch(records, now=NOW)
+
+
+@pytest.mark.parametrize('field', ['capture_ts', 'points'])
+def test_validate_rejects_non_finite_values(field):
+    records = decode_landmark_batch(encode_landmark_batch(make_frames())).copy()
+    if field == 'points':
+        records[0]['points'][3, 1] = np.nan
+    else:
+        records[0]['capture_ts'] = np.inf
+    with pytest.raises(ValueError, match='non-finite'):
+        validate_landmark_batch(records, now=NOW)
+
+
+@pytest.mark.parametrize('capture_ts', [1e20, -1e20, NOW - 3600, NOW + 3600])
+def test_validate_rejects_capture_time_out_of_range(capture_ts):
+    records = decode_landmark_batch(encode_landmark_batch(make_frames(capture_ts=capture_ts)))
+    with pytest.raises(ValueError, match='capture time'):
+        validate_landmark_batch(records, max_skew=300, now=NOW)
+
+
+def test_validate_uses_server_time_by_default():
+    validate_landmark_batch(decode_landmark_batch(encode_landmark_batch(make_frames(capture_ts=time.time()))))
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.models.landmark_window import LandmarkWindow
+
+
+def naive_features(frames, size, still_frames):
+    """Recompute the window features of the last frame from scratch"""
+    velocities = [0.0]
+    for (t0, c0, _), (t1, c1, _) in zip(frames, frames[1:]):
+        velocities.append((c1 - c0) / (t1 - t0) if t1 > t0 else 0.0)
+
+    angles = [angle for _, _, angle in frames]
+    speeds = [abs(v) for v in velocities]
+    return {
+        'velocity': velocities[-1],
+        'peak_velocity': max(velocities[-size:]),
+        'angle_change': angles[-1] - min(angles[-size:]),
+        'stillness': float(np.mean(speeds[-still_frames:]))
+    }
+
+
+@pytest.mark.parametrize('size,still_frames', [(2, 1), (5, 3), (30, 10)])
+def test_features_match_recomputation(size, still_frames):
+    rng = np.random.default_rng(size)
+    window = LandmarkWindow(size, still_frames)
+    frames = []
+    t = 0.0
+    for _ in range(100):
+        # Occasional repeated timestamps give zero velocity
+        t += 0.0 if rng.random() < 0.1 else rng.uniform(0.01, 0.1)
+        frame = (t, float(np.float32(rng.uniform(0, 480))), float(np.float32(rng.uniform(0, 90))))
+        frames.append(frame)
+
+        features = window.push(*frame)
+        expected = naive_features(frames, size, still_frames)
+        for name, value in expected.items():
+            assert features[name] == pytest.approx(value, rel=1e-4, abs=1e-3), name
+
+
+def test_len_and_clear():
+    window = LandmarkWindow(size=4, still_frames=2)
+    for i in range(6):
+        window.push(i * 0.1, 100.0 + i, 10.0)
+    assert len(window) == 4
+
+    window.clear()
+    assert len(window) == 0
+    assert window.push(1.0, 50.0, 20.0) == {
+        'velocity': 0.0, 'peak_velocity': 0.0, 'angle_change': 0.0, 'stillness': 0.0
+    }
+
+
+def test_sizes_are_clamped():
+    window = LandmarkWindow(size=1, still_frames=50)
+    assert (window.size, window.still_frames) == (2, 2)
+    assert window.nbytes == 2 * (8 + 4 + 4 + 4)
@@ -0,0 +1,54 @@
+from app.services.load_governor import LoadGovernor
+
+
+def make_governor(**overrides):
+    options = dict(enabled=True, latency_high_ms=250, latency_low_ms=100, queue_high=8, queue_low=2,
+                   min_dwell=0, smoothing=1.0, min_samples=3)
+    options.update(overrides)
+    return LoadGovernor(**options)
+
+
+def test_disabled_governor_never_degrades():
+    governor = make_governor(enabled=False)
+    governor.record_queue_depth(100)
+    for _ in range(10):
+        governor.record_latency(1.0)
+    assert not governor.degraded
+    assert governor.effective_tier('heavy') == 'heavy'
+
+
+def test_deep_queue_degrades_and_recovers():
+    governor = make_governor()
+    governor.record_queue_depth(9)
+    assert governor.degraded
+    assert governor.effective_tier('full') == LoadGovernor.LITE_TIER
+
+    # Below the high mark is not enough, both must be under the low marks
+    governor.record_queue_depth(5)
+    assert governor.degraded
+    governor.record_queue_depth(1)
+    assert not governor.degraded
+    assert governor.effective_tier('full') == 'full'
+    assert governor.degraded_count == 1
+
+
+def test_latency_is_ignored_until_settled():
+    governor = make_governor()
+    governor.record_latency(1.0)
+    governor.record_latency(1.0)
+    assert not governor.degraded
+    governor.record_latency(1.0)
+    assert governor.degraded
+
+
+def test_switches_hold_for_the_dwell_time():
+    governor = make_governor(min_dwell=3600)
+    # The first switch is immediate, the way back waits out the dwell
+    governor.record_queue_depth(9)
+    assert governor.degraded
+    governor.record_queue_depth(0)
+    assert governor.degraded
+
+    governor.switched_at -= 3600
+    governor.record_queue_depth(0)
+    assert not governor.degraded
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from app.services.result_codec import RESULT_HEADER, decode_result, encode_result
+
+
+def make_result(**overrides):
+    result = {
+        'fall_detected': True,
+        'should_notify': True,
+        'skipped': False,
+        'confidence': 0.75,
+        'angle': 80.5,
+        'velocity': 120.25,
+        'timestamp': '2026-01-02T03:04:05.250000',
+        'seq': 42,
+        'landmarks': np.arange(33 * 4, dtype=np.float32).reshape(33, 4)
+    }
+    result.update(overrides)
+    return result
+
+
+def test_round_trip():
+    result = make_result()
+    decoded = decode_result(encode_result(result, b'jpeg'))
+
+    for key in ('fall_detected', 'should_notify', 'skipped', 'confidence', 'angle', 'velocity', 'seq'):
+        assert decoded[key] == result[key]
+    assert decoded['timestamp'] == 1767323045.25
+    np.testing.assert_array_equal(decoded['landmarks'], result['landmarks'])
+    assert decoded['processed_frame'] == b'jpeg'
+
+
+def test_round_trip_without_landmarks_or_frame():
+    result = make_result(fall_detected=False, should_notify=False, skipped=True, seq=None,
+                         landmarks=np.empty((0, 4), dtype=np.float32))
+    data = encode_result(result)
+    decoded = decode_result(data)
+
+    assert len(data) == RESULT_HEADER.size
+    assert decoded['landmarks'].shape == (0, 4)
+    assert decoded['processed_frame'] is None
+    assert decoded['seq'] == 0
+    assert decoded['skipped'] and not decoded['fall_detected'] and not decoded['should_notify']
+
+
+def test_decode_rejects_other_records():
+    data = bytearray(encode_result(make_result()))
+    data[:4] = b'FDR1'
+    with pytest.raises(ValueError):
+        decode_result(bytes(data))
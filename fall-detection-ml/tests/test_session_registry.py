@@ -0,0 +1,76 @@
+from app.services.session_registry import SessionRegistry
+
+
+def make_registry(max_sessions=2, ttl=60.0):
+    closed = []
+    registry = SessionRegistry(
+        factory=lambda key: {'key': key},
+        max_sessions=max_sessions,
+        ttl=ttl,
+        on_evict=lambda key, value: closed.append(key)
+    )
+    return registry, closed
+
+
+def test_acquire_creates_once():
+    registry, _ = make_registry()
+    first = registry.acquire('a')
+    assert registry.acquire('a') is first
+    assert registry.get_stats()['created'] == 1
+    assert 'a' in registry and len(registry) == 1
+
+
+def test_least_recently_used_is_evicted():
+    registry, closed = make_registry(max_sessions=2)
+    registry.acquire('a')
+    registry.acquire('b')
+    registry.acquire('a')
+    registry.acquire('c')
+
+    assert closed == ['b']
+    assert [value['key'] for value in registry.values()] == ['a', 'c']
+    assert registry.get_stats()['evicted'] == 1
+
+
+def test_idle_sessions_expire():
+    registry, closed = make_registry(ttl=10.0)
+    registry.acquire('a')
+    registry.acquire('b')
+
+    assert registry.sweep() == 0
+    assert registry.sweep(now=registry._sessions['b'].last_used + 11.0) == 2
+    assert closed == ['a', 'b']
+    assert registry.get_stats()['expired'] == 2
+
+
+def test_get_does_not_create():
+    registry, _ = make_registry()
+    assert registry.get('a') is None
+    assert len(registry) == 0
+
+
+def test_remove_and_clear_close_sessions():
+    registry, closed = make_registry(max_sessions=3)
+    for key in 'abc':
+        registry.acquire(key)
+
+    assert registry.remove('b')
+    assert not registry.remove('b')
+    registry.clear()
+    assert closed == ['b', 'a', 'c']
+    assert len(registry) == 0
+
+
+def test_close_errors_are_contained():
+    def fail(key, value):
+        raise RuntimeError('boom')
+
+    registry = SessionRegistry(factory=lambda key: key, max_sessions=1, ttl=60.0, on_evict=fail)
+    registry.acquire('a')
+    assert registry.acquire('b') == 'b'
+    assert 'a' not in registry
+
+
+def test_factory_override():
+    registry, _ = make_registry()
+    assert registry.acquire('a', factory=lambda key: key.upper()) == 'A'